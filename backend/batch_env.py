@@ -0,0 +1,227 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from game_logic import GameLogic
+
+# Relative actions, indexed the same way as the ACTIONS lists in train.py / play.py
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+# Absolute directions, indexed like GameLogic.directions: DOWN, UP, LEFT, RIGHT
+DIRECTION_NAMES = ["downward", "upward", "leftward", "rightward"]
+DOWN, UP, LEFT, RIGHT = 0, 1, 2, 3
+DIRECTION_DELTAS = np.array([(1, 0), (-1, 0), (0, -1), (0, 1)], dtype=np.int64)
+
+# TURNS[current_direction, action] -> new absolute direction (same table as get_direction)
+TURNS = np.array([
+    [RIGHT, DOWN, LEFT, UP],    # downward
+    [LEFT, UP, RIGHT, DOWN],    # upward
+    [DOWN, LEFT, UP, RIGHT],    # leftward
+    [UP, RIGHT, DOWN, LEFT],    # rightward
+], dtype=np.int64)
+
+REWARD_FOOD = GameLogic.REWARD_FOOD
+REWARD_DEATH = GameLogic.REWARD_DEATH
+REWARD_STEP = GameLogic.REWARD_STEP
+
+
+class BatchGameLogic:
+    """A batch of independent snake games stepped together with NumPy.
+
+    Every game follows the same rules as GameLogic: the snake starts at (1, 1)
+    with length 1, it dies when it leaves the grid or moves onto any of its own
+    cells (including the current tail), eating food grows it by one and adds one
+    to the score, and food is respawned uniformly over the cells not covered by
+    the snake. Like get_current_direction, a length-1 snake always faces right.
+    A game whose snake fills the whole board ends there, like GameLogic.step.
+    Rewards are GameLogic.REWARD_*.
+
+    Cells are stored as flat indices (row * grid_size + col). Each game keeps its
+    body in a ring buffer, so a move only writes the new head and clears the old
+    tail, and every game is advanced by the same handful of array operations.
+    """
+
+    def __init__(self,
+                 num_games: int,
+                 grid_size: int,
+                 max_steps: Optional[int] = None,
+                 seed: Optional[int] = None) -> None:
+        """Allocate the game arrays and start every game.
+
+        Args:
+            num_games (int): number of games advanced by each step() call
+            grid_size (int): the size of the game grid (at least 2)
+            max_steps (Optional[int]): end an episode after this many steps, if set
+            seed (Optional[int]): seed for the food placement generator
+
+        Returns: None
+        """
+        self.num_games = num_games
+        self.grid_size = grid_size
+        self.num_cells = grid_size * grid_size
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        # Ring buffers are rounded up to a power of two so wrapping is a bit mask
+        self.ring_size = 1 << (self.num_cells - 1).bit_length()
+        self._ring_mask = self.ring_size - 1
+
+        # Occupancy rows carry one extra "wall" column that is always occupied, so
+        # a single lookup detects both wall- and self-collision
+        self.wall_cell = self.num_cells
+        self._row_width = self.num_cells + 1
+
+        self.body = np.zeros((num_games, self.ring_size), dtype=np.int64)
+        self.head_ptr = np.zeros(num_games, dtype=np.int64)
+        self.length = np.ones(num_games, dtype=np.int64)
+        self.direction = np.full(num_games, RIGHT, dtype=np.int64)
+        self.occupied = np.zeros((num_games, self._row_width), dtype=bool)
+        self.food = np.zeros(num_games, dtype=np.int64)
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.steps = np.zeros(num_games, dtype=np.int64)
+
+        # _next_cell[cell, direction] is the neighbouring cell, or wall_cell past the edge
+        cells = np.arange(self.num_cells)
+        next_r = cells[:, None] // grid_size + DIRECTION_DELTAS[None, :, 0]
+        next_c = cells[:, None] % grid_size + DIRECTION_DELTAS[None, :, 1]
+        inside = (next_r >= 0) & (next_r < grid_size) & (next_c >= 0) & (next_c < grid_size)
+        self._next_cell = np.where(inside, next_r * grid_size + next_c, self.wall_cell)
+
+        self._start_cell = 1 * grid_size + 1
+        self._start_occupancy = np.zeros(self._row_width, dtype=bool)
+        self._start_occupancy[[self._start_cell, self.wall_cell]] = True
+
+        self._rows = np.arange(num_games)
+        self._body_base = self._rows * self.ring_size
+        self._occupied_base = self._rows * self._row_width
+        self.reset(self._rows)
+
+    def reset(self, games: np.ndarray) -> None:
+        """Restart the given games from the initial GameLogic position.
+
+        Args:
+            games (np.ndarray): indices of the games to restart
+
+        Returns: None
+        """
+        start = self._start_cell
+        self.body[games, 0] = start
+        self.head_ptr[games] = 0
+        self.length[games] = 1
+        self.direction[games] = RIGHT
+        self.occupied[games] = self._start_occupancy
+        self.score[games] = 0
+        self.steps[games] = 0
+
+        # Only the start cell is taken, so the first food is uniform over the rest
+        food = self.rng.integers(0, self.num_cells - 1, size=len(games))
+        self.food[games] = food + (food >= start)
+
+    def place_food(self, games: np.ndarray) -> np.ndarray:
+        """Place food on a uniformly random free cell for each of the given games.
+
+        Args:
+            games (np.ndarray): indices of the games that need new food
+
+        Returns:
+            np.ndarray: boolean mask over games, True where no free cell was left
+        """
+        free = ~self.occupied[games, :self.num_cells]
+        free_counts = free.sum(axis=1)
+        full = free_counts == 0
+
+        # Pick the k-th free cell of each row, with k uniform in [0, free_count)
+        k = (self.rng.random(len(games)) * free_counts).astype(np.int64)
+        cells = np.argmax(free.cumsum(axis=1) > k[:, None], axis=1)
+        self.food[games] = np.where(full, self.food[games], cells)
+        return full
+
+    def current_directions(self) -> np.ndarray:
+        """Direction index each snake is facing, as get_current_direction sees it."""
+        return np.where(self.length == 1, RIGHT, self.direction)
+
+    def heads(self) -> np.ndarray:
+        """Flat cell index of every snake's head."""
+        return self.body.ravel()[self._body_base + self.head_ptr]
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply one relative action to every game.
+
+        Finished games are restarted automatically, so the arrays always describe
+        live games after this call returns.
+
+        Args:
+            actions: integer array of shape (num_games,) indexing ACTIONS
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (rewards, dones, scores), where
+            scores holds each game's score at the end of this step (before any reset)
+        """
+        body = self.body.ravel()
+        occupied = self.occupied.ravel()
+
+        # Turn the relative actions into the new head cell
+        new_dir = TURNS[self.current_directions(), actions]
+        new_head = self._next_cell[self.heads(), new_dir]
+
+        # Check wall- and self-collision (the tail still counts as occupied)
+        new_slot = self._occupied_base + new_head
+        dead = occupied[new_slot]
+        ate = new_head == self.food
+
+        # Move every snake; dead games are overwritten by reset() below, so
+        # they can go through the same updates without being masked out
+        ptr = (self.head_ptr - 1) & self._ring_mask
+        body[self._body_base + ptr] = new_head
+        occupied[new_slot] = True
+        tail = body[self._body_base + ((ptr + self.length) & self._ring_mask)]
+        occupied[self._occupied_base + tail] = ate
+        self.head_ptr = ptr
+        self.direction = new_dir
+
+        # Snakes that ate keep their tail, grow, score, and get new food
+        self.length += ate
+        self.score += ate
+        done = dead.copy()
+        eaten = np.flatnonzero(ate)
+        if len(eaten):
+            done[eaten] = self.place_food(eaten)
+
+        self.steps += 1
+        if self.max_steps is not None:
+            done |= self.steps >= self.max_steps
+
+        rewards = np.where(dead, REWARD_DEATH, np.where(ate, REWARD_FOOD, REWARD_STEP))
+        scores = self.score.copy()
+
+        finished = np.flatnonzero(done)
+        if len(finished):
+            self.reset(finished)
+
+        return rewards, done, scores
+
+    def snake_positions(self, game: int) -> List[Tuple[int, int]]:
+        """Return one game's snake as (row, col) cells from head to tail.
+
+        Args:
+            game (int): index of the game
+
+        Returns:
+            List[Tuple[int, int]]: the same layout as Snake.snake_positions
+        """
+        ptrs = (self.head_ptr[game] + np.arange(self.length[game])) & self._ring_mask
+        return [divmod(int(cell), self.grid_size) for cell in self.body[game, ptrs]]
+
+    def get_state_representation(self, game: int) -> Tuple:
+        """Return one game's state in the format of get_state_representation.
+
+        Args:
+            game (int): index of the game
+
+        Returns:
+            Tuple: (head_pos, head_dir, body_tuple, food_pos)
+        """
+        positions = self.snake_positions(game)
+        head_dir = DIRECTION_NAMES[RIGHT if len(positions) == 1 else int(self.direction[game])]
+        food_pos = divmod(int(self.food[game]), self.grid_size)
+        return (positions[0], head_dir, tuple(sorted(positions)), food_pos)
@@ -0,0 +1,282 @@
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import deque
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import train
+from game_logic import GameLogic
+from q_learning.generate_game_states import generate_all_valid_states
+from q_learning.get_game_state import get_state_representation
+from q_learning.q_learning_agent import QLearningAgent
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+# Grid sizes and snake lengths (as a fraction of the board) for the per-step benchmarks
+MOVE_GRID_SIZES = [4, 8, 16, 30]
+SNAKE_FRACTIONS = [0.0, 0.25, 0.75]
+GENERATION_GRID_SIZES = [2, 3, 4]
+AGENT_GRID_SIZE = 4
+EPISODE_GRID_SIZE = 4
+MAX_STEPS_PER_EPISODE = 200
+
+# A metric counts as regressed when it is this much worse than the baseline
+REGRESSION_THRESHOLD = 0.10
+
+
+def hamiltonian_cycle(grid_size: int) -> List[Tuple[int, int]]:
+    """Return a cycle through every cell of an even-sized grid, as consecutive neighbours.
+
+    Row 0 is walked left to right, rows 1.. are walked in a serpentine over
+    columns 1.., and column 0 leads back up to the start.
+    """
+    cycle = [(0, c) for c in range(grid_size)]
+    for r in range(1, grid_size):
+        columns = range(grid_size - 1, 0, -1) if r % 2 else range(1, grid_size)
+        cycle.extend((r, c) for c in columns)
+    cycle.extend((r, 0) for r in range(grid_size - 1, 0, -1))
+    return cycle
+
+
+def game_with_snake(grid_size: int, length: int) -> Tuple[GameLogic, List[Tuple[int, int]]]:
+    """Build a game whose snake lies along hamiltonian_cycle and can follow it forever.
+
+    The food is put off the board, so the snake never grows.
+
+    Returns:
+        Tuple[GameLogic, List]: the game and the absolute direction of each of the next len(cycle) moves
+    """
+    cycle = hamiltonian_cycle(grid_size)
+    game = GameLogic(grid_size)
+    for cell in game.Snake.body:
+        game.GameEnvironment.release_cell(cell)
+
+    body = [cycle[i] for i in range(length - 1, -1, -1)]
+    game.Snake.body = deque(body)
+    game.Snake.occupied = set(body)
+    for cell in body:
+        game.GameEnvironment.take_cell(cell)
+    game.GameEnvironment.food_pos = (-1, -1)
+
+    moves = []
+    for i in range(len(cycle)):
+        (r0, c0), (r1, c1) = cycle[(length - 1 + i) % len(cycle)], cycle[(length + i) % len(cycle)]
+        moves.append((r1 - r0, c1 - c0))
+    return game, moves
+
+
+def best_rate(run: Callable[[], int], repeat: int) -> float:
+    """Call run() `repeat` times and return the best operations per second (run returns its op count)."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        ops = run()
+        best = max(best, ops / (time.perf_counter() - start))
+    return best
+
+
+def bench_move(grid_size: int, length: int, steps: int, repeat: int) -> float:
+    # The moves only fit a snake at the start of the cycle, so every repeat gets a fresh game
+    setups = [game_with_snake(grid_size, length) for _ in range(repeat)]
+    moves = setups[0][1]
+    moves = (moves * (steps // len(moves) + 1))[:steps]
+    games = iter([game for game, _ in setups])
+
+    def run():
+        game = next(games)
+        for direction in moves:
+            game.move(direction)
+        return steps
+    return best_rate(run, repeat)
+
+
+def bench_state_representation(grid_size: int, length: int, calls: int, repeat: int) -> float:
+    game, _ = game_with_snake(grid_size, length)
+    game.GameEnvironment.food_pos = (0, 0) if (0, 0) not in game.Snake.occupied else (grid_size - 1, 0)
+
+    def run():
+        for _ in range(calls):
+            get_state_representation(game)
+        return calls
+    return best_rate(run, repeat)
+
+
+def bench_agent(ops: int, repeat: int) -> Tuple[float, float]:
+    """Return (choose_action, update_q_value) ops/sec on an eager Q-table."""
+    agent = QLearningAgent(actions=ACTIONS, learning_rate=0.2, epsilon=0.1,
+                           grid_size=AGENT_GRID_SIZE, num_episodes=1)
+    agent.set_q_table()
+    rng = random.Random(0)
+    states = rng.sample(list(agent.q_table), min(ops, len(agent.q_table)))
+    transitions = [(s, rng.choice(ACTIONS), -0.1, rng.choice(states)) for s in states]
+
+    def run_choose():
+        for state in states:
+            agent.choose_action(state, 0.1)
+        return len(states)
+
+    def run_update():
+        for transition in transitions:
+            agent.update_q_value(*transition)
+        return len(transitions)
+
+    return best_rate(run_choose, repeat), best_rate(run_update, repeat)
+
+
+def bench_episodes(episodes: int, repeat: int) -> Tuple[float, float]:
+    """Return (episodes/sec, steps/sec) of train.train, headless, with a lazy Q-table."""
+    best = (0.0, 0.0)
+    for _ in range(repeat):
+        random.seed(0)
+        agent = QLearningAgent(actions=ACTIONS, learning_rate=0.2, epsilon=0.1,
+                               grid_size=EPISODE_GRID_SIZE, num_episodes=episodes)
+        agent.set_q_table(lazy=True)
+        # The progress bar and the progress lines are part of the loop, but not of the report
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            _, steps_per_episode = train.train(agent, max_steps=MAX_STEPS_PER_EPISODE)
+            elapsed = time.perf_counter() - start
+        best = max(best, (episodes / elapsed, sum(steps_per_episode) / elapsed))
+    return best
+
+
+def bench_generation(grid_size: int, repeat: int) -> Tuple[float, float]:
+    """Return (seconds, peak MiB) of generate_all_valid_states; memory is traced in a separate run."""
+    seconds = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        generate_all_valid_states(grid_size, ACTIONS)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        generate_all_valid_states(grid_size, ACTIONS)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def run_benchmarks(quick: bool = False) -> Dict:
+    """Run every benchmark.
+
+    Args:
+        quick (bool): fewer repetitions and smaller workloads (for smoke runs, not baselines)
+
+    Returns:
+        Dict: {'meta': {...}, 'results': {name: {'value', 'unit', 'higher_is_better'}}}
+    """
+    repeat = 1 if quick else 3
+    scale = 10 if quick else 1
+    results = {}
+
+    def record(name: str, value: float, unit: str, higher_is_better: bool = True) -> None:
+        results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+        print(f"{name:<45} {value:>14.6g} {unit}", flush=True)
+
+    for grid_size in MOVE_GRID_SIZES:
+        for fraction in SNAKE_FRACTIONS:
+            length = max(1, int(fraction * grid_size * grid_size))
+            record(f"move/grid{grid_size}/len{length}",
+                   bench_move(grid_size, length, 200_000 // scale, repeat), "steps/s")
+            record(f"state_representation/grid{grid_size}/len{length}",
+                   bench_state_representation(grid_size, length, 100_000 // scale, repeat), "calls/s")
+
+    choose, update = bench_agent(20_000 // scale, repeat)
+    record(f"agent/choose_action/grid{AGENT_GRID_SIZE}", choose, "ops/s")
+    record(f"agent/update_q_value/grid{AGENT_GRID_SIZE}", update, "ops/s")
+
+    episodes_per_sec, steps_per_sec = bench_episodes(5_000 // scale, repeat)
+    record(f"train_loop/grid{EPISODE_GRID_SIZE}/episodes", episodes_per_sec, "episodes/s")
+    record(f"train_loop/grid{EPISODE_GRID_SIZE}/steps", steps_per_sec, "steps/s")
+
+    for grid_size in GENERATION_GRID_SIZES:
+        seconds, peak = bench_generation(grid_size, repeat)
+        record(f"generate_all_valid_states/grid{grid_size}/time", seconds, "s", higher_is_better=False)
+        record(f"generate_all_valid_states/grid{grid_size}/peak_memory", peak, "MiB", higher_is_better=False)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """Compare two benchmark reports and print the change of every shared metric.
+
+    Args:
+        baseline (Dict): the stored report
+        current (Dict): the new report
+        threshold (float): relative slowdown (e.g. 0.10 = 10%) that counts as a regression
+
+    Returns:
+        List[str]: names of the regressed metrics
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or base['value'] == 0 or result['value'] == 0:
+            continue
+
+        # Ratio > 1 is an improvement whichever direction the metric goes
+        ratio = result['value'] / base['value']
+        if not result['higher_is_better']:
+            ratio = 1 / ratio
+        regressed = ratio < 1 - threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<45} {base['value']:>14.6g} -> {result['value']:>14.6g} {result['unit']:<10} "
+              f"{(ratio - 1) * 100:+6.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the environment, state encoding, agent and state generation.")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON report")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads and a single repetition")
+    parser.add_argument("--baseline", default=None, help="stored JSON report to compare against")
+    parser.add_argument("--results", default=None,
+                        help="compare this existing report against --baseline instead of running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.results is not None:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(quick=args.quick)
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"\nComparing against {args.baseline} (threshold {args.threshold:.0%}):")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import os
+import pickle
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write a file so that readers only ever see the old or the new contents.
+
+    The data goes to a temporary file in the same directory, which is flushed to
+    disk and then renamed over path. If writing fails, the temporary file is removed.
+
+    Args:
+        path (str): the file to replace
+        data (bytes): its new contents
+
+    Returns: None
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path: str) -> Dict:
+    """Read a checkpoint written by Checkpointer.
+
+    Returns:
+        Dict: with keys 'episode', 'q_table', 'random_state', 'replay_buffer' (None unless the
+              agent has one), 'scores', 'steps_per_episode' and 'grid_size'
+    """
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class Checkpointer:
+    """Periodically saves training progress without stalling the training loop.
+
+    A checkpoint holds everything needed to continue a run exactly where it
+    stopped: the Q-table, the number of finished episodes, the state of the
+    `random` module (used by both the agent and the game) and the score/step
+    history. The training thread only pickles a snapshot; a background thread
+    writes it with atomic_write. If a new checkpoint is due while the previous
+    one is still being written, only the newest pending snapshot is kept.
+    """
+
+    def __init__(self, path: str, every_episodes: int = 0, every_seconds: float = 0.0) -> None:
+        """Set up the checkpoint schedule and start the writer thread.
+
+        Args:
+            path (str): the checkpoint file
+            every_episodes (int): save after every N-th episode (0 = never by count)
+            every_seconds (float): save when this much time has passed since the last save (0 = never by time)
+
+        Returns: None
+        """
+        self.path = path
+        self.every_episodes = every_episodes
+        self.every_seconds = every_seconds
+        self.last_save = time.monotonic()
+
+        self._pending: Optional[bytes] = None
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._writer, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def maybe_save(self, episode: int, agent, scores: List[int], steps_per_episode: List[int]) -> bool:
+        """Save a checkpoint if one is due after `episode` finished episodes.
+
+        Returns:
+            bool: True if a checkpoint was queued
+        """
+        due = self.due(episode)
+        if due:
+            self.save(episode, agent, scores, steps_per_episode)
+        return due
+
+    def due(self, episode: int) -> bool:
+        """Return True if a checkpoint is due after `episode` finished episodes."""
+        return (self.every_episodes > 0 and episode % self.every_episodes == 0) or \
+               (self.every_seconds > 0 and time.monotonic() - self.last_save >= self.every_seconds)
+
+    def save(self, episode: int, agent, scores: List[int], steps_per_episode: List[int]) -> None:
+        """Snapshot the training state and hand it to the writer thread.
+
+        Args:
+            episode (int): number of finished episodes
+            agent: the agent being trained
+            scores (List[int]): per-episode scores so far
+            steps_per_episode (List[int]): per-episode step counts so far
+
+        Returns: None
+        """
+        # Pickling here takes a consistent snapshot; the slow disk write happens off-thread
+        data = pickle.dumps({
+            'episode': episode,
+            'grid_size': agent.grid_size,
+            'q_table': agent.q_table,
+            'random_state': random.getstate(),
+            'replay_buffer': getattr(agent, 'replay_buffer', None),
+            'scores': scores,
+            'steps_per_episode': steps_per_episode,
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+        self.last_save = time.monotonic()
+
+        with self._cond:
+            self._raise_error()
+            self._pending = data
+            self._cond.notify()
+
+    def close(self) -> None:
+        """Wait for the last queued checkpoint to be written and stop the writer thread.
+
+        Raises:
+            OSError: if writing a checkpoint failed
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _writer(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                data, self._pending = self._pending, None
+
+            try:
+                atomic_write(self.path, data)
+            except OSError as e:
+                self._error = e
@@ -0,0 +1,167 @@
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch_env import ACTIONS, REWARD_DEATH, TURNS, BatchGameLogic
+from q_learning.dense_q_table import DenseQTable
+
+# Greedy games are cut off after this many steps (a greedy policy can loop forever)
+MAX_EVAL_STEPS = 200
+PERCENTILES = (5, 25, 50, 75, 95)
+DEATH_CAUSES = ("wall", "self", "timeout", "board_full")
+
+
+def _greedy_actions(agent, env: BatchGameLogic, games: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Pick the greedy action of each of the given games, as indices into ACTIONS."""
+    states = [env.get_state_representation(g) for g in games.tolist()]
+    if isinstance(agent.q_table, DenseQTable):
+        # One fancy-indexing lookup for the whole batch; unknown states read as default_q_value
+        indices = np.array([agent.q_table.index(state) for state in states], dtype=np.int64)
+        q_values = agent.q_table.values[indices].astype(np.float64)
+        q_values[indices < 0] = agent.default_q_value
+        columns = [agent.q_table.action_index[action] for action in ACTIONS]
+        q_values = q_values[:, columns]
+    else:
+        q_values = np.array([[agent.get_q_value(state, action) for action in ACTIONS] for state in states])
+
+    # Ties (e.g. unvisited states) are broken uniformly at random with the evaluator's own generator
+    best = q_values == q_values.max(axis=1, keepdims=True)
+    noise = rng.random(best.shape)
+    return np.argmax(np.where(best, noise, -1.0), axis=1)
+
+
+def evaluate_greedy(agent,
+                    num_games: int = 100,
+                    max_steps: int = MAX_EVAL_STEPS,
+                    seed: Optional[int] = None) -> Dict:
+    """Play a batch of greedy (epsilon = 0) games with an agent's current Q-values.
+
+    All games are advanced together in one BatchGameLogic, so the cost per step
+    is one batched environment update plus the Q-value lookups. The agent is only
+    read: its Q-table is not updated and the global random module is not used.
+
+    Args:
+        agent (QLearningAgent): any agent; its get_q_value (or DenseQTable) gives the Q-values
+        num_games (int): number of games to play
+        max_steps (int): a game still running after this many steps ends as a timeout
+        seed (Optional[int]): seed for food placement and tie-breaking
+
+    Returns:
+        Dict: {'games', 'mean', 'std', 'max', 'percentiles' {p: score}, 'mean_steps',
+               'deaths' {cause: count}} with causes 'wall', 'self', 'timeout' and 'board_full'
+    """
+    rng = np.random.default_rng(seed)
+    env = BatchGameLogic(num_games, agent.grid_size, seed=int(rng.integers(2**63)))
+    scores = np.zeros(num_games, dtype=np.int64)
+    steps = np.zeros(num_games, dtype=np.int64)
+    causes = np.full(num_games, -1, dtype=np.int64)
+    active = np.ones(num_games, dtype=bool)
+
+    for step in range(1, max_steps + 1):
+        games = np.flatnonzero(active)
+        if not len(games):
+            break
+
+        # Finished games keep being stepped (the env restarts them) but are no longer recorded
+        actions = np.zeros(num_games, dtype=np.int64)
+        actions[games] = _greedy_actions(agent, env, games, rng)
+
+        # A death is a wall collision when the new head would leave the grid
+        new_dir = TURNS[env.current_directions(), actions]
+        hits_wall = env._next_cell[env.heads(), new_dir] == env.wall_cell
+        rewards, dones, step_scores = env.step(actions)
+
+        finished = games[dones[games]]
+        dead = rewards[finished] == REWARD_DEATH
+        causes[finished] = np.where(dead, np.where(hits_wall[finished], 0, 1), 3)
+        scores[finished] = step_scores[finished]
+        steps[finished] = step
+        active[finished] = False
+
+    # Games still running were cut off
+    timed_out = np.flatnonzero(active)
+    causes[timed_out] = 2
+    scores[timed_out] = env.score[timed_out]
+    steps[timed_out] = max_steps
+
+    return {
+        'games': num_games,
+        'mean': float(scores.mean()),
+        'std': float(scores.std()),
+        'max': int(scores.max()),
+        'percentiles': {p: float(v) for p, v in zip(PERCENTILES, np.percentile(scores, PERCENTILES))},
+        'mean_steps': float(steps.mean()),
+        'deaths': {cause: int(np.count_nonzero(causes == i)) for i, cause in enumerate(DEATH_CAUSES)},
+    }
+
+
+def _evaluate_snapshot(snapshot: bytes, num_games: int, max_steps: int, seed: Optional[int]) -> Dict:
+    return evaluate_greedy(pickle.loads(snapshot), num_games, max_steps, seed)
+
+
+class BackgroundEvaluator:
+    """Runs evaluate_greedy on frozen snapshots of an agent in a worker process.
+
+    submit() pickles the agent right away, so later training updates do not leak
+    into the evaluation, and returns while the games are played in the background.
+    """
+
+    def __init__(self, num_games: int = 100, max_steps: int = MAX_EVAL_STEPS,
+                 seed: Optional[int] = None, workers: int = 1) -> None:
+        """Start the evaluation worker pool.
+
+        Args:
+            num_games (int): games per evaluation
+            max_steps (int): step cap per game
+            seed (Optional[int]): evaluation k uses seed + k, so results do not depend on timing
+            workers (int): worker processes (evaluations may overlap if there are several)
+
+        Returns: None
+        """
+        self.num_games = num_games
+        self.max_steps = max_steps
+        self.seed = seed
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._pending: List[Tuple[int, Future]] = []
+        self._submitted = 0
+
+    def submit(self, episode: int, agent) -> None:
+        """Queue an evaluation of the agent as it is now, labelled with the episode number."""
+        seed = None if self.seed is None else self.seed + self._submitted
+        self._submitted += 1
+        snapshot = pickle.dumps(agent, protocol=pickle.HIGHEST_PROTOCOL)
+        self._pending.append((episode, self._pool.submit(_evaluate_snapshot, snapshot,
+                                                         self.num_games, self.max_steps, seed)))
+
+    def completed(self, wait: bool = False) -> List[Tuple[int, Dict]]:
+        """Collect finished evaluations in submission order.
+
+        Args:
+            wait (bool): block until every submitted evaluation has finished
+
+        Returns:
+            List[Tuple[int, Dict]]: (episode, evaluate_greedy result) pairs not returned before
+        """
+        results = []
+        while self._pending and (wait or self._pending[0][1].done()):
+            episode, future = self._pending.pop(0)
+            results.append((episode, future.result()))
+        return results
+
+    def close(self) -> List[Tuple[int, Dict]]:
+        """Wait for the outstanding evaluations, shut the pool down and return their results."""
+        try:
+            return self.completed(wait=True)
+        finally:
+            self._pool.shutdown()
+
+
+def format_result(result: Dict) -> str:
+    """One-line summary of an evaluate_greedy result."""
+    p = result['percentiles']
+    deaths = ', '.join(f"{cause} {count}" for cause, count in result['deaths'].items() if count)
+    return (f"Greedy eval ({result['games']} games): mean {result['mean']:.2f} | "
+            f"p5/p50/p95 {p[5]:.0f}/{p[50]:.0f}/{p[95]:.0f} | max {result['max']} | "
+            f"steps {result['mean_steps']:.1f} | {deaths}")
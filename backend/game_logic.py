@@ -1,11 +1,22 @@
 import random
 import os
+from collections import deque
+
+from q_learning import rewards
 
 class Snake:
     def __init__(self, initial_length = 1) -> None:
         self.length = initial_length
         self.just_ate_food = False
-        self.snake_positions = [(1, 1)]
+        # Body from head to tail, plus the same cells as a set for O(1) collision checks
+        self.body = deque([(1, 1)])
+        self.occupied = {(1, 1)}
+
+    @property
+    def snake_positions(self):
+        # The live body deque (head first), returned without copying; callers must not modify it,
+        # since occupied and GameEnvironment.free_cells are only kept in sync by GameLogic.advance
+        return self.body
   
 class GameEnvironment:
     def __init__(self, grid_size: int) -> None:
@@ -15,6 +26,21 @@ class GameEnvironment:
         self.score = 0
         self.grid = [[0] * grid_size for _ in range(grid_size)]
         self.food_pos = (grid_size // 2, grid_size // 2)
+        # Cells not covered by the snake, with each cell's slot in the list for swap-removal
+        self.free_cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+        self.free_index = {cell: i for i, cell in enumerate(self.free_cells)}
+
+    def take_cell(self, cell) -> None:
+        # Swap the last free cell into this cell's slot so removal is O(1)
+        i = self.free_index.pop(cell)
+        last = self.free_cells.pop()
+        if i < len(self.free_cells):
+            self.free_cells[i] = last
+            self.free_index[last] = i
+
+    def release_cell(self, cell) -> None:
+        self.free_index[cell] = len(self.free_cells)
+        self.free_cells.append(cell)
 
 class GameLogic():
     # make sure that the down is 1 and up is -1 for the row index
@@ -22,10 +48,33 @@ class GameLogic():
     UP = (-1, 0)
     LEFT = (0, -1)
     RIGHT = (0, 1)
+
+    # Relative action -> absolute direction, keyed by the direction the head faces
+    TURNS = {
+        UP: {'turn_left': LEFT, 'go_straight': UP, 'turn_right': RIGHT, 'turn_around': DOWN},
+        DOWN: {'turn_left': RIGHT, 'go_straight': DOWN, 'turn_right': LEFT, 'turn_around': UP},
+        LEFT: {'turn_left': DOWN, 'go_straight': LEFT, 'turn_right': UP, 'turn_around': RIGHT},
+        RIGHT: {'turn_left': UP, 'go_straight': RIGHT, 'turn_right': DOWN, 'turn_around': LEFT},
+    }
+
+    # Outcome of a single move, as returned by step()
+    STATUS_OK = 0
+    STATUS_ATE = 1
+    STATUS_WALL = 2
+    STATUS_SELF = 3
+
+    # Rewards used for training
+    REWARD_FOOD = rewards.REWARD_FOOD
+    REWARD_DEATH = rewards.REWARD_DEATH
+    REWARD_STEP = rewards.REWARD_STEP
     
-    def __init__(self, grid_size, score_history = []) -> None:
+    def __init__(self, grid_size, score_history = [], rng = None) -> None:
+        # Food is placed with rng (e.g. a seeded random.Random, to replay a game); the random module by default
+        self.rng = rng if rng is not None else random
         self.GameEnvironment = GameEnvironment(grid_size)
         self.Snake = Snake()
+        for cell in self.Snake.body:
+            self.GameEnvironment.take_cell(cell)
         self.directions = [self.DOWN, self.UP, self.LEFT, self.RIGHT]
         self.highest_score = self.load_high_score()
 
@@ -46,43 +95,85 @@ class GameLogic():
     
     def place_food(self):
         # Place food at a random position in the grid where the snake is not located
-        empty = [
-            (r, c)
-            for r in range(self.GameEnvironment.grid_size)
-            for c in range(self.GameEnvironment.grid_size)
-            if (r, c) not in self.Snake.snake_positions
-        ]
-        self.GameEnvironment.food_pos = random.choice(empty)
-        
-    def move(self, direction):
+        self.GameEnvironment.food_pos = self.rng.choice(self.GameEnvironment.free_cells)
+
+    def advance(self, direction) -> int:
+        """Move the snake one cell without raising or placing new food.
+
+        Args:
+            direction: absolute (row, col) direction to move in
+
+        Returns:
+            int: one of the STATUS_* codes; on STATUS_WALL / STATUS_SELF nothing moves
+        """
         # Get the snake's head position (row, column)
-        head = self.Snake.snake_positions[0]
+        head = self.Snake.body[0]
         
         # Calculate the new head position based on the direction
         new_head = (head[0] + direction[0], head[1] + direction[1])
         
-        # Check self-collision
-        if new_head in self.Snake.snake_positions[1:]:
-            raise Exception("Game Over: Self-collision")
+        # Check self-collision (the tail has not moved yet, so it still counts)
+        if new_head in self.Snake.occupied:
+            return self.STATUS_SELF
         
         # Check wall-collision
         if not (0 <= new_head[0] < self.GameEnvironment.grid_size and 0 <= new_head[1] < self.GameEnvironment.grid_size):
-            raise Exception("Game Over: Wall-collision")
+            return self.STATUS_WALL
         
         # Add the new head position to the snake's positions
-        self.Snake.snake_positions.insert(0, new_head)
+        self.Snake.body.appendleft(new_head)
+        self.Snake.occupied.add(new_head)
+        self.GameEnvironment.take_cell(new_head)
         
-        # Check if the snake has eaten food
+        # If the snake has eaten food it keeps its tail and grows
         if new_head == self.GameEnvironment.food_pos:
-            self.Snake.just_ate_food = True
             self.GameEnvironment.score += 1
-            self.place_food()
+            return self.STATUS_ATE
         
-        # If the snake has not just eaten food, remove the last position
-        if not self.Snake.just_ate_food:
-            self.Snake.snake_positions.pop()
+        # Otherwise remove the last position
+        tail = self.Snake.body.pop()
+        self.Snake.occupied.remove(tail)
+        self.GameEnvironment.release_cell(tail)
+        return self.STATUS_OK
+        
+    def move(self, direction):
+        status = self.advance(direction)
+        if status == self.STATUS_SELF:
+            raise Exception("Game Over: Self-collision")
+        if status == self.STATUS_WALL:
+            raise Exception("Game Over: Wall-collision")
+        if status == self.STATUS_ATE:
+            self.place_food()
+
+    def step(self, action: str):
+        """Apply a relative action and report the outcome instead of raising.
+
+        A single-cell snake faces right, like get_current_direction. If the snake
+        fills the whole board there is nowhere left for food, so the game ends
+        with STATUS_ATE.
+
+        Args:
+            action: one of 'turn_left', 'go_straight', 'turn_right', 'turn_around'
+
+        Returns:
+            Tuple[int, float, bool]: (status, reward, done)
+        """
+        body = self.Snake.body
+        if len(body) < 2:
+            facing = self.RIGHT
         else:
-            self.Snake.just_ate_food = False
+            (head_r, head_c), (neck_r, neck_c) = body[0], body[1]
+            facing = (head_r - neck_r, head_c - neck_c)
+
+        status = self.advance(self.TURNS[facing][action])
+        if status == self.STATUS_OK:
+            return status, self.REWARD_STEP, False
+        if status == self.STATUS_ATE:
+            if not self.GameEnvironment.free_cells:
+                return status, self.REWARD_FOOD, True
+            self.place_food()
+            return status, self.REWARD_FOOD, False
+        return status, self.REWARD_DEATH, True
             
     def stop_game(self) -> int:
         # update the highest score
@@ -91,7 +182,7 @@ class GameLogic():
     
     def get_state(self):
         return {
-            "snake": self.Snake.snake_positions,
+            "snake": list(self.Snake.snake_positions),
             "food": self.GameEnvironment.food_pos,
             "score": self.GameEnvironment.score,
             "grid_size": self.GameEnvironment.size
@@ -0,0 +1,205 @@
+import argparse
+import os
+import pickle
+import random
+import time
+from multiprocessing import Barrier, Process, shared_memory
+from threading import BrokenBarrierError
+from typing import Optional, Tuple
+
+import numpy as np
+
+from checkpoint import atomic_write
+from game_logic import GameLogic
+from q_learning.dense_q_table import DenseQLearningAgent, DenseQTable
+from q_learning.get_game_state import get_state_representation
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+LEARNING_RATE = 0.2
+EPSILON = 0.1
+GRID_SIZE = 4
+NUM_EPISODES = 20000
+MAX_STEPS_PER_EPISODE = 200
+BASE_SEED = 42
+Q_TABLE_PATH = 'trained_q_table.pkl'
+# Seconds the workers get to build their state index and attach the shared memory
+SETUP_TIMEOUT = 600.0
+
+
+def _attach(shm: shared_memory.SharedMemory, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker(worker: int,
+            num_workers: int,
+            q_name: str,
+            stats_name: str,
+            num_episodes: int,
+            grid_size: int,
+            learning_rate: float,
+            epsilon: float,
+            max_steps: int,
+            seed: int,
+            barrier) -> None:
+    """Worker entry point: play every num_workers-th episode, updating the shared Q-values.
+
+    Episode i is played by worker i % num_workers, and its score and step count
+    are written to row 0 / row 1, column i of the shared stats matrix. If setting
+    up fails, the barrier is aborted so the parent and the other workers stop waiting.
+    """
+    try:
+        random.seed(seed)
+        agent = DenseQLearningAgent(actions=ACTIONS, learning_rate=learning_rate, epsilon=epsilon,
+                                    grid_size=grid_size, num_episodes=num_episodes)
+
+        # Every process ranks the states the same way, so indices agree with the shared array
+        agent.q_table = DenseQTable(grid_size, ACTIONS)
+        q_shm = shared_memory.SharedMemory(name=q_name)
+        stats_shm = shared_memory.SharedMemory(name=stats_name)
+        agent.q_table.values = _attach(q_shm, agent.q_table.values.shape, np.float32)
+        stats = _attach(stats_shm, (2, num_episodes), np.int32)
+    except BaseException:
+        barrier.abort()
+        raise
+
+    try:
+        barrier.wait()
+
+        for episode in range(worker, num_episodes, num_workers):
+            game = GameLogic(grid_size=grid_size)
+            game.place_food()
+
+            steps = 0
+            while True:
+                steps += 1
+                current_state = get_state_representation(game)
+                action = agent.choose_action(current_state, epsilon)
+
+                # Reads and writes go straight to shared memory without locks (Hogwild):
+                # a lost update now and then costs less than serializing the workers
+                status, reward, done = game.step(action)
+                next_state = current_state if done else get_state_representation(game)  # Terminal state
+                agent.update_q_value(current_state, action, reward, next_state)
+                if done or steps >= max_steps:
+                    break
+
+            stats[0, episode] = game.GameEnvironment.score
+            stats[1, episode] = steps
+    finally:
+        # Drop the views before closing, or the buffer is still exported
+        agent.q_table.values = None
+        stats = None
+        q_shm.close()
+        stats_shm.close()
+
+
+def train_hogwild(num_workers: int,
+                  num_episodes: int = NUM_EPISODES,
+                  grid_size: int = GRID_SIZE,
+                  learning_rate: float = LEARNING_RATE,
+                  epsilon: float = EPSILON,
+                  max_steps: int = MAX_STEPS_PER_EPISODE,
+                  seed: int = BASE_SEED) -> Tuple[DenseQTable, np.ndarray, np.ndarray, float]:
+    """Train one Q-table with several worker processes at once.
+
+    All workers read and update a single DenseQTable value array in shared
+    memory, without locks. Worker w is seeded with seed + w. With more than one
+    worker the result depends on how the processes interleave, so runs are only
+    reproducible with num_workers=1.
+
+    Args:
+        num_workers (int): number of worker processes
+        num_episodes (int): total number of episodes, split between the workers
+        grid_size (int): the size of the game grid
+        learning_rate (float): Q-learning step size
+        epsilon (float): exploration rate
+        max_steps (int): cap on the number of steps per episode
+        seed (int): seed of the first worker
+
+    Returns:
+        Tuple[DenseQTable, np.ndarray, np.ndarray, float]: the trained table, per-episode
+        scores and step counts (in episode order), and the training wall time in seconds
+    """
+    q_table = DenseQTable(grid_size, ACTIONS)
+    q_shm = shared_memory.SharedMemory(create=True, size=max(1, q_table.values.nbytes))
+    stats_shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * num_episodes * 4))
+    try:
+        shared_values = _attach(q_shm, q_table.values.shape, np.float32)
+        shared_values.fill(0.0)
+        stats = _attach(stats_shm, (2, num_episodes), np.int32)
+
+        # Workers build their state index first; timing starts once all of them are ready
+        barrier = Barrier(num_workers + 1)
+        workers = [
+            Process(target=_worker, args=(w, num_workers, q_shm.name, stats_shm.name, num_episodes, grid_size,
+                                          learning_rate, epsilon, max_steps, seed + w, barrier))
+            for w in range(num_workers)
+        ]
+        for process in workers:
+            process.start()
+        try:
+            barrier.wait(timeout=SETUP_TIMEOUT)
+        except BrokenBarrierError:
+            # A worker failed (or hung) before training started; stop the rest before freeing the memory
+            for process in workers:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            failed = [w for w, process in enumerate(workers) if process.exitcode != 0]
+            raise RuntimeError(f"Hogwild workers {failed} failed to start") from None
+        start = time.perf_counter()
+        for process in workers:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [w for w, process in enumerate(workers) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Hogwild workers {failed} exited with an error")
+
+        q_table.values[:] = shared_values
+        scores, steps = stats[0].copy(), stats[1].copy()
+    finally:
+        # Drop the views before closing, or the buffer is still exported
+        shared_values = stats = None
+        q_shm.close()
+        q_shm.unlink()
+        stats_shm.close()
+        stats_shm.unlink()
+
+    return q_table, scores, steps, elapsed
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train one Q-table with several lock-free worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="size of the game grid")
+    parser.add_argument("--episodes", type=int, default=NUM_EPISODES, help="total number of training episodes")
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE, help="Q-learning step size")
+    parser.add_argument("--epsilon", type=float, default=EPSILON, help="exploration rate")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS_PER_EPISODE, help="cap on steps per episode")
+    parser.add_argument("--seed", type=int, default=BASE_SEED, help="seed of the first worker")
+    parser.add_argument("--output", default=Q_TABLE_PATH, help="where to save the Q-table pickle")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list] = None) -> None:
+    args = parse_args(argv)
+    print(f"Training {args.episodes} episodes on a {args.grid_size}x{args.grid_size} grid with {args.workers} workers...")
+
+    q_table, scores, steps, elapsed = train_hogwild(args.workers, args.episodes, args.grid_size,
+                                                    args.learning_rate, args.epsilon, args.max_steps, args.seed)
+
+    print("\n=== Training Complete ===")
+    print(f"Final Avg Score (last 100): {scores[-100:].mean():.2f}")
+    print(f"Best Score: {scores.max()}")
+    print(f"Throughput: {len(scores) / elapsed:.1f} episodes/sec, {steps.sum() / elapsed:.0f} env-steps/sec "
+          f"({steps.sum() / elapsed / args.workers:.0f} per worker)")
+
+    # Save the same {state: {action: q}} dict as train.py, so play.py can load it
+    atomic_write(args.output, pickle.dumps(q_table.to_dict()))
+    print(f"Q-table saved to {args.output} ({len(q_table)} states)")
+
+
+if __name__ == "__main__":
+    main()
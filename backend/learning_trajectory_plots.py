@@ -1,16 +1,19 @@
+import argparse
+import os
 import random
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Tuple
 
 import matplotlib.pyplot as plt
+import numpy as np
 from tqdm import tqdm
 
 from q_learning.q_learning_agent import QLearningAgent
-from q_learning.get_game_state import (
-    get_state_representation,
-    get_current_direction,
-    get_direction,
-)
+from q_learning.get_game_state import get_state_representation
 from game_logic import GameLogic
+from evaluation import evaluate_greedy
+from profiling import PhaseProfiler
 
 
 # Hyperparameters
@@ -20,25 +23,52 @@ GRID_SIZE = 4
 NUM_EPISODES = 20000
 MAX_STEPS_PER_EPISODE = 200
 
-# Moving-average window for smoothing the curves
-MOVING_AVG_WINDOW = 50
+# Every EVAL_EVERY training episodes, EVAL_GAMES greedy games are played in one batch
+EVAL_EVERY = 100
+EVAL_GAMES = 50
+
+# Moving-average window (in evaluations) for smoothing the curves
+MOVING_AVG_WINDOW = 5
+
+# Independent training runs per epsilon configuration, and the seed of the first run
+NUM_SEEDS = 5
+BASE_SEED = 42
+
+EPSILON_CONFIGS = {
+    "Pure exploitation (epsilon=0.0)": 0.0,
+    "Pure exploration (epsilon=1.0)": 1.0,
+    "Mixed (epsilon=0.1)": 0.1,
+}
 
 def run_training(
     train_epsilon: float,
     num_episodes: int = NUM_EPISODES,
     grid_size: int = GRID_SIZE,
     learning_rate: float = LEARNING_RATE,
+    seed: Optional[int] = None,
+    show_progress: bool = True,
+    eval_every: int = EVAL_EVERY,
+    eval_games: int = EVAL_GAMES,
+    profiler: Optional[PhaseProfiler] = None,
+    profile_every: int = 1000,
 ) -> List[float]:
     """
     Train a fresh Q-learning agent for a given training epsilon and,
-    after each training episode, run a separate evaluation episode
-    with epsilon = 0.0. Returns the per-episode evaluation scores
-    over num_episodes.
+    every eval_every training episodes, play eval_games greedy games
+    (epsilon = 0.0) in one batch with evaluate_greedy. Returns the mean
+    evaluation score of each evaluation, num_episodes // eval_every of them.
 
     This mirrors the logic in train.py but without visualization or Q-table I/O.
     Training uses epsilon = train_epsilon, evaluation uses epsilon = 0.0
-    (pure exploitation of the learned Q-table).
+    (pure exploitation of the learned Q-table). If seed is given, the
+    global random module is seeded with it first so the run is reproducible;
+    evaluation has its own generator, so it does not change the training run.
+    If a profiler is given, every phase of the training episodes is timed and
+    a snapshot is written every profile_every episodes.
     """
+    if seed is not None:
+        random.seed(seed)
+
     agent = QLearningAgent(
         actions=ACTIONS,
         learning_rate=learning_rate,
@@ -47,79 +77,57 @@ def run_training(
         num_episodes=num_episodes,
     )
 
-    # Start from a fresh Q-table for each training run
-    agent.set_q_table()
+    # Start from a fresh Q-table for each training run; states are added as they are visited
+    agent.set_q_table(lazy=True)
 
     eval_scores: List[float] = []
 
+    # With a profiler these are timed wrappers, otherwise the plain functions
+    encode_state = get_state_representation
+    choose_action, update_q_value = agent.choose_action, agent.update_q_value
+    if profiler is not None:
+        encode_state = profiler.wrap(get_state_representation, "state_encoding")
+        choose_action, update_q_value = profiler.agent_hooks(agent)
+
     for episode in tqdm(
-        range(num_episodes), desc=f"Training (epsilon={train_epsilon})"
+        range(num_episodes),
+        desc=f"Training (epsilon={train_epsilon})",
+        disable=not show_progress,
     ):
         # -------- Training episode (epsilon = train_epsilon) --------
         game = GameLogic(grid_size=agent.grid_size)
+        if profiler is not None:
+            profiler.instrument_game(game)
         game.place_food()
 
         steps = 0
         while True:
             steps += 1
-            current_state = get_state_representation(game)
-            action = agent.choose_action(current_state, train_epsilon)
-            current_dir = get_current_direction(game.Snake.snake_positions)
-            direction = get_direction(action, current_dir)
-
-            try:
-                old_score = game.GameEnvironment.score
-                game.move(direction)
-                new_score = game.GameEnvironment.score
-
-                # Reward structure consistent with train.py
-                if new_score > old_score:
-                    reward = 10  # Ate food
-                else:
-                    reward = -0.1  # Normal step
-
-                next_state = get_state_representation(game)
-
-            except Exception as e:
-                if "Wall" in str(e):
-                    reward = -10
-                elif "Self" in str(e):
-                    reward = -10
-                else:
-                    reward = -10
-
-                next_state = current_state  # Terminal state
-                agent.update_q_value(current_state, action, reward, next_state)
+            current_state = encode_state(game)
+            action = choose_action(current_state, train_epsilon)
+
+            # Reward structure shared with train.py via GameLogic.step
+            status, reward, done = game.step(action)
+            next_state = current_state if done else encode_state(game)  # Terminal state
+            update_q_value(current_state, action, reward, next_state)
+            if done:
                 break
 
-            # Update Q-value for non-terminal transition
-            agent.update_q_value(current_state, action, reward, next_state)
-
             if steps >= MAX_STEPS_PER_EPISODE:
                 break
 
-        # -------- Evaluation episode (epsilon = 0.0, pure exploitation) --------
-        eval_game = GameLogic(grid_size=agent.grid_size)
-        eval_game.place_food()
+        if profiler is not None and (episode + 1) % profile_every == 0:
+            profiler.snapshot(episode + 1, len(agent.q_table))
 
-        eval_steps = 0
-        while True:
-            eval_steps += 1
-            eval_state = get_state_representation(eval_game)
-            eval_action = agent.choose_action(eval_state, 0.0)
-            eval_current_dir = get_current_direction(eval_game.Snake.snake_positions)
-            eval_direction = get_direction(eval_action, eval_current_dir)
-
-            try:
-                eval_game.move(eval_direction)
-            except Exception:
-                # Game over; record evaluation score and stop this eval episode
-                break
-
-            if eval_steps >= MAX_STEPS_PER_EPISODE:
-                break
-
-        eval_scores.append(eval_game.GameEnvironment.score)
+        # -------- Batched evaluation (epsilon = 0.0, pure exploitation) --------
+        if (episode + 1) % eval_every == 0:
+            result = evaluate_greedy(
+                agent,
+                num_games=eval_games,
+                max_steps=MAX_STEPS_PER_EPISODE,
+                seed=None if seed is None else seed + episode,
+            )
+            eval_scores.append(result['mean'])
 
     return eval_scores
 
@@ -146,23 +154,108 @@ def moving_average(values: List[float], window_size: int) -> List[float]:
     return averaged
 
 
-def plot_learning_trajectories(results: Dict[str, List[float]]) -> None:
+def _run_job(
+    shm_name: str,
+    shape: Tuple[int, int],
+    row: int,
+    train_epsilon: float,
+    seed: int,
+    num_episodes: int,
+    grid_size: int,
+) -> int:
     """
-    Plot smoothed average score per episode for each epsilon regime.
+    Worker entry point: run one seeded training run and write its
+    mean evaluation scores into row `row` of the shared score matrix.
     """
-    episodes = list(range(1, NUM_EPISODES + 1))
+    scores = run_training(
+        train_epsilon=train_epsilon,
+        num_episodes=num_episodes,
+        grid_size=grid_size,
+        seed=seed,
+        show_progress=False,
+    )
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        np.ndarray(shape, dtype=np.float32, buffer=shm.buf)[row] = scores
+    finally:
+        shm.close()
+    return row
+
+
+def run_experiments(
+    epsilon_configs: Dict[str, float],
+    num_seeds: int = NUM_SEEDS,
+    num_episodes: int = NUM_EPISODES,
+    grid_size: int = GRID_SIZE,
+    max_workers: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Run every (epsilon configuration, seed) pair in a process pool.
+
+    Run i uses seed BASE_SEED + i, so results do not depend on how the
+    runs are scheduled. Workers write their mean evaluation scores straight
+    into a shared-memory matrix, so nothing but row numbers is sent back.
+
+    Returns {label: float32 array of shape (num_seeds, num_episodes // EVAL_EVERY)}.
+    """
+    jobs = [
+        (label, eps, seed_index)
+        for label, eps in epsilon_configs.items()
+        for seed_index in range(num_seeds)
+    ]
+    shape = (len(jobs), num_episodes // EVAL_EVERY)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 4))
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(
+                    _run_job, shm.name, shape, row, eps, BASE_SEED + row, num_episodes, grid_size
+                )
+                for row, (label, eps, seed_index) in enumerate(jobs)
+            ]
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Training runs"):
+                future.result()
+
+        scores = np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return {
+        label: scores[[row for row, job in enumerate(jobs) if job[0] == label]]
+        for label in epsilon_configs
+    }
+
+
+def plot_learning_trajectories(results: Dict[str, np.ndarray]) -> None:
+    """
+    Plot the smoothed greedy evaluation score for each epsilon regime, as the
+    mean over seeds with a 95% confidence band when there are several seeds.
+    """
+    num_evals = next(iter(results.values())).shape[1]
+    num_episodes = num_evals * EVAL_EVERY
+    episodes = np.arange(1, num_evals + 1) * EVAL_EVERY
 
     plt.figure(figsize=(10, 6))
 
-    for label, scores in results.items():
-        smoothed = moving_average(scores, MOVING_AVG_WINDOW)
-        plt.plot(episodes, smoothed, label=label)
+    for label, runs in results.items():
+        smoothed = np.array([moving_average(list(run), MOVING_AVG_WINDOW) for run in runs])
+        mean = smoothed.mean(axis=0)
+        plt.plot(episodes, mean, label=label)
+
+        if len(smoothed) > 1:
+            half_width = 1.96 * smoothed.std(axis=0, ddof=1) / np.sqrt(len(smoothed))
+            plt.fill_between(episodes, mean - half_width, mean + half_width, alpha=0.2)
 
+    num_seeds = next(iter(results.values())).shape[0]
     plt.xlabel("Episode")
-    plt.ylabel("Average score per episode (moving average)")
+    plt.ylabel(f"Greedy score, mean of {EVAL_GAMES} games (moving average)")
     plt.title(
-        f"Snake Q-learning: Learning trajectories over {NUM_EPISODES} episodes\n"
-        f"(window size = {MOVING_AVG_WINDOW})"
+        f"Snake Q-learning: Learning trajectories over {num_episodes} episodes\n"
+        f"(evaluated every {EVAL_EVERY} episodes, window size = {MOVING_AVG_WINDOW}, "
+        f"mean ± 95% CI over {num_seeds} seeds)"
     )
     plt.legend()
     plt.grid(True, alpha=0.3)
@@ -173,25 +266,23 @@ def plot_learning_trajectories(results: Dict[str, List[float]]) -> None:
 
 
 def main() -> None:
-    # Make runs reproducible
-    random.seed(42)
-
-    epsilon_configs = {
-        "Pure exploitation (epsilon=0.0)": 0.0,
-        "Pure exploration (epsilon=1.0)": 1.0,
-        "Mixed (epsilon=0.1)": 0.1,
-    }
-
-    results: Dict[str, List[float]] = {}
-
-    for label, eps in epsilon_configs.items():
-        scores = run_training(train_epsilon=eps, num_episodes=NUM_EPISODES)
-        results[label] = scores
+    parser = argparse.ArgumentParser(description="Plot learning trajectories for several epsilons.")
+    parser.add_argument("--episodes", type=int, default=NUM_EPISODES, help="training episodes per run")
+    parser.add_argument("--seeds", type=int, default=NUM_SEEDS, help="runs per epsilon configuration")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="size of the game grid")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args()
+
+    results = run_experiments(
+        EPSILON_CONFIGS,
+        num_seeds=args.seeds,
+        num_episodes=args.episodes,
+        grid_size=args.grid_size,
+        max_workers=args.workers,
+    )
 
     plot_learning_trajectories(results)
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -1,28 +1,43 @@
+import argparse
+import random
 import time
-import pickle
+from q_learning.compiled_policy import CompiledPolicy
 from q_learning.q_learning_agent import QLearningAgent
+from q_learning.q_table_file import QTableFile, infer_grid_size, load_q_table
 from game_logic import GameLogic
+from recording import EpisodeReader
 from visualizer import GameVisualizer
-from q_learning.get_game_state import get_state_representation, get_current_direction, get_direction
+from q_learning.get_game_state import get_state_representation
 
 
 actions = ["turn_left", "go_straight", "turn_right", "turn_around"]
 
+Q_TABLE_PATH = 'trained_q_table.pkl'
 
-def main():
-    # Load trained Q-table
-    with open('trained_q_table.pkl', 'rb') as f:
-        q_table = pickle.load(f)
-
-    try:
-        sample_state = next(iter(q_table.keys()))
-        
-        # Compute grid size from any coord in state
-        coords = [sample_state[0]] + list(sample_state[2]) + [sample_state[3]]
-        max_rc = max(max(r, c) for r, c in coords)
-        grid_size = max_rc + 1
-        
-    except StopIteration:
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Watch the trained Q-learning snake agent play.")
+    parser.add_argument("--q-table", default=Q_TABLE_PATH,
+                        help="trained Q-table, either a pickle or a binary Q-table file (opened with mmap)")
+    parser.add_argument("--policy", default=None,
+                        help="compiled policy file (python -m q_learning.compiled_policy); used instead of --q-table")
+    parser.add_argument("--replay", default=None,
+                        help="episode recording (train.py --record) to replay instead of playing a policy")
+    parser.add_argument("--episode", type=int, default=1, help="episode of --replay to show (1-based)")
+    return parser.parse_args(argv)
+
+
+def q_table_policy(path):
+    """Load a Q-table and return (grid_size, function choosing the greedy action of a state)."""
+    # Load trained Q-table; a binary file is memory-mapped and records its grid size
+    q_table = load_q_table(path)
+
+    if isinstance(q_table, QTableFile):
+        grid_size = q_table.grid_size
+    elif q_table:
+        # A lazily built table only holds visited states, so every key is needed to see the whole grid
+        grid_size = infer_grid_size(q_table)
+    else:
         grid_size = 3
 
     agent = QLearningAgent(
@@ -34,6 +49,54 @@ def main():
     )
     agent.q_table = q_table
 
+    def select_action(state):
+        # Greedy action selection from Q-table
+        action_values = agent.q_table.get(state, {})
+        if not action_values:
+            return agent.choose_action(state, epsilon=0.0)
+        max_q = max(action_values.values())
+        best_actions = [a for a, q in action_values.items() if q == max_q]
+        return best_actions[0]
+
+    return grid_size, select_action
+
+
+def compiled_policy(path):
+    """Load a compiled policy and return (grid_size, function choosing the action of a state)."""
+    policy = CompiledPolicy.load(path)
+
+    def select_action(state):
+        # One array lookup; states without a preferred action get a random one, like choose_action
+        return policy.act(state) or random.choice(policy.actions)
+
+    return policy.grid_size, select_action
+
+
+def replay(path, episode):
+    """Show a recorded training episode exactly as it was played."""
+    reader = EpisodeReader(path)
+    visualizer = GameVisualizer(grid_size=reader.grid_size, cell_size=None)
+
+    steps = 0
+    for game, action in reader.replay(episode):
+        steps += 1
+        visualizer.draw(game, episode, game.GameEnvironment.score, steps, 0.0)
+        time.sleep(0.1)
+
+    time.sleep(1)
+    visualizer.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay is not None:
+        replay(args.replay, args.episode)
+        return
+    if args.policy is not None:
+        grid_size, select_action = compiled_policy(args.policy)
+    else:
+        grid_size, select_action = q_table_policy(args.q_table)
+
     visualizer = GameVisualizer(grid_size=grid_size, cell_size=100)
 
     game = GameLogic(grid_size)
@@ -46,22 +109,10 @@ def main():
         time.sleep(0.1)
 
         state = get_state_representation(game)
-        
-        # Greedy action selection from Q-table
-        action_values = agent.q_table.get(state, {})
-        if not action_values:
-            action = agent.choose_action(state, epsilon=0.0)
-        else:
-            max_q = max(action_values.values())
-            best_actions = [a for a, q in action_values.items() if q == max_q]
-            action = best_actions[0]
-
-        current_dir = get_current_direction(game.Snake.snake_positions)
-        direction = get_direction(action, current_dir)
-
-        try:
-            game.move(direction)
-        except Exception:
+        action = select_action(state)
+
+        status, reward, done = game.step(action)
+        if done:
             break
 
     time.sleep(1)
@@ -0,0 +1,162 @@
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from checkpoint import atomic_write
+
+PHASES = ["move", "place_food", "state_encoding", "choose_action", "update_q_value", "render"]
+
+
+class PhaseProfiler:
+    """Accumulates wall time and call counts per phase of a training loop.
+
+    Phases are timed by wrapping the functions that implement them (wrap() and
+    instrument()), so a loop that is not profiled runs unwrapped code and pays
+    nothing. Times are exclusive: a phase called from inside another phase, like
+    place_food inside GameLogic.step, is not counted twice.
+
+    Every snapshot is appended to a JSON-lines file, or written as a Prometheus
+    text-format file (replaced atomically) that a local scraper can read.
+    """
+
+    def __init__(self, output: Optional[str] = None, fmt: str = "jsonl") -> None:
+        """Set up empty counters.
+
+        Args:
+            output (Optional[str]): file snapshots are written to (None = keep them in memory only)
+            fmt (str): "jsonl" (one JSON object per snapshot) or "prometheus"
+
+        Returns: None
+        """
+        if fmt not in ("jsonl", "prometheus"):
+            raise ValueError(f"Unknown metrics format {fmt!r}")
+        self.output = output
+        self.fmt = fmt
+        self.seconds: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.calls: Dict[str, int] = {phase: 0 for phase in PHASES}
+        self.hits = 0
+        self.misses = 0
+        self.start_time = time.perf_counter()
+        # Time spent in nested phases, one entry per phase currently running
+        self._child_seconds: List[float] = []
+
+    def wrap(self, fn: Callable, phase: str) -> Callable:
+        """Return fn wrapped so that every call is timed as `phase`."""
+        seconds, calls, stack = self.seconds, self.calls, self._child_seconds
+        seconds.setdefault(phase, 0.0)
+        calls.setdefault(phase, 0)
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                children = stack.pop()
+                seconds[phase] += elapsed - children
+                calls[phase] += 1
+                if stack:
+                    stack[-1] += elapsed
+        return timed
+
+    def instrument(self, obj, method: str, phase: str) -> None:
+        """Replace obj.method (on this instance only) with a timed version."""
+        setattr(obj, method, self.wrap(getattr(obj, method), phase))
+
+    def instrument_game(self, game) -> None:
+        """Time a GameLogic instance's step (as "move") and place_food."""
+        self.instrument(game, "place_food", "place_food")
+        self.instrument(game, "step", "move")
+
+    def agent_hooks(self, agent) -> Tuple[Callable, Callable]:
+        """Return timed versions of an agent's choose_action and update_q_value.
+
+        The agent itself is left untouched (so it can still be pickled). The
+        returned choose_action also counts Q-table hits and misses: a hit is a
+        call for a state that already has a Q-table entry, as reported by
+        agent.has_state (so agents keyed by canonical states are asked about the
+        canonical state).
+
+        Returns:
+            Tuple[Callable, Callable]: (choose_action, update_q_value)
+        """
+        choose_action = self.wrap(agent.choose_action, "choose_action")
+        has_state = agent.has_state
+
+        def counted(state, epsilon):
+            if has_state(state):
+                self.hits += 1
+            else:
+                self.misses += 1
+            return choose_action(state, epsilon)
+
+        return counted, self.wrap(agent.update_q_value, "update_q_value")
+
+    def snapshot(self, episode: int, q_table_size: int) -> Dict:
+        """Return the counters so far (cumulative since the profiler was created) and write them out.
+
+        Args:
+            episode (int): number of finished episodes
+            q_table_size (int): number of states in the Q-table
+
+        Returns:
+            Dict: {'episode', 'elapsed', 'q_table_size', 'hits', 'misses', 'hit_rate',
+                   'phases' {phase: {'seconds', 'calls'}}}
+        """
+        lookups = self.hits + self.misses
+        snapshot = {
+            'episode': episode,
+            'elapsed': time.perf_counter() - self.start_time,
+            'q_table_size': q_table_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'phases': {phase: {'seconds': self.seconds[phase], 'calls': self.calls[phase]}
+                       for phase in self.seconds},
+        }
+
+        if self.output is not None:
+            if self.fmt == "jsonl":
+                with open(self.output, "a") as f:
+                    f.write(json.dumps(snapshot) + "\n")
+            else:
+                atomic_write(self.output, to_prometheus(snapshot).encode())
+        return snapshot
+
+
+def to_prometheus(snapshot: Dict) -> str:
+    """Format a PhaseProfiler snapshot in the Prometheus text exposition format."""
+    lines = [
+        "# HELP snake_phase_seconds_total Wall time spent in each training phase.",
+        "# TYPE snake_phase_seconds_total counter",
+    ]
+    lines += [f'snake_phase_seconds_total{{phase="{phase}"}} {stats["seconds"]:.6f}'
+              for phase, stats in snapshot['phases'].items()]
+    lines += [
+        "# HELP snake_phase_calls_total Calls of each training phase.",
+        "# TYPE snake_phase_calls_total counter",
+    ]
+    lines += [f'snake_phase_calls_total{{phase="{phase}"}} {stats["calls"]}'
+              for phase, stats in snapshot['phases'].items()]
+    for name, kind, help_text, value in [
+        ("snake_episodes_total", "counter", "Finished training episodes.", snapshot['episode']),
+        ("snake_q_table_states", "gauge", "States in the Q-table.", snapshot['q_table_size']),
+        ("snake_q_table_hits_total", "counter", "choose_action calls for states already in the Q-table.",
+         snapshot['hits']),
+        ("snake_q_table_misses_total", "counter", "choose_action calls for states not yet in the Q-table.",
+         snapshot['misses']),
+    ]:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def format_snapshot(snapshot: Dict) -> str:
+    """One-line summary of where the time went, largest phase first."""
+    total = sum(stats['seconds'] for stats in snapshot['phases'].values()) or 1.0
+    parts = [f"{phase} {100 * stats['seconds'] / total:.0f}%"
+             for phase, stats in sorted(snapshot['phases'].items(), key=lambda item: -item[1]['seconds'])
+             if stats['calls']]
+    return (f"Profile @ episode {snapshot['episode']}: {', '.join(parts)} | "
+            f"Q-table {snapshot['q_table_size']} states, hit rate {100 * snapshot['hit_rate']:.1f}%")
@@ -0,0 +1,153 @@
+"""Compiled greedy policies for Q-Learning Snake Game.
+
+A trained agent is turned into one byte per state: the index (into the action
+list) of its greedy action. States are numbered by StateIndex, like DenseQTable,
+so acting is one index() call and one array read, with no Q-values involved.
+
+Tie-breaking is deterministic: when several actions share the highest Q-value,
+the one that comes first in the action list wins (the same choice as play.py).
+When all actions tie, as in a state the agent never visited, the state gets
+NO_PREFERENCE instead and the caller decides (play.py then picks at random, like
+choose_action does).
+
+A compiled policy is saved as a magic number, a version, a JSON header (grid
+size, action list, number of states) and the byte array.
+"""
+
+import json
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .dense_q_table import StateIndex
+
+MAGIC = b"SNPL"
+VERSION = 1
+NO_PREFERENCE = 255
+_PREFIX = struct.Struct("<4sHI")
+
+
+class CompiledPolicy:
+    def __init__(self, grid_size: int, actions: List[str], policy: np.ndarray) -> None:
+        """Wrap a per-state action array.
+
+        Args:
+            grid_size (int): the size of the game grid
+            actions (List[str]): the action list the entries index into
+            policy (np.ndarray): uint8 action index per StateIndex state index
+
+        Returns: None
+        """
+        self.grid_size = grid_size
+        self.actions = list(actions)
+        self.policy = policy
+        # The state numbering is rebuilt rather than stored; it is the same in every process
+        self.index = StateIndex(grid_size)
+        if len(policy) != len(self.index):
+            raise ValueError(f"Policy has {len(policy)} entries, the {grid_size}x{grid_size} grid "
+                             f"has {len(self.index)} states")
+
+    def __len__(self) -> int:
+        return len(self.policy)
+
+    def action_index(self, state: Tuple) -> int:
+        """Return the greedy action's index into self.actions, or NO_PREFERENCE.
+
+        Args:
+            state (Tuple): (head_pos, head_dir, body_tuple, food_pos)
+
+        Returns:
+            int: the action index (NO_PREFERENCE for all-tied and invalid states)
+        """
+        i = self.index.index(state)
+        return NO_PREFERENCE if i < 0 else int(self.policy[i])
+
+    def act(self, state: Tuple) -> Optional[str]:
+        """Return the greedy action for a state, or None if the policy has no preference."""
+        a = self.action_index(state)
+        return None if a == NO_PREFERENCE else self.actions[a]
+
+    def save(self, path: str) -> None:
+        """Write the policy to a file (see the module docstring for the layout)."""
+        header = json.dumps({
+            "grid_size": self.grid_size,
+            "actions": self.actions,
+            "num_states": len(self.policy),
+            "tie_break": "first action in the action list",
+        }).encode()
+        with open(path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(self.policy.astype(np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledPolicy":
+        """Read a policy written by save().
+
+        Raises:
+            ValueError: if the file is not a compiled policy of a known version
+        """
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a compiled policy file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported policy file version {version}")
+            header = json.loads(f.read(header_len))
+            policy = np.frombuffer(f.read(header["num_states"]), dtype=np.uint8)
+        return cls(header["grid_size"], header["actions"], policy)
+
+
+def compile_policy(agent) -> CompiledPolicy:
+    """Compile an agent's current greedy policy.
+
+    Works with any agent whose get_q_value gives its Q-values (dict, dense,
+    symmetric or memory-mapped Q-tables).
+
+    Args:
+        agent (QLearningAgent): the trained agent
+
+    Returns:
+        CompiledPolicy: one greedy action per valid state of agent.grid_size
+    """
+    index = StateIndex(agent.grid_size)
+    policy = np.full(len(index), NO_PREFERENCE, dtype=np.uint8)
+    actions = list(agent.actions)
+
+    for i, state in enumerate(index.states()):
+        q_values = [agent.get_q_value(state, action) for action in actions]
+        max_q = max(q_values)
+        best = q_values.index(max_q)
+        # All actions tied: leave NO_PREFERENCE
+        if q_values.count(max_q) < len(q_values):
+            policy[i] = best
+
+    return CompiledPolicy(agent.grid_size, actions, policy)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from .q_learning_agent import QLearningAgent
+    from .q_table_file import QTableFile, infer_grid_size, load_q_table
+
+    parser = argparse.ArgumentParser(description="Compile a trained Q-table into a greedy policy file.")
+    parser.add_argument("q_table", help="trained Q-table (pickle or binary Q-table file)")
+    parser.add_argument("output", help="policy file to write")
+    parser.add_argument("--grid-size", type=int, default=None, help="grid size (inferred by default)")
+    args = parser.parse_args()
+
+    q_table = load_q_table(args.q_table)
+    grid_size = args.grid_size or (q_table.grid_size if isinstance(q_table, QTableFile) else infer_grid_size(q_table))
+    actions = q_table.actions if isinstance(q_table, QTableFile) else list(next(iter(q_table.values())))
+    agent = QLearningAgent(actions=actions, learning_rate=0.0, epsilon=0.0, grid_size=grid_size, num_episodes=0)
+    agent.q_table = q_table
+
+    start = time.perf_counter()
+    compiled = compile_policy(agent)
+    compiled.save(args.output)
+    decided = int(np.count_nonzero(compiled.policy != NO_PREFERENCE))
+    print(f"Compiled {len(compiled)} states ({decided} with a preferred action) "
+          f"in {time.perf_counter() - start:.2f}s -> {args.output}")
@@ -0,0 +1,253 @@
+"""Array-backed Q-table for Q-Learning Snake Game.
+
+Every valid state is ranked to a contiguous integer and its Q-values live in one
+row of a float32 NumPy array, instead of a per-state dict of floats.
+
+States that share the same snake (head_pos, head_dir, body_tuple) only differ in
+where the food is, so the index stores one entry per snake configuration: the
+offset of its first state and a bitmask of the body cells, packed into one int.
+The food's rank among the free cells is then added to that offset to get the
+state index. StateIndex holds only this numbering (for users that need state
+indices but no Q-values, like compiled policies); DenseQTable adds the values.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .generate_game_states import generate_shapes
+from .q_learning_agent import QLearningAgent
+
+
+class StateIndex:
+    def __init__(self, grid_size: int) -> None:
+        """Rank every valid state of the grid.
+
+        Args:
+            grid_size (int): the size of the game grid
+
+        Returns: None
+        """
+        self.grid_size = grid_size
+
+        # (head_pos, head_dir, body_tuple) -> offset of its first state << num_cells | body bitmask
+        self.num_cells = grid_size * grid_size
+        self._body_bits = (1 << self.num_cells) - 1
+        self._configurations: Dict[Tuple, int] = {}
+        self._keys: List[Tuple] = []
+        offsets = []
+
+        # Share one tuple object per cell between all keys to keep the index small
+        cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+
+        # Shapes come ordered and head pairs are sorted, so the ranking is the same in every process
+        num_states = 0
+        for placement, pairs in generate_shapes(grid_size).items():
+            # A snake covering the whole board leaves nowhere for food
+            length = len(placement)
+            if length == self.num_cells:
+                continue
+
+            body_tuple = tuple(cells[r * grid_size + c] for r, c in placement)
+            body_mask = 0
+            for r, c in placement:
+                body_mask |= 1 << (r * grid_size + c)
+
+            for (r, c), head_dir in sorted(pairs):
+                key = (cells[r * grid_size + c], head_dir, body_tuple)
+                self._configurations[key] = num_states << self.num_cells | body_mask
+                self._keys.append(key)
+                offsets.append(num_states)
+                num_states += self.num_cells - length
+
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self.num_states = num_states
+
+    def __len__(self) -> int:
+        return self.num_states
+
+    def __contains__(self, state: Tuple) -> bool:
+        return self.index(state) >= 0
+
+    def index(self, state: Tuple) -> int:
+        """Return the integer index of a state, or -1 if it is not a valid state.
+
+        Args:
+            state (Tuple): (head_pos, head_dir, body_tuple, food_pos)
+
+        Returns:
+            int: the state's index (its row in DenseQTable.values)
+        """
+        head_pos, head_dir, body_tuple, food_pos = state
+        entry = self._configurations.get((head_pos, head_dir, body_tuple))
+        if entry is None:
+            return -1
+
+        offset, body_mask = entry >> self.num_cells, entry & self._body_bits
+        food_cell = food_pos[0] * self.grid_size + food_pos[1]
+        if body_mask >> food_cell & 1:
+            return -1
+
+        # The food's rank among the free cells: its cell index minus body cells before it
+        return offset + food_cell - (body_mask & ((1 << food_cell) - 1)).bit_count()
+
+    def state_at(self, index: int) -> Tuple:
+        """Return the state stored at a given index (the inverse of index()).
+
+        Args:
+            index (int): a state index
+
+        Returns:
+            Tuple: (head_pos, head_dir, body_tuple, food_pos)
+        """
+        key = self._keys[int(np.searchsorted(self._offsets, index, side='right')) - 1]
+        entry = self._configurations[key]
+        offset, body_mask = entry >> self.num_cells, entry & self._body_bits
+
+        # Walk the free cells until reaching the food's rank
+        rank = index - offset
+        for cell in range(self.num_cells):
+            if not body_mask >> cell & 1:
+                if rank == 0:
+                    return key + (divmod(cell, self.grid_size),)
+                rank -= 1
+        raise IndexError(index)
+
+    def states(self):
+        """Yield every state in index order (the i-th state yielded is state_at(i))."""
+        cells = [divmod(cell, self.grid_size) for cell in range(self.num_cells)]
+        for key in self._keys:
+            body_mask = self._configurations[key] & self._body_bits
+            for cell in range(self.num_cells):
+                if not body_mask >> cell & 1:
+                    yield key + (cells[cell],)
+
+
+
+class DenseQTable(StateIndex):
+    def __init__(self, grid_size: int, actions: List[str]) -> None:
+        """Rank every valid state of the grid and allocate its Q-values.
+
+        Args:
+            grid_size (int): the size of the game grid
+            actions (List[str]): a list of possible actions (one column each)
+
+        Returns: None
+        """
+        super().__init__(grid_size)
+        self.actions = list(actions)
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+        self.values = np.zeros((self.num_states, len(self.actions)), dtype=np.float32)
+
+    def get(self, state: Tuple, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Return a state's Q-values as an {action: q} dict, like the dict Q-table."""
+        i = self.index(state)
+        if i < 0:
+            return default
+        return dict(zip(self.actions, self.values[i].tolist()))
+
+    def greedy_actions(self, indices: np.ndarray) -> np.ndarray:
+        """Return the best action column for each of a batch of state indices.
+
+        Ties go to the first action in self.actions.
+
+        Args:
+            indices (np.ndarray): state indices
+
+        Returns:
+            np.ndarray: action indices into self.actions
+        """
+        return np.argmax(self.values[indices], axis=1)
+
+    def load_dict(self, q_table: Dict) -> None:
+        """Copy the Q-values of a {state: {action: q}} dict Q-table into this table.
+
+        States that are not valid on this grid are skipped; actions missing from a
+        state's dict keep their current value.
+        """
+        for state, action_values in q_table.items():
+            i = self.index(state)
+            if i >= 0:
+                for action, q in action_values.items():
+                    self.values[i, self.action_index[action]] = q
+
+    def to_dict(self) -> Dict:
+        """Convert to the {state: {action: q}} dict used by QLearningAgent.q_table."""
+        return {self.state_at(i): dict(zip(self.actions, row)) for i, row in enumerate(self.values.tolist())}
+
+
+class DenseQLearningAgent(QLearningAgent):
+    """QLearningAgent whose Q-table is a DenseQTable instead of a dict of dicts.
+
+    The get_q_value / choose_action / update_q_value interface is unchanged.
+    """
+
+    def set_q_table(self, lazy: bool = False) -> DenseQTable:
+        """Start from a fresh Q-table.
+
+        Args:
+            lazy (bool): ignored; every valid state always has a row in the dense table
+
+        Returns:
+            DenseQTable: the new Q-table, with every value set to default_q_value
+        """
+        self.q_table = DenseQTable(self.grid_size, self.actions)
+        self.q_table.values.fill(self.default_q_value)
+        return self.q_table
+
+    def coverage(self) -> Tuple[int, int]:
+        """Report how many valid states have been visited.
+
+        Every state has a row from the start, so a state counts as visited once any
+        of its Q-values differs from default_q_value. This also holds for tables
+        loaded from a file; an update that lands exactly on the default is missed.
+
+        Returns:
+            Tuple[int, int]: (visited states, total number of valid states)
+        """
+        visited = np.count_nonzero((self.q_table.values != self.default_q_value).any(axis=1))
+        return int(visited), len(self.q_table)
+
+    def get_q_value(self, state: Tuple, action: str) -> float:
+        i = self.q_table.index(state)
+        if i < 0:
+            return self.default_q_value
+        return self.q_table.values[i, self.q_table.action_index[action]].item()
+
+    def choose_action(self, state: Tuple, epsilon: float) -> str:
+        # Epsilon-greedy action selection
+        if random.uniform(0,1) < epsilon:
+            return random.choice(self.actions)
+
+        i = self.q_table.index(state)
+        if i < 0:
+            return random.choice(self.actions)
+
+        # In case of multiple actions with the same max q-value, choose randomly among them
+        state_actions = self.q_table.values[i].tolist()
+        max_q = max(state_actions)
+        best_actions = [action for action, q in zip(self.actions, state_actions) if q == max_q]
+        return random.choice(best_actions)
+
+    def update_q_value(self, state: Tuple, action: str, reward: int, next_state: Tuple) -> float:
+        """Update the Q-value for a given state-action pair (see QLearningAgent.update_q_value).
+
+        Raises:
+            KeyError: if state is not a valid state of the grid
+        """
+        i = self.q_table.index(state)
+        if i < 0:
+            raise KeyError(state)
+        a = self.q_table.action_index[action]
+
+        j = self.q_table.index(next_state)
+        max_future_q = max(self.q_table.values[j].tolist()) if j >= 0 else self.default_q_value
+
+        # Q-learning formula
+        current_q_value = self.q_table.values[i, a].item()
+        new_q_value = current_q_value + self.learning_rate * (reward + max_future_q - current_q_value)
+
+        # Update the Q-table (stored as float32)
+        self.q_table.values[i, a] = new_q_value
+        return self.q_table.values[i, a].item()
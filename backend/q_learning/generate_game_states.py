@@ -5,6 +5,7 @@ on a grid of any size. States are represented as tuples of:
 (head_position, head_direction, body_tuple, food_position)
 """
 
+import sys
 from typing import List, Tuple, Set, Dict
 
 
@@ -104,10 +105,12 @@ def head_dir_pairs_for_placement(shape_cells: List[Tuple[int, int]], grid_size:
     
     def dfs(path):
         """Recursive DFS to build paths through the shape cells."""
-        # If the path covers all shape cells, record the head and direction
+        # If the path covers all shape cells, record the head and the direction it
+        # faces, i.e. the direction of travel from the second cell into the head
+        # (the same convention as get_current_direction)
         if len(path) == len(shape_cells):
             head, second = path[0], path[1]
-            pairs.add((head, dir_from(head, second)))
+            pairs.add((head, dir_from(second, head)))
             return
         
         # If not complete, extend the path
@@ -123,40 +126,329 @@ def head_dir_pairs_for_placement(shape_cells: List[Tuple[int, int]], grid_size:
     return pairs
 
 
-def generate_all_valid_states(grid_size: int, actions: List[str]) -> Dict:
+HEAD_DIRECTIONS = ['upward', 'downward', 'leftward', 'rightward']
+
+
+def _adjacency(grid_size: int) -> List[List[Tuple[int, int]]]:
+    """For each flat cell index: (neighbor, index of the direction from the neighbor into the cell)."""
+    adjacency = []
+    for cell in range(grid_size * grid_size):
+        r, c = divmod(cell, grid_size)
+        adjacency.append([
+            (nr * grid_size + nc, HEAD_DIRECTIONS.index(dir_from((nr, nc), (r, c))))
+            for nr, nc in neighbors((r, c), grid_size)
+        ])
+    return adjacency
+
+
+def _shape_table_from(starts: List[int], grid_size: int) -> Dict[int, int]:
+    """Find every snake shape whose head is on one of the given cells.
+    
+    Every ordering of a snake's cells from head to tail is a self-avoiding walk,
+    so one backtracking search over walks from each start cell finds all shapes
+    and, in the same pass, every (head, direction) pair each shape allows. Cells
+    are bits of an int, so the visited set is extended and undone for free.
+    
+    Args:
+        starts: flat indices (row * grid_size + col) of the head cells to search from
+        grid_size: size of the grid
+        
+    Returns:
+        Dict[int, int]: {body bitmask: pair bitmask}, where bit 4 * head + d is set
+                        when the head can sit on cell `head` facing HEAD_DIRECTIONS[d]
+    """
+    adjacency = _adjacency(grid_size)
+    shapes = {}
+    
+    def extend(tail, mask, pair_bit):
+        # The head and its direction are fixed once the second cell is chosen
+        shapes[mask] = shapes.get(mask, 0) | pair_bit
+        for nb, _ in adjacency[tail]:
+            bit = 1 << nb
+            if not mask & bit:
+                extend(nb, mask | bit, pair_bit)
+    
+    for start in starts:
+        # Special-case single cell: any facing is valid
+        shapes[1 << start] = shapes.get(1 << start, 0) | (0b1111 << (4 * start))
+        for second, direction in adjacency[start]:
+            extend(second, (1 << start) | (1 << second), 1 << (4 * start + direction))
+    
+    return shapes
+
+
+def generate_shapes(grid_size: int, processes: int = 1) -> Dict[Tuple, Set]:
+    """Generate every snake shape with its valid (head_pos, head_dir) pairs.
+    
+    This gives the same result as calling head_dir_pairs_for_placement on every
+    placement from generate_connected_placements, for all lengths at once.
+    
+    Args:
+        grid_size: size of the grid
+        processes: number of worker processes; the search is split by head cell
+        
+    Returns:
+        Dict[Tuple, Set]: {body_tuple: {(head_pos, head_dir), ...}}, ordered by
+                          snake length and then body_tuple
+    """
+    num_cells = grid_size * grid_size
+    
+    if processes > 1:
+        from multiprocessing import Pool
+        with Pool(processes) as pool:
+            parts = pool.starmap(_shape_table_from, [([start], grid_size) for start in range(num_cells)])
+        table = {}
+        for part in parts:
+            for mask, pair_bits in part.items():
+                table[mask] = table.get(mask, 0) | pair_bits
+    else:
+        table = _shape_table_from(list(range(num_cells)), grid_size)
+    
+    cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+    bodies = []
+    for mask, pair_bits in table.items():
+        # Lowest bit first, so cells come out in row-major (= sorted) order
+        body_tuple = tuple(cells[bit] for bit in _set_bits(mask))
+        bodies.append((len(body_tuple), body_tuple, pair_bits))
+    bodies.sort()
+    
+    return {
+        body_tuple: {(cells[bit >> 2], HEAD_DIRECTIONS[bit & 3]) for bit in _set_bits(pair_bits)}
+        for _, body_tuple, pair_bits in bodies
+    }
+
+
+def _set_bits(mask: int):
+    """Yield the indices of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _shape_layers(grid_size: int, max_length: int = None):
+    """Yield the snake shapes of each length in turn, keeping only one length in memory.
+    
+    This is a dynamic program over (body bitmask, tail cell): every snake of
+    length L + 1 is a snake of length L grown by one cell at its tail, and which
+    (head, direction) pairs a body allows only depends on the cells and the tail
+    the walk ended on, not on the order of the cells in between. Walks that end
+    on the same cells and the same tail are merged, so the work grows with the
+    number of distinct (body, tail) pairs instead of the number of walks.
+    
+    Args:
+        grid_size: size of the grid
+        max_length: stop after this snake length (default: the whole board)
+        
+    Yields:
+        Tuple[int, Dict[int, int]]: (length, {body bitmask: pair bitmask}), with the
+                                    pair bitmask laid out as in _shape_table_from
+    """
+    num_cells = grid_size * grid_size
+    max_length = num_cells if max_length is None else min(max_length, num_cells)
+    adjacency = _adjacency(grid_size)
+    tail_bits = (num_cells - 1).bit_length()
+    tail_mask = (1 << tail_bits) - 1
+    
+    # Special-case single cell: any facing is valid
+    yield 1, {1 << cell: 0b1111 << (4 * cell) for cell in range(num_cells)}
+    
+    # Frontier: body bitmask << tail_bits | tail -> (head, direction) pairs of the walks ending there
+    frontier = {}
+    for start in range(num_cells):
+        for second, direction in adjacency[start]:
+            frontier[((1 << start) | (1 << second)) << tail_bits | second] = 1 << (4 * start + direction)
+    
+    for length in range(2, max_length + 1):
+        shapes = {}
+        for key, pair_bits in frontier.items():
+            mask = key >> tail_bits
+            shapes[mask] = shapes.get(mask, 0) | pair_bits
+        yield length, shapes
+        
+        if length == max_length:
+            return
+        
+        # Grow every walk by one cell at its tail
+        grown = {}
+        for key, pair_bits in frontier.items():
+            mask = key >> tail_bits
+            for nb, _ in adjacency[key & tail_mask]:
+                bit = 1 << nb
+                if not mask & bit:
+                    new_key = (mask | bit) << tail_bits | nb
+                    grown[new_key] = grown.get(new_key, 0) | pair_bits
+        frontier = grown
+
+
+def iter_valid_states(grid_size: int, length: int = None):
+    """Yield every valid game state one at a time, without building the state table.
+    
+    Yields the same states as generate_all_valid_states, ordered by snake length,
+    body_tuple, head and food. Only the snake shapes of the current length are
+    held in memory.
+    
+    Args:
+        grid_size: size of the grid
+        length: only yield states with a snake of this length
+        
+    Yields:
+        Tuple: (head_pos, head_dir, body_tuple, food_pos)
+    """
+    num_cells = grid_size * grid_size
+    cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+    
+    for snake_length, shapes in _shape_layers(grid_size, length):
+        if length is not None and snake_length != length:
+            continue
+        
+        # Lowest bit first, so cells come out in row-major (= sorted) order
+        bodies = sorted((tuple(cells[bit] for bit in _set_bits(mask)), mask, pair_bits)
+                        for mask, pair_bits in shapes.items())
+        for body_tuple, mask, pair_bits in bodies:
+            pairs = sorted((cells[bit >> 2], HEAD_DIRECTIONS[bit & 3]) for bit in _set_bits(pair_bits))
+            foods = [cells[cell] for cell in range(num_cells) if not mask >> cell & 1]
+            for head_pos, head_dir in pairs:
+                for food_pos in foods:
+                    yield (head_pos, head_dir, body_tuple, food_pos)
+
+
+def count_states_per_length(grid_size: int, max_length: int = None) -> Dict[int, int]:
+    """Count the valid states for each snake length without generating any state.
+    
+    Gives the same result as count_states_by_length(generate_all_valid_states(...)),
+    but only walks the snake shapes (see _shape_layers), never the states or the
+    food positions. The shapes of one length still have to fit in memory, so on
+    6x6 and larger grids use max_length to stop before the long snakes.
+    
+    Args:
+        grid_size: size of the grid
+        max_length: only count snakes up to this length (default: the whole board)
+        
+    Returns:
+        Dict[int, int]: {length: count, ...}
+    """
+    num_cells = grid_size * grid_size
+    
+    # Each (head, direction) pair can have the food on any cell off the body, so a
+    # snake covering the whole board has no states
+    if max_length is None or max_length >= num_cells:
+        max_length = num_cells - 1
+    return {
+        length: sum(pair_bits.bit_count() for pair_bits in shapes.values()) * (num_cells - length)
+        for length, shapes in _shape_layers(grid_size, max_length)
+    }
+
+
+def projected_q_table_memory(length_counts: Dict[int, int], num_actions: int) -> Dict[str, int]:
+    """Estimate how much memory a Q-table for the given states would take.
+    
+    The dict estimate covers the {state: {action: q}} table built by
+    generate_all_valid_states once every Q-value has been updated (so each value
+    is its own float object); cell, direction and body tuples are shared between
+    states and left out. The dense estimate is the float32 value matrix of
+    DenseQTable.
+    
+    Args:
+        length_counts: {length: count, ...}, e.g. from count_states_per_length
+        num_actions: number of actions per state
+        
+    Returns:
+        Dict[str, int]: {'states': ..., 'dict_bytes': ..., 'dense_bytes': ...}
+    """
+    num_states = sum(length_counts.values())
+    
+    # Per state: a slot in the outer dict, the key tuple, the action dict and its floats
+    outer_slot = sys.getsizeof(dict.fromkeys(range(1 << 16))) / (1 << 16)
+    key_tuple = sys.getsizeof((None, None, None, None))
+    action_dict = sys.getsizeof({i: 0.0 for i in range(num_actions)})
+    per_state = outer_slot + key_tuple + action_dict + num_actions * sys.getsizeof(0.0)
+    
+    return {
+        'states': num_states,
+        'dict_bytes': int(num_states * per_state),
+        'dense_bytes': num_states * num_actions * 4,
+    }
+
+
+def generate_all_valid_states(grid_size: int, actions: List[str], initial_value: float = 0.0,
+                              canonical_only: bool = False, processes: int = 1) -> Dict:
     """Generate all valid game states for a given grid size.
     
     Args:
         grid_size: size of the grid
         actions: list of available actions (used to initialize Q-values)
+        initial_value: the Q-value every state-action pair starts with
+        canonical_only: keep only one representative per rotation/reflection orbit
+                        (see q_learning.symmetry)
+        processes: number of worker processes used to search for snake shapes
         
     Returns:
-        Dict: dictionary mapping states to action dictionaries initialized to 0.0
+        Dict: dictionary mapping states to action dictionaries initialized to initial_value
               Format: {(head_pos, head_dir, body_tuple, food_pos): {action: 0.0, ...}, ...}
     """
     game_states = {}
-    food_positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
     
-    for length in range(1, grid_size * grid_size + 1):
-        placements = generate_connected_placements(length, grid_size)
-        
-        for placement in placements:
-            pairs = head_dir_pairs_for_placement(placement, grid_size)
-            
-            for head_pos, head_dir in pairs:
-                body_tuple = tuple(placement)
-                
-                for food_pos in food_positions:
-                    if food_pos not in placement:
-                        state = (head_pos, head_dir, body_tuple, food_pos)
-                        game_states[state] = {action: 0.0 for action in actions}
+    for state in _iter_states(grid_size, canonical_only, processes):
+        game_states[state] = {action: initial_value for action in actions}
     
     return game_states
 
 
+def count_valid_states(grid_size: int, canonical_only: bool = False, processes: int = 1) -> int:
+    """Count the valid game states for a given grid size without storing them.
+    
+    Args:
+        grid_size: size of the grid
+        canonical_only: count one representative per rotation/reflection orbit
+        processes: number of worker processes used to search for snake shapes
+        
+    Returns:
+        int: the number of keys generate_all_valid_states would return
+    """
+    if canonical_only:
+        return sum(1 for _ in _iter_states(grid_size, canonical_only=True, processes=processes))
+    
+    num_cells = grid_size * grid_size
+    
+    # Each (head, direction) pair can have the food on any cell off the body
+    return sum(
+        len(pairs) * (num_cells - len(placement))
+        for placement, pairs in generate_shapes(grid_size, processes).items()
+    )
+
+
+def _iter_states(grid_size: int, canonical_only: bool = False, processes: int = 1):
+    """Yield every valid state (optionally only canonical ones), one at a time."""
+    if canonical_only:
+        from .symmetry import is_canonical, placement_stabilizer
+    
+    food_positions = [(x, y) for x in range(grid_size) for y in range(grid_size)]
+    
+    for placement, pairs in generate_shapes(grid_size, processes).items():
+        # A canonical state has a canonical body, so other bodies can be skipped
+        # whole; the rest only need comparing against the body's own symmetries
+        if canonical_only:
+            stabilizer = placement_stabilizer(placement, grid_size)
+            if stabilizer is None:
+                continue
+        
+        occupied = set(placement)
+        for head_pos, head_dir in pairs:
+            for food_pos in food_positions:
+                if food_pos not in occupied:
+                    state = (head_pos, head_dir, placement, food_pos)
+                    if canonical_only and stabilizer and not is_canonical(state, grid_size, stabilizer):
+                        continue
+                    yield state
+
+
 def count_states_by_length(game_states: Dict) -> Dict[int, int]:
     """Count the number of valid states for each snake length.
     
+    This needs the whole state table; count_states_per_length gets the same counts
+    from the grid size alone.
+    
     Args:
         game_states: dictionary of game states
         
@@ -171,3 +463,27 @@ def count_states_by_length(game_states: Dict) -> Dict[int, int]:
     
     return length_counts
 
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Count valid states and project Q-table memory per grid size.")
+    parser.add_argument("grid_sizes", type=int, nargs="+", help="grid sizes to count")
+    parser.add_argument("--max-length", type=int, default=None,
+                        help="only count snakes up to this length (needed on 6x6 and larger)")
+    parser.add_argument("--num-actions", type=int, default=4, help="actions per state")
+    args = parser.parse_args()
+    
+    for grid_size in args.grid_sizes:
+        length_counts = {}
+        print(f"{grid_size}x{grid_size} grid")
+        print("=" * 40)
+        for length, count in count_states_per_length(grid_size, args.max_length).items():
+            length_counts[length] = count
+            print(f"Length {length}: {count} states", flush=True)
+        memory = projected_q_table_memory(length_counts, args.num_actions)
+        print("=" * 40)
+        print(f"Total: {memory['states']} states")
+        print(f"Dict Q-table: ~{memory['dict_bytes'] / 2**20:.1f} MiB, "
+              f"dense float32: {memory['dense_bytes'] / 2**20:.1f} MiB\n")
@@ -5,6 +5,9 @@ DIRECTIONS = {
     'rightward': (0, 1)
 }
 
+# Absolute direction (dr, dc) -> its name in the state tuple
+DIRECTION_NAMES = {delta: name for name, delta in DIRECTIONS.items()}
+
 def get_current_direction(snake_positions):
     """Determine snake's current direction from head and neck position."""
     if len(snake_positions) < 2:
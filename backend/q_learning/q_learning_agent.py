@@ -1,6 +1,6 @@
 import random
 from typing import Dict, Tuple
-from .generate_game_states import generate_all_valid_states
+from .generate_game_states import count_valid_states, generate_all_valid_states
 
 
 class QLearningAgent:
@@ -13,7 +13,8 @@ class QLearningAgent:
                  learning_rate: float,
                  epsilon: float,
                  grid_size: int,
-                 num_episodes: int):
+                 num_episodes: int,
+                 default_q_value: float = 0.0):
         """Define the attributes of the learning agent
 
         Args:
@@ -22,6 +23,7 @@ class QLearningAgent:
             epsilon (float): the probability of choosing a random action (exploration)
             grid_size (int): the size of the game grid
             num_episodes (int): the number of training episodes
+            default_q_value (float): the q-value of state-action pairs that were never updated
         
         Returns: None
         """
@@ -31,19 +33,45 @@ class QLearningAgent:
         self.actions = actions
         self.grid_size = grid_size
         self.num_episodes = num_episodes
+        self.default_q_value = default_q_value
+        self._num_valid_states = None
     
-    def set_q_table(self) -> Dict:
-        # Initialize the Q-table with all valid game states.
-        self.q_table = generate_all_valid_states(self.grid_size, self.actions)
-        
-        # Create a Q-table with all the state-action pairs initialized to 0.0
-        for action in self.actions:
-            for state in self.q_table:
-                self.q_table[state][action] = 0.0
+    def set_q_table(self, lazy: bool = False) -> Dict:
+        """Start from a fresh Q-table.
+
+        Args:
+            lazy (bool): if True, start empty and add each state the first time it is
+                updated; otherwise create every valid game state up front
+
+        Returns:
+            Dict: the new Q-table
+        """
+        if lazy:
+            # Unvisited states read as default_q_value, exactly like untouched eager entries
+            self.q_table = {}
+        else:
+            # Create a Q-table with all the state-action pairs initialized to default_q_value
+            self.q_table = generate_all_valid_states(self.grid_size, self.actions, self.default_q_value)
         return self.q_table
+
+    def coverage(self) -> Tuple[int, int]:
+        """Report how many valid states have a Q-table entry.
+
+        With a lazy Q-table these are the states visited so far.
+
+        Returns:
+            Tuple[int, int]: (states in the Q-table, total number of valid states)
+        """
+        if self._num_valid_states is None:
+            self._num_valid_states = count_valid_states(self.grid_size)
+        return len(self.q_table), self._num_valid_states
     
+    def has_state(self, state: Tuple) -> bool:
+        """Check whether the Q-table has an entry for a state (as the agent looks it up)."""
+        return state in self.q_table
+
     def get_q_value(self, state: Tuple, action: str) -> float:
-        return self.q_table.get(state, {}).get(action, 0.0)
+        return self.q_table.get(state, {}).get(action, self.default_q_value)
     
     def choose_action(self, state: Tuple, epsilon: float) -> str:
         # Epsilon-greedy action selection
@@ -53,8 +81,9 @@ class QLearningAgent:
             # Get all the q-values (state-action) for the current state
             state_actions = self.q_table.get(state, {})
             
-            # Select the action with the highest q-value
-            max_q = max(state_actions.values(), default=0.0)
+            # Select the action with the highest q-value (an unvisited state has all-equal
+            # q-values, so it falls through to a uniformly random action below)
+            max_q = max(state_actions.values(), default=self.default_q_value)
             
             # In case of multiple actions with the same max q-value, choose randomly among them
             best_actions = [action for action, q in state_actions.items() if q == max_q]
@@ -71,10 +100,10 @@ class QLearningAgent:
         """
         # Initialize state in Q-table if not present
         if state not in self.q_table:
-            self.q_table[state] = {a: 0.0 for a in self.actions}
+            self.q_table[state] = {a: self.default_q_value for a in self.actions}
         
         current_q_value = self.get_q_value(state, action)
-        max_future_q = max(self.q_table.get(next_state, {}).values(), default=0.0)
+        max_future_q = max(self.q_table.get(next_state, {}).values(), default=self.default_q_value)
     
         # Q-learning formula
         new_q_value = current_q_value + self.learning_rate * (reward + max_future_q - current_q_value)
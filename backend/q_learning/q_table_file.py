@@ -0,0 +1,272 @@
+"""Memory-mapped binary Q-table files for Q-Learning Snake Game.
+
+A Q-table is stored as one file that can be opened with mmap instead of being
+unpickled, so opening it takes milliseconds and the Q-values are only read from
+disk as they are looked up. The layout is:
+
+    magic (4 bytes) | version (uint16) | header length (uint32) | JSON header
+    state keys: sorted uint64 array, one per state
+    Q-values: [num_states, num_actions] matrix, one row per key
+
+The JSON header holds the grid size, the action list (one column each), the
+state key encoding, the value dtype, the number of states and the byte offsets
+of both arrays, which are aligned to 64 bytes.
+
+State keys use the "body-mask" encoding. From the least significant bits up:
+
+    head cell | head direction (2 bits) | food cell | body bitmask
+
+Cells are flat indices (row * grid_size + col) and directions are numbered like
+state_encoding.DIRECTION_CODES. A tuple state has a sorted body, so the bitmask
+describes it exactly. Keys fit in 64 bits up to a 7x7 grid.
+"""
+
+import json
+import os
+import pickle
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .state_encoding import DIRECTION_CODES, DIRECTION_INDEX, field_widths
+
+MAGIC = b"SNQT"
+VERSION = 1
+ENCODING = "body-mask"
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sHI")
+
+
+def state_key(state: Tuple, grid_size: int) -> int:
+    """Pack a (head_pos, head_dir, body_tuple, food_pos) state into its file key.
+
+    Args:
+        state: (head_pos, head_dir, body_tuple, food_pos)
+        grid_size: size of the grid
+
+    Returns:
+        int: the body-mask key of the state
+    """
+    cell_bits, _ = field_widths(grid_size)
+    head_pos, head_dir, body_tuple, food_pos = state
+
+    body_mask = 0
+    for r, c in body_tuple:
+        body_mask |= 1 << (r * grid_size + c)
+
+    key = body_mask
+    key = key << cell_bits | (food_pos[0] * grid_size + food_pos[1])
+    key = key << 2 | DIRECTION_INDEX[head_dir]
+    key = key << cell_bits | (head_pos[0] * grid_size + head_pos[1])
+    return key
+
+
+def key_state(key: int, grid_size: int) -> Tuple:
+    """Unpack a file key into a (head_pos, head_dir, body_tuple, food_pos) state (the inverse of state_key)."""
+    cell_bits, _ = field_widths(grid_size)
+    cell_mask = (1 << cell_bits) - 1
+
+    head_pos = divmod(key & cell_mask, grid_size)
+    key >>= cell_bits
+    head_dir = DIRECTION_CODES[key & 3]
+    key >>= 2
+    food_pos = divmod(key & cell_mask, grid_size)
+    body_mask = key >> cell_bits
+
+    body_tuple = tuple(divmod(cell, grid_size) for cell in range(grid_size * grid_size) if body_mask >> cell & 1)
+    return (head_pos, head_dir, body_tuple, food_pos)
+
+
+def infer_grid_size(q_table: Dict) -> int:
+    """Find the smallest grid that holds every cell mentioned in a dict Q-table's states."""
+    max_rc = 0
+    for head_pos, _, body_tuple, food_pos in q_table:
+        max_rc = max(max_rc, *head_pos, *food_pos, *(rc for cell in body_tuple for rc in cell))
+    return max_rc + 1
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_q_table(q_table: Dict,
+                 path: str,
+                 grid_size: Optional[int] = None,
+                 actions: Optional[List[str]] = None,
+                 dtype: str = "float64") -> None:
+    """Write a {state: {action: q}} Q-table as a binary Q-table file.
+
+    Args:
+        q_table: the dict Q-table, e.g. QLearningAgent.q_table
+        path: file to write
+        grid_size: size of the grid; inferred from the states if not given
+        actions: column order of the Q-values; defaults to the action order of the first state
+        dtype: NumPy dtype of the stored Q-values ("float64" keeps dict values exact)
+
+    Returns: None
+
+    Raises:
+        ValueError: if the grid is too large for 64-bit keys
+    """
+    if grid_size is None:
+        grid_size = infer_grid_size(q_table) if q_table else 1
+    if actions is None:
+        actions = list(next(iter(q_table.values()), {}))
+
+    cell_bits, _ = field_widths(grid_size)
+    if grid_size * grid_size + 2 * cell_bits + 2 > 64:
+        raise ValueError(f"A {grid_size}x{grid_size} grid does not fit 64-bit state keys")
+
+    keys = np.fromiter((state_key(state, grid_size) for state in q_table), dtype=np.uint64, count=len(q_table))
+    values = np.array([[action_values[a] for a in actions] for action_values in q_table.values()],
+                      dtype=dtype).reshape(len(q_table), len(actions))
+
+    # Rows are stored sorted by key so lookups are a binary search
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+
+    header = {
+        "grid_size": grid_size,
+        "actions": list(actions),
+        "encoding": ENCODING,
+        "dtype": np.dtype(dtype).str,
+        "num_states": len(keys),
+    }
+    # The offsets depend on the header's own length, so size it with placeholders first
+    header_len = len(json.dumps({**header, "keys_offset": 0, "values_offset": 0}).encode()) + 40
+    header["keys_offset"] = _aligned(_PREFIX.size + header_len)
+    header["values_offset"] = _aligned(header["keys_offset"] + keys.nbytes)
+    header_bytes = json.dumps(header).encode().ljust(header_len)
+
+    with open(path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, header_len))
+        f.write(header_bytes)
+        f.seek(header["keys_offset"])
+        keys.tofile(f)
+        f.seek(header["values_offset"])
+        values.tofile(f)
+
+
+def is_q_table_file(path: str) -> bool:
+    """Check whether a file starts like a binary Q-table file."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class QTableFile:
+    """A read-only, memory-mapped binary Q-table.
+
+    It answers get() like a dict Q-table, so it can be assigned to
+    QLearningAgent.q_table for greedy play and evaluation.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a binary Q-table file without reading its arrays.
+
+        Args:
+            path (str): file written by save_q_table
+
+        Returns: None
+
+        Raises:
+            ValueError: if the file is not a binary Q-table file of a known version
+        """
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a binary Q-table file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported Q-table file version {version}")
+            header = json.loads(f.read(header_len))
+        if header["encoding"] != ENCODING:
+            raise ValueError(f"Unsupported state key encoding {header['encoding']!r}")
+
+        self.path = path
+        self.grid_size = header["grid_size"]
+        self.actions = header["actions"]
+        num_states = header["num_states"]
+
+        # An empty file region cannot be mapped, so an empty table gets plain empty arrays
+        if num_states:
+            self.keys = np.memmap(path, dtype=np.uint64, mode="r",
+                                  offset=header["keys_offset"], shape=(num_states,))
+            self.values = np.memmap(path, dtype=np.dtype(header["dtype"]), mode="r",
+                                    offset=header["values_offset"], shape=(num_states, len(self.actions)))
+        else:
+            self.keys = np.zeros(0, dtype=np.uint64)
+            self.values = np.zeros((0, len(self.actions)), dtype=np.dtype(header["dtype"]))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, state: Tuple) -> bool:
+        return self.index(state) >= 0
+
+    def index(self, state: Tuple) -> int:
+        """Return the row of a state in self.values, or -1 if the table has no entry for it."""
+        key = state_key(state, self.grid_size)
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i < len(self.keys) and int(self.keys[i]) == key:
+            return i
+        return -1
+
+    def get(self, state: Tuple, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Return a state's Q-values as an {action: q} dict, like the dict Q-table."""
+        i = self.index(state)
+        if i < 0:
+            return default
+        return dict(zip(self.actions, self.values[i].tolist()))
+
+    def to_dict(self) -> Dict:
+        """Read the whole table into the {state: {action: q}} dict used by QLearningAgent.q_table."""
+        return {
+            key_state(key, self.grid_size): dict(zip(self.actions, row))
+            for key, row in zip(self.keys.tolist(), self.values.tolist())
+        }
+
+
+def load_q_table(path: str):
+    """Open a Q-table saved either as a binary Q-table file or as a pickle.
+
+    Args:
+        path: the Q-table file
+
+    Returns:
+        QTableFile or Dict: the memory-mapped table, or the unpickled dict
+    """
+    if is_q_table_file(path):
+        return QTableFile(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def pickle_to_binary(pickle_path: str, path: str, grid_size: Optional[int] = None, dtype: str = "float64") -> None:
+    """Convert a pickled dict Q-table (e.g. trained_q_table.pkl) to a binary Q-table file."""
+    with open(pickle_path, "rb") as f:
+        q_table = pickle.load(f)
+    save_q_table(q_table, path, grid_size=grid_size, dtype=dtype)
+
+
+def binary_to_pickle(path: str, pickle_path: str) -> None:
+    """Convert a binary Q-table file back to a pickled dict Q-table."""
+    with open(pickle_path, "wb") as f:
+        pickle.dump(QTableFile(path).to_dict(), f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert Q-tables between pickle and the binary file format.")
+    parser.add_argument("direction", choices=["to-binary", "to-pickle"])
+    parser.add_argument("source", help="Q-table to read")
+    parser.add_argument("destination", help="Q-table to write")
+    parser.add_argument("--grid-size", type=int, default=None, help="grid size (to-binary; inferred by default)")
+    parser.add_argument("--dtype", default="float64", help="Q-value dtype (to-binary)")
+    args = parser.parse_args()
+
+    if args.direction == "to-binary":
+        pickle_to_binary(args.source, args.destination, grid_size=args.grid_size, dtype=args.dtype)
+    else:
+        binary_to_pickle(args.source, args.destination)
+    print(f"Wrote {args.destination} ({os.path.getsize(args.destination)} bytes)")
@@ -0,0 +1,160 @@
+"""Experience replay for Q-Learning Snake Game.
+
+Transitions are kept in a fixed-capacity ring buffer of preallocated NumPy
+arrays, as DenseQTable state indices, so old experience can be replayed in
+minibatches instead of being used once and thrown away. The buffer's memory use
+is fixed when it is created.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .dense_q_table import DenseQLearningAgent, DenseQTable
+
+
+class ReplayBuffer:
+    def __init__(self, capacity: int, seed: Optional[int] = None) -> None:
+        """Allocate room for `capacity` transitions.
+
+        Args:
+            capacity (int): maximum number of transitions; the oldest are overwritten first
+            seed (Optional[int]): seed for minibatch sampling
+
+        Returns: None
+        """
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.num_added = 0
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the transition arrays."""
+        return sum(a.nbytes for a in (self.states, self.actions, self.rewards, self.next_states, self.dones))
+
+    def add(self, state: int, action: int, reward: float, next_state: int, done: bool) -> None:
+        """Store one transition, overwriting the oldest one when the buffer is full.
+
+        Args:
+            state (int): DenseQTable index of the state
+            action (int): column of the action taken
+            reward (float): reward received
+            next_state (int): DenseQTable index of the resulting state
+            done (bool): whether the game ended with this transition
+
+        Returns: None
+        """
+        i = self._next
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self._next = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.num_added += 1
+
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, ...]:
+        """Draw a minibatch of stored transitions uniformly, with replacement.
+
+        Returns:
+            Tuple[np.ndarray, ...]: (states, actions, rewards, next_states, dones)
+        """
+        i = self.rng.integers(0, self._size, size=batch_size)
+        return self.states[i], self.actions[i], self.rewards[i], self.next_states[i], self.dones[i]
+
+
+def batched_q_update(q_table: DenseQTable,
+                     states: np.ndarray,
+                     actions: np.ndarray,
+                     rewards: np.ndarray,
+                     next_states: np.ndarray,
+                     dones: np.ndarray,
+                     learning_rate: float,
+                     discount: float = 1.0) -> None:
+    """Apply the Q-learning update to a whole minibatch at once.
+
+    Terminal transitions have no future value. When the same state-action pair
+    appears more than once in the batch, all of its updates are added up.
+
+    Args:
+        q_table (DenseQTable): the table to update in place
+        states, actions, rewards, next_states, dones (np.ndarray): the transitions, as from ReplayBuffer.sample
+        learning_rate (float): Q-learning step size
+        discount (float): weight of the future value (1.0 = undiscounted, like QLearningAgent)
+
+    Returns: None
+    """
+    values = q_table.values
+    max_future_q = np.where(dones, 0.0, discount * values[next_states].max(axis=1))
+    current_q = values[states, actions]
+    np.add.at(values, (states, actions), learning_rate * (rewards + max_future_q - current_q))
+
+
+class ReplayQLearningAgent(DenseQLearningAgent):
+    """DenseQLearningAgent that also learns from replayed minibatches of past transitions.
+
+    Every update_q_value call applies the usual online update, stores the
+    transition and, every `replay_every` calls, replays one minibatch of
+    `batch_size` stored transitions with batched_q_update. As in train.py, a
+    transition whose next_state is the state itself ended the game; unlike
+    QLearningAgent it gets no future value, online or replayed.
+
+    Without discounting, replay mostly speeds up how fast the -0.1 step reward
+    drags visited state-actions below unvisited ones, so replay pays off with a
+    discount below 1 (0.9 works well on 4x4).
+    """
+
+    def __init__(self, *args, buffer_capacity: int = 100_000, batch_size: int = 8,
+                 replay_every: int = 1, discount: float = 0.9, seed: Optional[int] = None, **kwargs) -> None:
+        """Set up the agent (see QLearningAgent) and its replay buffer.
+
+        Args:
+            buffer_capacity (int): number of transitions the replay buffer holds
+            batch_size (int): transitions per replayed minibatch
+            replay_every (int): replay one minibatch every N updates
+            discount (float): weight of the future value, online and replayed
+            seed (Optional[int]): seed for minibatch sampling
+
+        Returns: None
+        """
+        super().__init__(*args, **kwargs)
+        self.replay_buffer = ReplayBuffer(buffer_capacity, seed)
+        self.batch_size = batch_size
+        self.replay_every = replay_every
+        self.discount = discount
+
+    def set_q_table(self, lazy: bool = False) -> DenseQTable:
+        # Every state has a row in the dense table, so there is no lazy mode
+        return super().set_q_table(lazy)
+
+    def update_q_value(self, state: Tuple, action: str, reward: int, next_state: Tuple) -> float:
+        i = self.q_table.index(state)
+        if i < 0:
+            raise KeyError(state)
+        a = self.q_table.action_index[action]
+        done = next_state == state
+        j = i if done else self.q_table.index(next_state)
+
+        max_future_q = 0.0 if done else self.discount * max(self.q_table.values[j].tolist())
+
+        # Q-learning formula
+        current_q_value = self.q_table.values[i, a].item()
+        self.q_table.values[i, a] = current_q_value + self.learning_rate * (reward + max_future_q - current_q_value)
+
+        # The buffer counts the transitions, so the schedule survives a checkpoint round trip
+        self.replay_buffer.add(i, a, reward, j, done)
+        if self.replay_buffer.num_added % self.replay_every == 0:
+            batched_q_update(self.q_table, *self.replay_buffer.sample(self.batch_size),
+                             self.learning_rate, self.discount)
+        return self.q_table.values[i, a].item()
@@ -0,0 +1,9 @@
+"""Rewards of Q-Learning Snake Game.
+
+GameLogic.step pays these, and the exact solver in value_iteration plans with
+them, so both read them from here.
+"""
+
+REWARD_FOOD = 10
+REWARD_DEATH = -10
+REWARD_STEP = -0.1
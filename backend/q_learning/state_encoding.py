@@ -0,0 +1,190 @@
+"""Packed-integer state keys for Q-Learning Snake Game.
+
+A state is packed into a single int instead of the nested tuple built by
+get_state_representation. From the least significant bits upwards:
+
+    head cell | head direction (2 bits) | food cell | snake length | turn codes
+
+Cells are flat indices (row * grid_size + col). The body is stored in order, as
+one 2-bit turn code per segment after the neck, starting from the head: walking
+from the tail to the head, the code says whether the snake went straight (0),
+turned left (1) or turned right (2) on entering the next segment. Unlike the
+sorted body tuple, this keeps the order of the segments, so every key describes
+exactly one snake.
+
+On a 4x4 grid a key needs at most 43 bits, so it also fits a uint64.
+"""
+
+from functools import lru_cache
+from itertools import islice
+from typing import List, Tuple
+
+from .get_game_state import DIRECTIONS, get_current_direction
+
+# Clockwise order, so turning left/right is a step of -1/+1
+DIRECTION_CODES = ['upward', 'rightward', 'downward', 'leftward']
+DIRECTION_INDEX = {d: i for i, d in enumerate(DIRECTION_CODES)}
+STRAIGHT, LEFT, RIGHT = 0, 1, 2
+TURN_STEPS = {STRAIGHT: 0, LEFT: -1, RIGHT: 1}
+# (facing - entered) % 4 -> turn code; 2 would be a reversal, which a snake cannot make
+TURN_CODES = {0: STRAIGHT, 1: RIGHT, 3: LEFT}
+DELTA_INDEX = {(-1, 0): 0, (0, 1): 1, (1, 0): 2, (0, -1): 3}
+
+
+@lru_cache(maxsize=None)
+def field_widths(grid_size: int) -> Tuple[int, int]:
+    """Return the number of bits used for a cell and for the snake length.
+
+    Args:
+        grid_size: size of the grid
+
+    Returns:
+        Tuple[int, int]: (cell_bits, length_bits)
+    """
+    num_cells = grid_size * grid_size
+    return (num_cells - 1).bit_length(), num_cells.bit_length()
+
+
+def encode_state(snake_positions: List[Tuple[int, int]],
+                 food_pos: Tuple[int, int],
+                 grid_size: int,
+                 head_dir: str = None) -> int:
+    """Pack a snake and its food into one int.
+
+    Args:
+        snake_positions: the snake's cells from head to tail (a list or deque)
+        food_pos: the food's (row, col)
+        grid_size: size of the grid
+        head_dir: the direction the head faces; defaults to get_current_direction
+
+    Returns:
+        int: the packed state key
+    """
+    cell_bits, length_bits = field_widths(grid_size)
+    if head_dir is None:
+        head_dir = get_current_direction(snake_positions)
+
+    # Turn codes from the head backwards, starting from the direction the head was entered in
+    turns = 0
+    shift = 0
+    facing = DIRECTION_INDEX[head_dir]
+    for (r1, c1), (r0, c0) in zip(islice(snake_positions, 1, None), islice(snake_positions, 2, None)):
+        entered = DELTA_INDEX[(r1 - r0, c1 - c0)]
+        turns |= TURN_CODES[(facing - entered) % 4] << shift
+        shift += 2
+        facing = entered
+
+    head_r, head_c = snake_positions[0]
+    key = turns
+    key = key << length_bits | len(snake_positions)
+    key = key << cell_bits | (food_pos[0] * grid_size + food_pos[1])
+    key = key << 2 | DIRECTION_INDEX[head_dir]
+    key = key << cell_bits | (head_r * grid_size + head_c)
+    return key
+
+
+def encode_game(game) -> int:
+    """Pack the current state of a GameLogic instance (see get_state_representation)."""
+    return encode_state(game.Snake.snake_positions, game.GameEnvironment.food_pos, game.GameEnvironment.grid_size)
+
+
+def advance_key(key: int, move_dir: str, food_pos: Tuple[int, int], ate: bool, grid_size: int) -> int:
+    """Return the key after the snake moves one cell, without re-encoding the body.
+
+    The new head's turn code is pushed onto the front of the turn chain and the
+    tail's code drops off the end, so this is O(1) in the snake's length.
+
+    Args:
+        key: the key before the move
+        move_dir: the direction the snake moved in ('upward', 'downward', ...)
+        food_pos: the food's (row, col) after the move
+        ate: whether the snake ate (and grew) on this move
+        grid_size: size of the grid
+
+    Returns:
+        int: the same key encode_game would return after the move
+    """
+    cell_bits, length_bits = field_widths(grid_size)
+    head = key & ((1 << cell_bits) - 1)
+    facing = key >> cell_bits & 3
+    key >>= 2 * cell_bits + 2
+    length = key & ((1 << length_bits) - 1)
+    turns = key >> length_bits
+
+    # The old head becomes the neck, entered in `facing` and left in `new_facing`
+    new_facing = DIRECTION_INDEX[move_dir]
+    if length >= 2:
+        turns = turns << 2 | TURN_CODES[(new_facing - facing) % 4]
+    new_length = length + ate
+    turns &= (1 << 2 * max(new_length - 2, 0)) - 1
+
+    # A single-cell snake is always reported as facing right (see get_current_direction)
+    if new_length == 1:
+        new_facing = DIRECTION_INDEX['rightward']
+
+    dr, dc = DIRECTIONS[move_dir]
+    r, c = divmod(head, grid_size)
+    key = turns
+    key = key << length_bits | new_length
+    key = key << cell_bits | (food_pos[0] * grid_size + food_pos[1])
+    key = key << 2 | new_facing
+    key = key << cell_bits | ((r + dr) * grid_size + c + dc)
+    return key
+
+
+def decode_positions(key: int, grid_size: int) -> Tuple[List[Tuple[int, int]], str, Tuple[int, int]]:
+    """Unpack a key into the ordered snake, its head direction and the food.
+
+    Args:
+        key: a key returned by encode_state
+        grid_size: size of the grid the key was encoded for
+
+    Returns:
+        Tuple: (snake_positions from head to tail, head_dir, food_pos)
+    """
+    cell_bits, length_bits = field_widths(grid_size)
+    cell_mask = (1 << cell_bits) - 1
+
+    head = divmod(key & cell_mask, grid_size)
+    key >>= cell_bits
+    facing = key & 3
+    head_dir = DIRECTION_CODES[facing]
+    key >>= 2
+    food_pos = divmod(key & cell_mask, grid_size)
+    key >>= cell_bits
+    length = key & ((1 << length_bits) - 1)
+    turns = key >> length_bits
+
+    # Walk from the head to the tail, stepping against the direction each segment was entered in
+    positions = [head]
+    for i in range(1, length):
+        dr, dc = DIRECTIONS[DIRECTION_CODES[facing]]
+        r, c = positions[-1]
+        positions.append((r - dr, c - dc))
+        facing = (facing - TURN_STEPS[turns >> (2 * (i - 1)) & 3]) % 4
+
+    return positions, head_dir, food_pos
+
+
+def decode_state(key: int, grid_size: int) -> Tuple:
+    """Unpack a key into the tuple form of get_state_representation.
+
+    The result can be used to look up pickled dict Q-tables.
+
+    Args:
+        key: a key returned by encode_state
+        grid_size: size of the grid the key was encoded for
+
+    Returns:
+        Tuple: (head_pos, head_dir, body_tuple, food_pos)
+    """
+    positions, head_dir, food_pos = decode_positions(key, grid_size)
+    return (positions[0], head_dir, tuple(sorted(positions)), food_pos)
+
+
+def frontend_key(state: Tuple) -> str:
+    """Format a tuple state like keyFor() in the frontend's trainPlayground.jsx."""
+    head_pos, head_dir, body_tuple, food_pos = state
+    body = ';'.join(f"{r},{c}" for r, c in body_tuple)
+    return f"{head_pos[0]},{head_pos[1]}|{head_dir}|{body}|{food_pos[0]},{food_pos[1]}"
+
@@ -0,0 +1,199 @@
+"""Dihedral (D4) symmetry reduction for Q-Learning Snake Game.
+
+A square board looks the same after any of its 8 rotations and reflections, and
+so does the game: rotating or mirroring a state and the move taken from it gives
+the rotated or mirrored outcome. Reflections swap left and right, so relative
+actions map turn_left <-> turn_right under them.
+
+Every state is mapped to one canonical representative of its 8 images, and the
+agent stores Q-values only for canonical states. Representatives are chosen by
+comparing (body_tuple, head_pos, head_dir, food_pos), so a canonical state always
+has the smallest body of its orbit; this lets state generation skip whole
+placements whose body is not canonical.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .generate_game_states import count_valid_states, generate_all_valid_states
+from .q_learning_agent import QLearningAgent
+
+# Cell transforms of an n x n grid, with m = n - 1
+TRANSFORMS = [
+    lambda r, c, m: (r, c),          # identity
+    lambda r, c, m: (c, m - r),      # rotate 90 degrees clockwise
+    lambda r, c, m: (m - r, m - c),  # rotate 180 degrees
+    lambda r, c, m: (m - c, r),      # rotate 270 degrees clockwise
+    lambda r, c, m: (r, m - c),      # mirror left-right
+    lambda r, c, m: (m - r, c),      # mirror top-bottom
+    lambda r, c, m: (c, r),          # mirror along the main diagonal
+    lambda r, c, m: (m - c, m - r),  # mirror along the anti-diagonal
+]
+REFLECTIONS = {4, 5, 6, 7}
+
+DIRECTION_VECTORS = {
+    'upward': (-1, 0),
+    'downward': (1, 0),
+    'leftward': (0, -1),
+    'rightward': (0, 1)
+}
+DIRECTION_NAMES = {v: k for k, v in DIRECTION_VECTORS.items()}
+MIRRORED_ACTIONS = {'turn_left': 'turn_right', 'turn_right': 'turn_left'}
+
+
+@lru_cache(maxsize=None)
+def _tables(grid_size: int):
+    """Precompute, per transform, the image of every cell and of every direction."""
+    m = grid_size - 1
+    cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+    cell_maps = [{cell: t(*cell, m) for cell in cells} for t in TRANSFORMS]
+
+    # Directions are vectors, so they follow the linear part: T(d) - T(0)
+    direction_maps = []
+    for t in TRANSFORMS:
+        r0, c0 = t(0, 0, m)
+        direction_maps.append({
+            name: DIRECTION_NAMES[(t(dr, dc, m)[0] - r0, t(dr, dc, m)[1] - c0)]
+            for name, (dr, dc) in DIRECTION_VECTORS.items()
+        })
+    return cell_maps, direction_maps
+
+
+def transform_state(state: Tuple, transform: int, grid_size: int) -> Tuple:
+    """Apply one of the 8 board symmetries to a state.
+
+    Args:
+        state: (head_pos, head_dir, body_tuple, food_pos)
+        transform: index into TRANSFORMS
+        grid_size: size of the grid
+
+    Returns:
+        Tuple: the transformed state, with its body re-sorted
+    """
+    cell_maps, direction_maps = _tables(grid_size)
+    cell_map = cell_maps[transform]
+    head_pos, head_dir, body_tuple, food_pos = state
+    return (
+        cell_map[head_pos],
+        direction_maps[transform][head_dir],
+        tuple(sorted(cell_map[cell] for cell in body_tuple)),
+        cell_map[food_pos],
+    )
+
+
+def transform_action(action: str, transform: int) -> str:
+    """Map a relative action through a symmetry (its own inverse)."""
+    if transform in REFLECTIONS:
+        return MIRRORED_ACTIONS.get(action, action)
+    return action
+
+
+def _order_key(state: Tuple) -> Tuple:
+    head_pos, head_dir, body_tuple, food_pos = state
+    return (body_tuple, head_pos, head_dir, food_pos)
+
+
+def canonicalize(state: Tuple, grid_size: int) -> Tuple[Tuple, int]:
+    """Map a state to the canonical representative of its symmetry orbit.
+
+    Args:
+        state: (head_pos, head_dir, body_tuple, food_pos)
+        grid_size: size of the grid
+
+    Returns:
+        Tuple[Tuple, int]: (canonical state, transform that maps state onto it)
+    """
+    best, best_key, best_transform = state, _order_key(state), 0
+    for transform in range(1, len(TRANSFORMS)):
+        image = transform_state(state, transform, grid_size)
+        key = _order_key(image)
+        if key < best_key:
+            best, best_key, best_transform = image, key, transform
+    return best, best_transform
+
+
+# States already canonicalized by SymmetricQLearningAgent; training revisits the same
+# states constantly, and a lookup costs far less than comparing 8 images
+_canonical_cache = lru_cache(maxsize=1 << 20)(canonicalize)
+
+
+def placement_stabilizer(placement: Tuple, grid_size: int) -> Optional[List[int]]:
+    """Check whether a body placement is canonical and find the symmetries that fix it.
+
+    Args:
+        placement: sorted tuple of body cells
+        grid_size: size of the grid
+
+    Returns:
+        Optional[List[int]]: the non-identity transforms mapping the placement onto
+        itself, or None if another image of the placement sorts before it
+    """
+    cell_maps, _ = _tables(grid_size)
+    stabilizer = []
+    for transform in range(1, len(TRANSFORMS)):
+        image = tuple(sorted(cell_maps[transform][cell] for cell in placement))
+        if image < placement:
+            return None
+        if image == placement:
+            stabilizer.append(transform)
+    return stabilizer
+
+
+def is_canonical(state: Tuple, grid_size: int, transforms: Optional[List[int]] = None) -> bool:
+    """Check whether a state is its orbit's canonical representative.
+
+    Args:
+        state: (head_pos, head_dir, body_tuple, food_pos)
+        grid_size: size of the grid
+        transforms: transforms to compare against; when the body is already known to
+            be canonical, its placement_stabilizer is enough
+
+    Returns:
+        bool: True if no image of the state sorts before it
+    """
+    if transforms is None:
+        transforms = range(1, len(TRANSFORMS))
+    key = _order_key(state)
+    return all(_order_key(transform_state(state, t, grid_size)) >= key for t in transforms)
+
+
+class SymmetricQLearningAgent(QLearningAgent):
+    """QLearningAgent that shares Q-values between all symmetric images of a state.
+
+    States are canonicalized before every lookup and relative actions are mapped
+    into (and back out of) the canonical frame, so one update teaches the agent
+    about up to 8 states. The interface is the same as QLearningAgent.
+
+    Canonical forms are memoized (up to about a million states), which keeps a
+    training step within about 2x of the plain agent's; beyond that, states not
+    seen recently pay for comparing all 8 images again.
+    """
+
+    def set_q_table(self, lazy: bool = False) -> Dict:
+        if lazy:
+            self.q_table = {}
+        else:
+            self.q_table = generate_all_valid_states(self.grid_size, self.actions, self.default_q_value,
+                                                     canonical_only=True)
+        return self.q_table
+
+    def coverage(self) -> Tuple[int, int]:
+        if self._num_valid_states is None:
+            self._num_valid_states = count_valid_states(self.grid_size, canonical_only=True)
+        return len(self.q_table), self._num_valid_states
+
+    def has_state(self, state: Tuple) -> bool:
+        return _canonical_cache(state, self.grid_size)[0] in self.q_table
+
+    def get_q_value(self, state: Tuple, action: str) -> float:
+        canonical, transform = _canonical_cache(state, self.grid_size)
+        return super().get_q_value(canonical, transform_action(action, transform))
+
+    def choose_action(self, state: Tuple, epsilon: float) -> str:
+        canonical, transform = _canonical_cache(state, self.grid_size)
+        return transform_action(super().choose_action(canonical, epsilon), transform)
+
+    def update_q_value(self, state: Tuple, action: str, reward: int, next_state: Tuple) -> float:
+        canonical, transform = _canonical_cache(state, self.grid_size)
+        next_canonical, _ = _canonical_cache(next_state, self.grid_size)
+        return super().update_q_value(canonical, transform_action(action, transform), reward, next_canonical)
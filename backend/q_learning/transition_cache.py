@@ -0,0 +1,142 @@
+"""Precomputed transitions for Q-Learning Snake Game.
+
+On a fixed grid the result of an action only depends on the snake and on
+whether it eats the food. TransitionCache numbers every snake (its cells in
+order, head first) and stores, per (snake, action), the snake after the move
+and the snake after eating. Together with the food cell, a snake also gives the
+agent's state index in DenseQTable. A training loop can then keep
+(snake, food) as two integers and play entirely on list lookups, without
+GameLogic and without building state tuples.
+
+The cache is keyed by snake rather than by DenseQTable state index. The state
+keeps the body as a sorted tuple, so for some bodies it does not say which
+cell is the tail, and the next state would not be determined by the state
+alone (see value_iteration).
+
+Snakes are found as they are reached from the starting snake: either one at a
+time on first visit (lazy) or all at once with build().
+"""
+
+import random
+from typing import List, Optional, Tuple
+
+from .dense_q_table import DenseQTable
+from .get_game_state import DIRECTION_NAMES, get_direction
+
+# next_snake value of an action that kills the snake, and grown_snake value when eating fills the board
+DEATH = -1
+BOARD_FULL = -1
+
+
+class TransitionCache:
+    def __init__(self, grid_size: int, actions: List[str], table: Optional[DenseQTable] = None) -> None:
+        """Set up an empty cache holding only the starting snake.
+
+        Args:
+            grid_size (int): the size of the game grid
+            actions (List[str]): a list of possible actions, in the order actions are numbered
+            table (Optional[DenseQTable]): state index to report state indices in (built if not given)
+
+        Returns: None
+        """
+        self.grid_size = grid_size
+        self.actions = list(actions)
+        self.table = table if table is not None else DenseQTable(grid_size, actions)
+        self.num_cells = grid_size * grid_size
+
+        # Per snake id; the transition lists stay None until the snake is expanded
+        self.bodies: List[Tuple[int, ...]] = []
+        self.next_snake: List[Optional[List[int]]] = []
+        self.new_head: List[Optional[List[int]]] = []
+        self.grown_snake: List[Optional[List[int]]] = []
+        self.state_index: List[Optional[List[int]]] = []
+        self.free_cells: List[Optional[List[int]]] = []
+        self._ids = {}
+
+        # GameLogic starts with a single cell at (1, 1)
+        self.start_snake = self._snake_id((1 * grid_size + 1,))
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+    def _snake_id(self, body: Tuple[int, ...]) -> int:
+        snake = self._ids.get(body)
+        if snake is None:
+            snake = self._ids[body] = len(self.bodies)
+            self.bodies.append(body)
+            for column in (self.next_snake, self.new_head, self.grown_snake, self.state_index, self.free_cells):
+                column.append(None)
+        return snake
+
+    def expand(self, snake: int) -> List[int]:
+        """Fill in the transitions of a snake (registering the snakes they lead to).
+
+        Returns:
+            List[int]: next_snake[snake]
+        """
+        if self.next_snake[snake] is not None:
+            return self.next_snake[snake]
+
+        grid_size = self.grid_size
+        body = self.bodies[snake]
+        head = divmod(body[0], grid_size)
+        occupied = set(body)
+
+        # A single-cell snake faces right, like GameLogic.step and get_current_direction
+        if len(body) > 1:
+            neck = divmod(body[1], grid_size)
+            facing = DIRECTION_NAMES[(head[0] - neck[0], head[1] - neck[1])]
+        else:
+            facing = 'rightward'
+
+        next_snake, new_head, grown_snake = [], [], []
+        for action in self.actions:
+            dr, dc = get_direction(action, facing)
+            r, c = head[0] + dr, head[1] + dc
+            cell = r * grid_size + c
+            # The tail has not moved yet, so it counts as a collision too
+            if not (0 <= r < grid_size and 0 <= c < grid_size) or cell in occupied:
+                next_snake.append(DEATH)
+                new_head.append(-1)
+                grown_snake.append(BOARD_FULL)
+                continue
+            next_snake.append(self._snake_id((cell,) + body[:-1]))
+            new_head.append(cell)
+            grown = (cell,) + body
+            grown_snake.append(BOARD_FULL if len(grown) == self.num_cells else self._snake_id(grown))
+
+        # The agent's state index for every food cell (-1 on the body)
+        body_tuple = tuple(sorted(divmod(cell, grid_size) for cell in body))
+        free = [cell for cell in range(self.num_cells) if cell not in occupied]
+        state_index = [-1] * self.num_cells
+        for cell in free:
+            state_index[cell] = self.table.index((head, facing, body_tuple, divmod(cell, grid_size)))
+
+        self.new_head[snake] = new_head
+        self.grown_snake[snake] = grown_snake
+        self.state_index[snake] = state_index
+        self.free_cells[snake] = free
+        self.next_snake[snake] = next_snake
+        return next_snake
+
+    def build(self) -> "TransitionCache":
+        """Expand every snake reachable from the starting snake."""
+        snake = 0
+        while snake < len(self.bodies):
+            self.expand(snake)
+            snake += 1
+        return self
+
+    def state(self, snake: int, food: int) -> Tuple:
+        """Return the state tuple of a (snake, food) pair, as get_state_representation would."""
+        self.expand(snake)
+        return self.table.state_at(self.state_index[snake][food])
+
+    def reset(self) -> Tuple[int, int]:
+        """Start a game: the starting snake and food placed with the random module, like GameLogic.place_food.
+
+        Returns:
+            Tuple[int, int]: (snake, food cell)
+        """
+        self.expand(self.start_snake)
+        return self.start_snake, random.choice(self.free_cells[self.start_snake])
@@ -0,0 +1,240 @@
+"""Exact value iteration for Q-Learning Snake Game.
+
+Every valid state of a small grid is enumerated by DenseQTable, and the game's
+rules are known, so the optimal Q-values can be computed instead of learned.
+solve() builds the transition structure once, as flat arrays over (state index,
+action) rows, and then runs vectorized value iteration on it:
+
+- moving off the grid or onto any body cell (the tail included, as in
+  GameLogic) ends the game with REWARD_DEATH;
+- eating the food gives REWARD_FOOD and moves to every free cell's food position
+  with equal probability (GameLogic.place_food); filling the board ends the game;
+- any other move gives REWARD_STEP.
+
+The state keeps the body as a sorted tuple, so a body that can be walked from
+the head in more than one order does not say which cell is the tail. For those
+states the solver averages over the possible tails, weighted by the number of
+head-to-tail orderings that end on each one. All other transitions are exact.
+
+Terminal transitions get no future value here. Note that train.py instead feeds
+the current state back in as the next state when an episode ends.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .dense_q_table import DenseQTable
+from .get_game_state import DIRECTION_NAMES, DIRECTIONS, get_direction
+from .rewards import REWARD_DEATH, REWARD_FOOD, REWARD_STEP
+
+
+def _tail_weights(grid_size: int):
+    """Return a function giving, for a snake body, how many orderings end on each tail cell."""
+    num_cells = grid_size * grid_size
+    adjacency = [[nr * grid_size + nc
+                  for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1))
+                  if 0 <= nr < grid_size and 0 <= nc < grid_size]
+                 for r, c in (divmod(cell, grid_size) for cell in range(num_cells))]
+
+    @lru_cache(maxsize=None)
+    def ends(cell: int, remaining: int) -> Tuple[Tuple[int, int], ...]:
+        # Walks from `cell` through every cell of `remaining`, counted by the cell they end on
+        if not remaining:
+            return ((cell, 1),)
+        counts: Dict[int, int] = {}
+        for nb in adjacency[cell]:
+            if remaining >> nb & 1:
+                for end, count in ends(nb, remaining & ~(1 << nb)):
+                    counts[end] = counts.get(end, 0) + count
+        return tuple(counts.items())
+
+    def weights(head: int, neck: int, body_mask: int) -> Tuple[Tuple[int, int], ...]:
+        return ends(neck, body_mask & ~(1 << head) & ~(1 << neck))
+
+    return weights
+
+
+def build_transitions(table: DenseQTable) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Build the expected rewards and the sparse transition probabilities of every (state, action).
+
+    Rows are numbered state_index * len(table.actions) + action_index.
+
+    Args:
+        table (DenseQTable): the state index of the grid
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            (rewards per row, and the row, next state index and probability of each transition)
+    """
+    grid_size = table.grid_size
+    num_actions = len(table.actions)
+    tail_weights = _tail_weights(grid_size)
+    cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+    rewards = np.zeros(len(table) * num_actions, dtype=np.float64)
+    rows: List[int] = []
+    next_states: List[int] = []
+    probabilities: List[float] = []
+
+    # The outcome of an action only depends on the snake until the food is looked at,
+    # and states of the same snake are consecutive, so it is worked out once per snake
+    snake, outcomes = None, None
+    for i, state in enumerate(table.states()):
+        head, head_dir, body_tuple, food = state
+        if (head, head_dir, body_tuple) != snake:
+            snake = (head, head_dir, body_tuple)
+            outcomes = _snake_outcomes(table, tail_weights, head, head_dir, body_tuple)
+
+        for a, outcome in enumerate(outcomes):
+            row = i * num_actions + a
+            if outcome is None:
+                rewards[row] = REWARD_DEATH
+                continue
+
+            new_head, new_dir, body, tails = outcome
+            if new_head == food:
+                rewards[row] = REWARD_FOOD
+                # The snake grows; a full board ends the game
+                grown = tuple(sorted(body + (new_head,)))
+                foods = [cell for cell in cells if cell not in grown]
+                for new_food in foods:
+                    rows.append(row)
+                    next_states.append(table.index((new_head, new_dir, grown, new_food)))
+                    probabilities.append(1.0 / len(foods))
+            else:
+                rewards[row] = REWARD_STEP
+                for moved, probability in tails:
+                    rows.append(row)
+                    next_states.append(table.index((new_head, new_dir, moved, food)))
+                    probabilities.append(probability)
+
+    return (rewards, np.array(rows, dtype=np.int64), np.array(next_states, dtype=np.int64),
+            np.array(probabilities, dtype=np.float64))
+
+
+def _snake_outcomes(table: DenseQTable, tail_weights, head: Tuple[int, int], head_dir: str,
+                    body_tuple: Tuple) -> List[Optional[Tuple]]:
+    """For each action: None if it kills the snake, else (new_head, new_dir, body, [(moved body, probability)])."""
+    grid_size = table.grid_size
+    # A single-cell snake faces right whatever the state says, like GameLogic.step
+    facing = head_dir if len(body_tuple) > 1 else 'rightward'
+    body = set(body_tuple)
+
+    if len(body_tuple) > 1:
+        dr, dc = DIRECTIONS[head_dir]
+        neck = (head[0] - dr, head[1] - dc)
+        body_mask = sum(1 << (r * grid_size + c) for r, c in body_tuple)
+        counts = tail_weights(head[0] * grid_size + head[1], neck[0] * grid_size + neck[1], body_mask)
+        total = sum(count for _, count in counts)
+        tails = [(divmod(tail, grid_size), count / total) for tail, count in counts]
+    else:
+        tails = [(head, 1.0)]
+
+    outcomes = []
+    for action in table.actions:
+        dr, dc = get_direction(action, facing)
+        new_head = (head[0] + dr, head[1] + dc)
+        if new_head in body or not (0 <= new_head[0] < grid_size and 0 <= new_head[1] < grid_size):
+            outcomes.append(None)
+            continue
+        moved = [(tuple(sorted([cell for cell in body_tuple if cell != tail] + [new_head])), probability)
+                 for tail, probability in tails]
+        outcomes.append((new_head, DIRECTION_NAMES[(dr, dc)], body_tuple, moved))
+    return outcomes
+
+
+def solve(grid_size: int,
+          actions: List[str],
+          discount: float = 1.0,
+          tolerance: float = 1e-6,
+          max_iterations: int = 100_000) -> Tuple[DenseQTable, int]:
+    """Compute the optimal Q-values of every valid state by value iteration.
+
+    With discount 1.0 (the agents' setting) the step penalty makes every policy
+    that never ends infinitely bad, so the iteration still converges.
+
+    Args:
+        grid_size (int): the size of the game grid
+        actions (List[str]): a list of possible actions
+        discount (float): discount factor of future rewards
+        tolerance (float): stop when no state value changes by more than this
+        max_iterations (int): stop after this many sweeps even if not converged
+
+    Returns:
+        Tuple[DenseQTable, int]: (the optimal Q-values, number of sweeps)
+    """
+    table = DenseQTable(grid_size, actions)
+    rewards, rows, next_states, probabilities = build_transitions(table)
+    num_rows = len(rewards)
+
+    values = np.zeros(len(table), dtype=np.float64)
+    q_values = rewards
+    for iteration in range(1, max_iterations + 1):
+        # Q(s, a) = R(s, a) + discount * sum over s' of P(s' | s, a) * V(s')
+        expected = np.bincount(rows, weights=probabilities * values[next_states], minlength=num_rows)
+        q_values = rewards + discount * expected
+        new_values = q_values.reshape(len(table), len(actions)).max(axis=1)
+        delta = np.abs(new_values - values).max(initial=0.0)
+        values = new_values
+        if delta < tolerance:
+            break
+
+    table.values = q_values.reshape(len(table), len(actions)).astype(np.float32)
+    return table, iteration
+
+
+def policy_agreement(q_table: Dict, optimal: DenseQTable, tolerance: float = 1e-3) -> Tuple[int, int]:
+    """Count the states of a learned Q-table whose greedy action is optimal.
+
+    A greedy action counts as optimal if its optimal Q-value is within
+    `tolerance` of the best one (several actions can be equally good). States
+    whose learned Q-values all tie have no greedy action and are skipped.
+
+    Args:
+        q_table (Dict): a {state: {action: q}} Q-table, e.g. trained_q_table.pkl
+        optimal (DenseQTable): the result of solve()
+
+    Returns:
+        Tuple[int, int]: (states with an optimal greedy action, states compared)
+    """
+    agree = compared = 0
+    for state, action_values in q_table.items():
+        i = optimal.index(state)
+        if i < 0 or len(set(action_values.values())) < 2:
+            continue
+        greedy = max(action_values, key=action_values.get)
+        best = optimal.values[i].max()
+        compared += 1
+        agree += bool(optimal.values[i, optimal.action_index[greedy]] >= best - tolerance)
+    return agree, compared
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+    import time
+
+    parser = argparse.ArgumentParser(description="Compute the optimal Q-table of a small grid by value iteration.")
+    parser.add_argument("grid_size", type=int)
+    parser.add_argument("--output", default=None, help="write the Q-table as a pickled {state: {action: q}} dict")
+    parser.add_argument("--discount", type=float, default=1.0)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--compare", default=None, help="pickled Q-table whose greedy policy is checked against the optimum")
+    args = parser.parse_args()
+
+    actions = ["turn_left", "go_straight", "turn_right", "turn_around"]
+    start = time.perf_counter()
+    optimal, iterations = solve(args.grid_size, actions, args.discount, args.tolerance)
+    print(f"Solved {len(optimal)} states in {iterations} sweeps ({time.perf_counter() - start:.2f}s)")
+
+    if args.output is not None:
+        with open(args.output, "wb") as f:
+            pickle.dump(optimal.to_dict(), f)
+        print(f"Wrote {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare, "rb") as f:
+            agree, compared = policy_agreement(pickle.load(f), optimal)
+        print(f"{args.compare}: greedy action optimal in {agree}/{compared} states "
+              f"({100 * agree / max(compared, 1):.1f}%)")
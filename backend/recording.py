@@ -0,0 +1,346 @@
+import argparse
+import bisect
+import os
+import random
+import struct
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from game_logic import GameLogic
+
+# Recording file: header, then zlib-compressed chunks of episodes back to back
+MAGIC = b"SNRC"
+VERSION = 1
+HEADER = struct.Struct("<4sBHQB")  # magic, version, grid_size, base_seed, length of the action names
+# Index file: one entry per chunk
+INDEX_MAGIC = b"SNRI"
+INDEX_ENTRY = struct.Struct("<QIQI")  # chunk offset, compressed size, first episode, episode count
+
+CHUNK_EPISODES = 4096
+CHUNK_BYTES = 1 << 20
+COMPRESSION_LEVEL = 6
+SEED_MASK = (1 << 64) - 1
+# 64-bit LCG of EpisodeRandom (Knuth's MMIX constants)
+LCG_MULTIPLIER = 6364136223846793005
+LCG_INCREMENT = 1442695040888963407
+
+
+class RecordedEpisode(NamedTuple):
+    episode: int
+    seed: int
+    actions: bytes  # one byte per step: the action's position in the recording's action list
+
+
+class EpisodeRandom:
+    """The random generator a recorded game places its food with.
+
+    Seeding random.Random costs more than a whole step of training, so each
+    episode gets this small generator instead: the seed is scrambled once
+    (splitmix64's finalizer, so consecutive seeds give unrelated streams) and
+    every choice() takes the high bits of a 64-bit LCG. Recordings depend on
+    its exact output; changing it needs a new VERSION.
+    """
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int = 0) -> None:
+        self.seed(seed)
+
+    def seed(self, seed: int) -> None:
+        z = (seed + 0x9E3779B97F4A7C15) & SEED_MASK
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & SEED_MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & SEED_MASK
+        self.state = z ^ (z >> 31)
+
+    def choice(self, seq):
+        self.state = state = (self.state * LCG_MULTIPLIER + LCG_INCREMENT) & SEED_MASK
+        return seq[((state >> 32) * len(seq)) >> 32]
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _encode_episode(out: bytearray, previous_seed: int, seed: int, actions: bytes) -> None:
+    # Seeds of consecutive episodes are consecutive, so their zigzag delta is a single byte
+    delta = seed - previous_seed
+    _write_varint(out, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+    _write_varint(out, len(actions))
+    out += actions
+
+
+def _decode_chunk(data: bytes, first_episode: int, count: int) -> List[RecordedEpisode]:
+    episodes = []
+    pos = seed = 0
+    for episode in range(first_episode, first_episode + count):
+        zigzag, pos = _read_varint(data, pos)
+        seed += zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1)
+        length, pos = _read_varint(data, pos)
+        episodes.append(RecordedEpisode(episode, seed, data[pos:pos + length]))
+        pos += length
+    return episodes
+
+
+def _read_header(f) -> Tuple[int, int, List[str]]:
+    magic, version, grid_size, base_seed, names_length = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{f.name} is not a version {VERSION} episode recording")
+    return grid_size, base_seed, f.read(names_length).decode().split(",")
+
+
+def _read_index(path: str) -> List[Tuple[int, int, int, int]]:
+    with open(path, 'rb') as f:
+        if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError(f"{path} is not an episode recording index")
+        data = f.read()
+    # A crash can leave half an entry at the end; it describes a chunk that was not indexed yet
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+
+class EpisodeRecorder:
+    """Records training episodes compactly so any of them can be replayed exactly.
+
+    Each game places its food with its own EpisodeRandom, seeded with
+    base_seed + episode, so an episode is fully described by that seed and its
+    relative actions (one byte each). Episodes are collected into chunks of up
+    to CHUNK_EPISODES episodes, which are zlib-compressed and appended to the
+    recording file; the index file (the recording path plus ".idx") gets one
+    fixed-size entry per chunk, giving random access to any episode.
+
+    A chunk is written when it is full, on flush() and on close(); the training
+    loop only appends bytes to a buffer.
+    """
+
+    def __init__(self, path: str, grid_size: int, actions: List[str], base_seed: Optional[int] = None,
+                 start_episode: int = 0) -> None:
+        """Create a recording, or continue an existing one when resuming a run.
+
+        When start_episode > 0 and the recording exists, episodes after
+        start_episode are dropped (they were played after the checkpoint being
+        resumed) and the recording's base seed is kept.
+
+        Args:
+            path (str): the recording file
+            grid_size (int): the size of the game grid
+            actions (List[str]): a list of possible actions; recorded actions are positions in this list
+            base_seed (Optional[int]): episode n's game is seeded with base_seed + n (random if not given)
+            start_episode (int): number of episodes already played (when resuming)
+
+        Returns: None
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.grid_size = grid_size
+        self.action_codes = {action: i for i, action in enumerate(actions)}
+        self.recorded = 0
+
+        self._chunk = bytearray()
+        self._chunk_first = start_episode + 1
+        self._chunk_count = 0
+        self._previous_seed = 0
+
+        if start_episode > 0 and os.path.exists(path) and os.path.exists(self.index_path):
+            self._resume(actions, start_episode)
+        else:
+            self.base_seed = (base_seed if base_seed is not None else random.SystemRandom().getrandbits(64)) & SEED_MASK
+            names = ",".join(actions).encode()
+            self._data = open(path, 'wb')
+            self._data.write(HEADER.pack(MAGIC, VERSION, grid_size, self.base_seed, len(names)) + names)
+            self._index = open(self.index_path, 'wb')
+            self._index.write(INDEX_MAGIC)
+        self._rng = EpisodeRandom()
+
+    def _resume(self, actions: List[str], start_episode: int) -> None:
+        with open(self.path, 'rb') as f:
+            grid_size, self.base_seed, recorded_actions = _read_header(f)
+        if grid_size != self.grid_size or recorded_actions != list(actions):
+            raise ValueError(f"{self.path} records a different grid size or action list")
+
+        # Keep the chunks before start_episode; the episodes of a chunk reaching past it become the open chunk
+        entries = _read_index(self.index_path)
+        keep = bisect.bisect_right([first for _, _, first, _ in entries], start_episode)
+        end = HEADER.size + len(",".join(actions).encode())
+        if keep:
+            offset, size, first, count = entries[keep - 1]
+            end = offset + size
+            if first + count - 1 > start_episode:
+                keep -= 1
+                end = offset
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    episodes = _decode_chunk(zlib.decompress(f.read(size)), first, count)
+                self._chunk_first = first
+                for recorded in episodes[:start_episode - first + 1]:
+                    self._append(recorded.seed, recorded.actions)
+
+        self._data = open(self.path, 'r+b')
+        self._data.truncate(end)
+        self._data.seek(end)
+        self._index = open(self.index_path, 'r+b')
+        self._index.truncate(len(INDEX_MAGIC) + keep * INDEX_ENTRY.size)
+        self._index.seek(0, os.SEEK_END)
+
+    def new_game(self, episode: int) -> GameLogic:
+        """Start the game of an episode (1-based), placing food with the episode's own random generator."""
+        self._rng.seed((self.base_seed + episode) & SEED_MASK)
+        return GameLogic(self.grid_size, rng=self._rng)
+
+    def record(self, episode: int, actions: bytes) -> None:
+        """Add a finished episode (1-based) played on new_game(episode).
+
+        Args:
+            episode (int): the episode number
+            actions (bytes): the episode's actions, each the position of the action in the action list
+        """
+        # Episodes lost after the last write of a crashed run leave a gap; start a new chunk after it
+        if episode != self._chunk_first + self._chunk_count:
+            self.flush()
+            self._chunk_first = episode
+        self._append((self.base_seed + episode) & SEED_MASK, actions)
+        if self._chunk_count >= CHUNK_EPISODES or len(self._chunk) >= CHUNK_BYTES:
+            self.flush()
+
+    def _append(self, seed: int, actions: bytes) -> None:
+        _encode_episode(self._chunk, self._previous_seed, seed, actions)
+        self._previous_seed = seed
+        self._chunk_count += 1
+        self.recorded += 1
+
+    def flush(self) -> None:
+        """Compress and write the open chunk, then its index entry."""
+        if self._chunk_count:
+            data = zlib.compress(bytes(self._chunk), COMPRESSION_LEVEL)
+            offset = self._data.tell()
+            self._data.write(data)
+            self._data.flush()
+            self._index.write(INDEX_ENTRY.pack(offset, len(data), self._chunk_first, self._chunk_count))
+            self._index.flush()
+            self._chunk_first += self._chunk_count
+        self._chunk.clear()
+        self._chunk_count = 0
+        self._previous_seed = 0
+
+    def close(self) -> None:
+        """Write the open chunk and close the files."""
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+
+class EpisodeReader:
+    """Random access to the episodes of a recording, and their exact replay.
+
+    Looking up an episode reads and decompresses its chunk; the most recently
+    used chunk is kept, so reading episodes in order decompresses each chunk once.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open a recording written by EpisodeRecorder.
+
+        Args:
+            path (str): the recording file (its index is read from path + ".idx")
+
+        Raises:
+            ValueError: if the files are not an episode recording
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.grid_size, self.base_seed, self.actions = _read_header(f)
+        self._entries = _read_index(path + ".idx")
+        self._firsts = [first for _, _, first, _ in self._entries]
+        self._cached_chunk = -1
+        self._cached_episodes: List[RecordedEpisode] = []
+
+    def __len__(self) -> int:
+        return sum(count for _, _, _, count in self._entries)
+
+    def __contains__(self, episode: int) -> bool:
+        chunk = bisect.bisect_right(self._firsts, episode) - 1
+        return chunk >= 0 and episode < self._firsts[chunk] + self._entries[chunk][3]
+
+    def __iter__(self) -> Iterator[RecordedEpisode]:
+        for chunk in range(len(self._entries)):
+            yield from self._chunk(chunk)
+
+    def _chunk(self, chunk: int) -> List[RecordedEpisode]:
+        if chunk != self._cached_chunk:
+            offset, size, first, count = self._entries[chunk]
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                self._cached_episodes = _decode_chunk(zlib.decompress(f.read(size)), first, count)
+            self._cached_chunk = chunk
+        return self._cached_episodes
+
+    def episode(self, episode: int) -> RecordedEpisode:
+        """Return the recorded seed and actions of an episode (1-based).
+
+        Raises:
+            KeyError: if the episode was not recorded
+        """
+        if episode not in self:
+            raise KeyError(f"Episode {episode} is not in {self.path}")
+        chunk = bisect.bisect_right(self._firsts, episode) - 1
+        return self._chunk(chunk)[episode - self._firsts[chunk]]
+
+    def replay(self, episode: int) -> Iterator[Tuple[GameLogic, Optional[str]]]:
+        """Play a recorded episode again on GameLogic.
+
+        Yields (game, action) before every step, with the action about to be
+        taken, and finally (game, None) once the episode's actions are used up.
+        The same GameLogic instance is yielded every time.
+        """
+        recorded = self.episode(episode)
+        game = GameLogic(self.grid_size, rng=EpisodeRandom(recorded.seed))
+        game.place_food()
+        for code in recorded.actions:
+            action = self.actions[code]
+            yield game, action
+            game.step(action)
+        yield game, None
+
+    def trajectory(self, episode: int) -> List[dict]:
+        """Return the full trajectory of an episode: the game state before each step and at the end.
+
+        Returns:
+            List[dict]: GameLogic.get_state() dicts, each with the "action" taken from it (None for the last)
+        """
+        return [dict(game.get_state(), action=action) for game, action in self.replay(episode)]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize an episode recording (train.py --record) "
+                                                 "or print one of its episodes.")
+    parser.add_argument("recording")
+    parser.add_argument("--episode", type=int, default=None, help="replay this episode (1-based) in the terminal")
+    args = parser.parse_args(argv)
+
+    reader = EpisodeReader(args.recording)
+    if args.episode is not None:
+        for game, action in reader.replay(args.episode):
+            game.render()
+            print(f"Score {game.GameEnvironment.score}" + (f" | {action}" if action else " | end"))
+        return
+
+    size = os.path.getsize(args.recording) + os.path.getsize(args.recording + ".idx")
+    steps = sum(len(recorded.actions) for recorded in reader)
+    print(f"{len(reader)} episodes of a {reader.grid_size}x{reader.grid_size} grid in {len(reader._entries)} chunks")
+    print(f"{steps} steps, {size / 2**20:.2f} MiB ({size / max(len(reader), 1):.2f} bytes per episode)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import ipaddress
+import json
+import random
+import secrets
+import struct
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from game_logic import GameLogic
+from q_learning.get_game_state import get_current_direction, get_state_representation
+from q_learning.q_table_file import QTableFile, infer_grid_size, load_q_table, state_key
+
+Q_TABLE_PATH = 'trained_q_table.pkl'
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Requests waiting for a policy lookup are answered together once this many have queued up,
+# or at the end of the current event loop iteration, whichever comes first
+MAX_BATCH = 1024
+# Games with no request for this long are dropped
+SESSION_TTL = 600.0
+MAX_SESSIONS = 20_000
+MAX_BODY_BYTES = 64 * 1024
+LATENCY_WINDOW = 10_000
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+STATUS_TEXT = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 403: "Forbidden",
+               404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               503: "Service Unavailable"}
+
+
+class RequestError(Exception):
+    """A request that cannot be answered; becomes an HTTP error response or a WebSocket error message."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class BatchPolicy:
+    """Greedy policy of a Q-table, looked up for many states at once.
+
+    States are packed into the sorted uint64 keys of the binary Q-table format
+    (q_table_file), so a batch is one np.searchsorted and one argmax over the
+    gathered Q-value rows. Ties go to the first action in the action list, like
+    play.py; a state that is not in the table, or whose actions all tie, gets a
+    random action.
+    """
+
+    def __init__(self, grid_size: int, actions: List[str], keys: np.ndarray, values: np.ndarray,
+                 seed: Optional[int] = None) -> None:
+        """Wrap sorted state keys and their Q-value rows.
+
+        Args:
+            grid_size (int): the size of the game grid
+            actions (List[str]): the action of each Q-value column
+            keys (np.ndarray): sorted uint64 state keys (see q_table_file.state_key)
+            values (np.ndarray): [len(keys), len(actions)] Q-values
+            seed (Optional[int]): seed for the random actions of unknown and all-tied states
+
+        Returns: None
+        """
+        self.grid_size = grid_size
+        self.actions = list(actions)
+        self.keys = keys
+        self.values = values
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def load(cls, path: str, seed: Optional[int] = None) -> "BatchPolicy":
+        """Load a pickled dict Q-table or a binary Q-table file (which stays memory-mapped)."""
+        q_table = load_q_table(path)
+        if isinstance(q_table, QTableFile):
+            return cls(q_table.grid_size, q_table.actions, q_table.keys, q_table.values, seed)
+        if not q_table:
+            raise ValueError(f"{path} holds an empty Q-table")
+
+        grid_size = infer_grid_size(q_table)
+        actions = list(next(iter(q_table.values())))
+        keys = np.fromiter((state_key(state, grid_size) for state in q_table), dtype=np.uint64, count=len(q_table))
+        values = np.array([[action_values[a] for a in actions] for action_values in q_table.values()])
+        order = np.argsort(keys)
+        return cls(grid_size, actions, keys[order], values[order], seed)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def act_batch(self, states: List[Tuple]) -> List[str]:
+        """Return the greedy action of each state.
+
+        Args:
+            states (List[Tuple]): (head_pos, head_dir, body_tuple, food_pos) states
+
+        Returns:
+            List[str]: one action per state
+        """
+        keys = np.fromiter((state_key(state, self.grid_size) for state in states), dtype=np.uint64, count=len(states))
+        rows = np.minimum(np.searchsorted(self.keys, keys), max(len(self.keys) - 1, 0))
+        found = self.keys[rows] == keys if len(self.keys) else np.zeros(len(states), dtype=bool)
+
+        q_values = self.values[rows]
+        best = np.argmax(q_values, axis=1)
+        decided = found & (q_values.min(axis=1) < q_values.max(axis=1))
+        return [self.actions[b] if ok else self.rng.choice(self.actions)
+                for b, ok in zip(best.tolist(), decided.tolist())]
+
+
+class PolicyBatcher:
+    """Collects concurrent act() calls and answers them with one BatchPolicy lookup.
+
+    A lookup is scheduled for the end of the current event loop iteration when
+    the first request of a batch arrives, so a lone request is not delayed, and
+    requests that arrive together (many sessions stepping at once) share one
+    vectorized lookup.
+    """
+
+    def __init__(self, policy: BatchPolicy, max_batch: int = MAX_BATCH) -> None:
+        self.policy = policy
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self._pending: List[Tuple[Tuple, asyncio.Future]] = []
+
+    async def act(self, state: Tuple) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((state, future))
+        if len(self._pending) == 1:
+            loop.call_soon(self._flush)
+        elif len(self._pending) >= self.max_batch:
+            self._flush()
+        return await future
+
+    def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            actions = self.policy.act_batch([state for state, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), action in zip(batch, actions):
+            # A request whose client went away has been cancelled
+            if not future.done():
+                future.set_result(action)
+
+
+def parse_state(data, grid_size: int) -> Tuple:
+    """Build a state tuple from a request's {"snake": [[r, c], ...], "food": [r, c]} (head first, like get_state).
+
+    Raises:
+        RequestError: if the snake or food is malformed or off the grid
+    """
+    try:
+        snake = [(int(r), int(c)) for r, c in data['snake']]
+        food = (int(data['food'][0]), int(data['food'][1]))
+    except (KeyError, TypeError, ValueError, IndexError):
+        raise RequestError(400, 'state must be {"snake": [[row, col], ...], "food": [row, col]}') from None
+    if not snake:
+        raise RequestError(400, "snake must have at least one cell")
+    if any(not (0 <= r < grid_size and 0 <= c < grid_size) for r, c in snake + [food]):
+        raise RequestError(400, f"cells must lie on the {grid_size}x{grid_size} grid")
+    return (snake[0], get_current_direction(snake), tuple(sorted(snake)), food)
+
+
+class Session:
+    def __init__(self, grid_size: int) -> None:
+        self.game = GameLogic(grid_size)
+        self.game.place_food()
+        self.done = False
+        self.steps = 0
+        self.last_used = time.monotonic()
+        # Pipelined WebSocket messages run as concurrent tasks; steps of one game must not interleave
+        self.lock = asyncio.Lock()
+
+
+class InferenceServer:
+    """Serves greedy actions of a trained Q-table and GameLogic games over HTTP and WebSocket.
+
+    HTTP (JSON bodies):
+        POST   /act                  {"state": {...}} -> {"action"}
+        POST   /sessions             -> {"session", "game"}
+        GET    /sessions/<id>        -> {"session", "game", "done", "steps"}
+        POST   /sessions/<id>/step   {"action"?} -> {"action", "status", "reward", "done", "game"}
+        DELETE /sessions/<id>
+        GET    /stats                -> request latencies and batching counters
+        GET    /ws                   upgrades to a WebSocket
+
+    WebSocket messages are JSON objects {"op": "act" | "new" | "get" | "step" | "close", ...}
+    with the same fields as the HTTP bodies (plus "session"); each reply echoes
+    the message's "id". A step without an action is played by the policy.
+    """
+
+    def __init__(self, policy: BatchPolicy, max_batch: int = MAX_BATCH,
+                 session_ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS) -> None:
+        self.policy = policy
+        self.batcher = PolicyBatcher(policy, max_batch)
+        self.grid_size = policy.grid_size
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, Session] = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.handled = 0
+
+    # Operations shared by HTTP and WebSocket
+
+    async def handle(self, op: str, params: Dict) -> Dict:
+        """Run one operation and return its JSON reply (timed for /stats).
+
+        Raises:
+            RequestError: for unknown operations, sessions or malformed parameters
+        """
+        start = time.perf_counter()
+        try:
+            return await self._dispatch(op, params)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.handled += 1
+
+    async def _dispatch(self, op: str, params: Dict) -> Dict:
+        if op == "act":
+            return {"action": await self.batcher.act(parse_state(params.get("state"), self.grid_size))}
+        if op == "new":
+            if len(self.sessions) >= self.max_sessions:
+                self.expire_sessions()
+                if len(self.sessions) >= self.max_sessions:
+                    raise RequestError(503, "too many sessions")
+            session_id = secrets.token_urlsafe(12)
+            session = self.sessions[session_id] = Session(self.grid_size)
+            return {"session": session_id, "game": session.game.get_state()}
+        if op == "stats":
+            return self.stats()
+
+        session_id = params.get("session")
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(404, f"no session {session_id!r}")
+        session.last_used = time.monotonic()
+
+        if op == "get":
+            return {"session": session_id, "game": session.game.get_state(),
+                    "done": session.done, "steps": session.steps}
+        if op == "close":
+            del self.sessions[session_id]
+            return {}
+        if op == "step":
+            async with session.lock:
+                if session.done:
+                    raise RequestError(409, "game is over")
+                action = params.get("action")
+                if action is None:
+                    action = await self.batcher.act(get_state_representation(session.game))
+                elif action not in self.policy.actions:
+                    raise RequestError(400, f"action must be one of {self.policy.actions}")
+                status, reward, done = session.game.step(action)
+                session.done = done
+                session.steps += 1
+                return {"action": action, "status": status, "reward": reward, "done": done,
+                        "game": session.game.get_state()}
+        raise RequestError(400, f"unknown op {op!r}")
+
+    def expire_sessions(self) -> int:
+        """Drop the sessions idle for longer than session_ttl and return how many were dropped."""
+        cutoff = time.monotonic() - self.session_ttl
+        stale = [session_id for session_id, session in self.sessions.items() if session.last_used < cutoff]
+        for session_id in stale:
+            del self.sessions[session_id]
+        return len(stale)
+
+    def stats(self) -> Dict:
+        """Latency percentiles (ms) over the last LATENCY_WINDOW requests and batching counters."""
+        latencies = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 90, 99]).tolist() if len(latencies) else [0.0] * 3
+        return {
+            "requests": self.handled,
+            "sessions": len(self.sessions),
+            "latency_ms": dict(zip(["p50", "p90", "p99"], percentiles)),
+            "batches": self.batcher.batches,
+            "mean_batch": self.batcher.requests / max(self.batcher.batches, 1),
+        }
+
+    # HTTP
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer HTTP/1.1 requests on one keep-alive connection, or hand it over to the WebSocket loop."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                method, target, headers = parse_request_head(head)
+                path = urlsplit(target).path.rstrip("/") or "/"
+                origin = headers.get("origin")
+                if origin is not None and not is_local_origin(origin):
+                    await self.respond(writer, 403, {"error": "only local origins are allowed"}, None)
+                    return
+
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self.serve_websocket(reader, writer, headers)
+                    return
+
+                length = headers.get("content-length", "0")
+                length = int(length) if length.isdigit() else MAX_BODY_BYTES + 1
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"error": "missing or too large Content-Length"}, origin)
+                    return
+                body = await reader.readexactly(length) if length else b""
+
+                if method == "OPTIONS":
+                    await self.respond(writer, 204, None, origin)
+                    continue
+                try:
+                    op, params = route(method, path, body)
+                    status, reply = 200, await self.handle(op, params)
+                    if op == "new":
+                        status = 201
+                except RequestError as e:
+                    status, reply = e.status, {"error": str(e)}
+                await self.respond(writer, status, reply, origin)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, reply: Optional[Dict],
+                      origin: Optional[str]) -> None:
+        body = b"" if reply is None else json.dumps(reply).encode()
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 f"Content-Length: {len(body)}"]
+        if reply is not None:
+            lines.append("Content-Type: application/json")
+        # The frontend's dev server runs on another localhost port
+        if origin is not None:
+            lines += [f"Access-Control-Allow-Origin: {origin}",
+                      "Access-Control-Allow-Methods: GET, POST, DELETE, OPTIONS",
+                      "Access-Control-Allow-Headers: Content-Type",
+                      "Vary: Origin"]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    # WebSocket
+
+    async def serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                              headers: Dict[str, str]) -> None:
+        """Complete the WebSocket handshake and answer messages until the client closes."""
+        key = headers.get("sec-websocket-key")
+        if key is None:
+            await self.respond(writer, 400, {"error": "missing Sec-WebSocket-Key"}, None)
+            return
+        writer.write(handshake_response(key))
+        await writer.drain()
+
+        # Messages are answered concurrently (so their policy lookups can be batched); replies carry the id
+        tasks = set()
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_frame(0x8, payload[:2]))
+                    return
+                if opcode == 0x9:
+                    writer.write(encode_frame(0xA, payload))
+                    continue
+                if opcode not in (0x1, 0x2):
+                    continue
+                task = asyncio.create_task(self._answer_message(writer, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, RequestError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _answer_message(self, writer: asyncio.StreamWriter, payload: bytes) -> None:
+        message_id = None
+        try:
+            message = json.loads(payload)
+            if not isinstance(message, dict):
+                raise RequestError(400, "messages must be JSON objects")
+            message_id = message.get("id")
+            reply = await self.handle(message.get("op"), message)
+        except RequestError as e:
+            reply = {"error": str(e), "status": e.status}
+        except ValueError:
+            reply = {"error": "messages must be JSON", "status": 400}
+        reply["id"] = message_id
+        writer.write(encode_frame(0x1, json.dumps(reply).encode()))
+
+    async def expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.session_ttl / 10)
+            self.expire_sessions()
+
+
+def parse_request_head(head: bytes) -> Tuple[str, str, Dict[str, str]]:
+    """Split an HTTP request head into (method, target, {lower-case header: value})."""
+    lines = head.decode("latin-1").split("\r\n")
+    parts = lines[0].split(" ")
+    if len(parts) != 3:
+        raise ConnectionError(f"malformed request line {lines[0]!r}")
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return parts[0], parts[1], headers
+
+
+def route(method: str, path: str, body: bytes) -> Tuple[str, Dict]:
+    """Map an HTTP request to (op, params) for InferenceServer.handle."""
+    try:
+        params = json.loads(body) if body else {}
+    except ValueError:
+        raise RequestError(400, "request body must be JSON") from None
+    if not isinstance(params, dict):
+        raise RequestError(400, "request body must be a JSON object")
+
+    parts = path.strip("/").split("/")
+    if parts == ["act"] and method == "POST":
+        return "act", params
+    if parts == ["stats"] and method == "GET":
+        return "stats", params
+    if parts == ["sessions"] and method == "POST":
+        return "new", params
+    if len(parts) in (2, 3) and parts[0] == "sessions":
+        params["session"] = parts[1]
+        if len(parts) == 2 and method in ("GET", "DELETE"):
+            return ("get" if method == "GET" else "close"), params
+        if len(parts) == 3 and parts[2] == "step" and method == "POST":
+            return "step", params
+    raise RequestError(404, f"no route for {method} {path}")
+
+
+def is_local_origin(origin: str) -> bool:
+    """Check that a browser Origin header names a page served from this machine."""
+    host = urlsplit(origin).hostname
+    return host is not None and is_loopback(host)
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def handshake_response(key: str) -> bytes:
+    """The 101 response accepting a WebSocket upgrade with the given Sec-WebSocket-Key."""
+    accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+    return ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """Read one (possibly fragmented) client message and return (opcode, unmasked payload)."""
+    opcode, chunks, size = None, [], 0
+    while True:
+        b0, b1 = await reader.readexactly(2)
+        length = b1 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        size += length
+        if size > MAX_BODY_BYTES:
+            raise RequestError(413, "message too large")
+        mask = await reader.readexactly(4) if b1 & 0x80 else b""
+        payload = await reader.readexactly(length)
+        if mask:
+            # XOR the payload with the repeated 4-byte mask as one big integer
+            repeated = (mask * (length // 4 + 1))[:length]
+            payload = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+
+        frame_opcode = b0 & 0x0F
+        # Control frames may arrive between the fragments of a message
+        if frame_opcode >= 0x8:
+            return frame_opcode, payload
+        if frame_opcode != 0x0:
+            opcode = frame_opcode
+        chunks.append(payload)
+        if b0 & 0x80:
+            return opcode, b"".join(chunks)
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    """Build an unmasked, unfragmented server frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def serve(server: InferenceServer, host: str = HOST, port: int = PORT) -> None:
+    """Listen on host:port until cancelled.
+
+    Raises:
+        ValueError: if host is not a loopback address
+    """
+    if not is_loopback(host):
+        raise ValueError(f"The inference server only listens on localhost, not {host!r}")
+    listener = await asyncio.start_server(server.serve_connection, host, port, backlog=4096)
+    expiry = asyncio.create_task(server.expire_loop())
+    print(f"Serving {len(server.policy)} states ({server.grid_size}x{server.grid_size}) on "
+          f"http://{host}:{port} and ws://{host}:{port}/ws")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        expiry.cancel()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a trained Q-table's actions and games on localhost.")
+    parser.add_argument("--q-table", default=Q_TABLE_PATH,
+                        help="trained Q-table, either a pickle or a binary Q-table file (opened with mmap)")
+    parser.add_argument("--host", default=HOST, help="loopback address to listen on")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="largest batched policy lookup")
+    parser.add_argument("--session-ttl", type=float, default=SESSION_TTL, help="seconds before an idle game is dropped")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--seed", type=int, default=None, help="seed for food placement and random actions")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    policy = BatchPolicy.load(args.q_table, seed=args.seed)
+    server = InferenceServer(policy, args.max_batch, args.session_ttl, args.max_sessions)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
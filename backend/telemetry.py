@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from server import (HOST, RequestError, encode_frame, handshake_response, is_local_origin, is_loopback,
+                    parse_request_head, read_frame)
+
+TELEMETRY_PORT = 8766
+FRAMES_PER_SECOND = 10.0
+STATS_INTERVAL = 0.5
+# Messages waiting for one viewer; when its queue is full, new messages for it are dropped
+VIEWER_QUEUE_SIZE = 16
+# Per-episode results kept between two stats messages
+MAX_EPISODES_PER_MESSAGE = 1000
+
+
+class _Viewer:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=VIEWER_QUEUE_SIZE)
+        self.dropped = 0
+
+
+class TelemetryPublisher:
+    """Streams live training telemetry to any number of WebSocket viewers on localhost.
+
+    The training loop hands over sampled frames (snake, food, score) and
+    per-episode results; a background thread running an asyncio loop sends
+    them as JSON messages to every connected viewer:
+
+        {"type": "hello", "grid_size"}
+        {"type": "frame", "episode", "step", "snake", "food", "score"}
+        {"type": "stats", "episodes": [[episode, score, steps], ...], "coverage": [visited, total],
+         "episodes_per_sec", "dropped"}
+
+    The training thread never waits for a viewer. The publisher thread sets
+    frame_wanted at most `fps` times per second (and not at all while nobody is
+    watching), so checking for a due frame costs the training loop one attribute
+    read per step. Stats are sent every `stats_interval` seconds, and a viewer
+    that falls behind has new messages dropped once its queue is full.
+    """
+
+    def __init__(self, grid_size: int, port: int = TELEMETRY_PORT, host: str = HOST,
+                 fps: float = FRAMES_PER_SECOND, stats_interval: float = STATS_INTERVAL) -> None:
+        """Set up the publisher (start() opens the socket).
+
+        Args:
+            grid_size (int): the size of the game grid (sent to viewers when they connect)
+            port (int): TCP port of the WebSocket
+            host (str): loopback address to listen on
+            fps (float): most frames per second sent to viewers
+            stats_interval (float): seconds between stats messages
+
+        Returns: None
+
+        Raises:
+            ValueError: if host is not a loopback address
+        """
+        if not is_loopback(host):
+            raise ValueError(f"Telemetry is only served on localhost, not {host!r}")
+        self.grid_size = grid_size
+        self.port = port
+        self.host = host
+        self.frame_interval = 1.0 / fps
+        self.stats_interval = stats_interval
+        self.frame_wanted = False
+        self.viewers = 0
+        self.sent = 0
+        self.dropped = 0
+
+        self._next_stats = time.monotonic() + stats_interval
+        self._episodes = deque(maxlen=MAX_EPISODES_PER_MESSAGE)
+        self._episodes_since_stats = 0
+        self._viewers: Set[_Viewer] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._started = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+
+    def start(self) -> "TelemetryPublisher":
+        """Start the publisher thread and wait until the socket is listening.
+
+        Raises:
+            OSError: if the port cannot be opened
+        """
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def close(self) -> None:
+        """Disconnect the viewers and stop the publisher thread."""
+        if self._loop is not None and self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    # Called from the training thread
+
+    def publish_frame(self, episode: int, step: int, snake: List, food, score: int) -> None:
+        """Send a frame to the viewers (call when frame_wanted is set).
+
+        Args:
+            episode (int): the episode being played (1-based)
+            step (int): steps played in the episode so far
+            snake (List): the snake's cells, head first
+            food: the food cell
+            score (int): the current score
+        """
+        self.frame_wanted = False
+        self._send({"type": "frame", "episode": episode, "step": step,
+                    "snake": [list(cell) for cell in snake], "food": list(food), "score": score})
+
+    def record_episode(self, episode: int, score: int, steps: int, agent=None) -> None:
+        """Note a finished episode; every stats_interval seconds the collected results are sent.
+
+        Args:
+            episode (int): the finished episode (1-based)
+            score (int): its score
+            steps (int): its step count
+            agent (QLearningAgent): if given, its Q-table coverage is included
+        """
+        self._episodes.append((episode, score, steps))
+        self._episodes_since_stats += 1
+        now = time.monotonic()
+        if now < self._next_stats:
+            return
+
+        elapsed = now - self._next_stats + self.stats_interval
+        self._next_stats = now + self.stats_interval
+        message = {"type": "stats", "episodes": list(self._episodes),
+                   "episodes_per_sec": self._episodes_since_stats / elapsed, "dropped": self.dropped}
+        self._episodes.clear()
+        self._episodes_since_stats = 0
+        if self.viewers:
+            if agent is not None:
+                message["coverage"] = list(agent.coverage())
+            self._send(message)
+
+    def _send(self, message: Dict) -> None:
+        self._loop.call_soon_threadsafe(self._broadcast, encode_frame(0x1, json.dumps(message).encode()))
+
+    # Publisher thread
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve_viewer, self.host, self.port))
+        except OSError as e:
+            self._error = e
+            self._started.set()
+            self._loop.close()
+            return
+        self._started.set()
+        self._loop.call_soon(self._tick)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def _tick(self) -> None:
+        # Ask the training loop for a frame while anybody is watching
+        if self._viewers:
+            self.frame_wanted = True
+        self._loop.call_later(self.frame_interval, self._tick)
+
+    async def _shutdown(self) -> None:
+        # Closing a viewer's connection ends its reader (and with it its sender) cleanly
+        self._server.close()
+        for viewer in self._viewers:
+            viewer.writer.close()
+        if self._handlers:
+            await asyncio.wait(self._handlers, timeout=1.0)
+
+    def _broadcast(self, frame: bytes) -> None:
+        for viewer in self._viewers:
+            if viewer.queue.full():
+                viewer.dropped += 1
+                self.dropped += 1
+            else:
+                viewer.queue.put_nowait(frame)
+                self.sent += 1
+
+    async def _serve_viewer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            _, _, headers = parse_request_head(await reader.readuntil(b"\r\n\r\n"))
+            origin = headers.get("origin")
+            key = headers.get("sec-websocket-key")
+            if key is None or (origin is not None and not is_local_origin(origin)):
+                writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+                writer.close()
+                return
+            writer.write(handshake_response(key))
+            writer.write(encode_frame(0x1, json.dumps({"type": "hello", "grid_size": self.grid_size}).encode()))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+
+        viewer = _Viewer(writer)
+        self._viewers.add(viewer)
+        self.viewers = len(self._viewers)
+        self._handlers.add(asyncio.current_task())
+        sender = asyncio.ensure_future(self._send_to(viewer))
+        try:
+            # Viewers only listen; read until they close (answering pings)
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    writer.write(encode_frame(0xA, payload))
+        except (asyncio.IncompleteReadError, ConnectionError, RequestError):
+            pass
+        finally:
+            self._viewers.discard(viewer)
+            self._handlers.discard(asyncio.current_task())
+            self.viewers = len(self._viewers)
+            sender.cancel()
+            writer.close()
+
+    async def _send_to(self, viewer: _Viewer) -> None:
+        try:
+            while True:
+                viewer.writer.write(await viewer.queue.get())
+                await viewer.writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def watch(host: str, port: int) -> None:
+    """Print a viewer's messages in a terminal: one line per stats message and a small board per frame."""
+    reader, writer = await asyncio.open_connection(host, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET / HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    await reader.readuntil(b"\r\n\r\n")
+
+    grid_size = 0
+    while True:
+        _, payload = await read_frame(reader)
+        message = json.loads(payload)
+        if message["type"] == "hello":
+            grid_size = message["grid_size"]
+        elif message["type"] == "frame":
+            grid = [['.'] * grid_size for _ in range(grid_size)]
+            for r, c in message["snake"]:
+                grid[r][c] = 'S'
+            grid[message["food"][0]][message["food"][1]] = 'F'
+            print(f"\nEpisode {message['episode']} step {message['step']} score {message['score']}")
+            print("\n".join(" ".join(row) for row in grid), flush=True)
+        elif message["type"] == "stats" and message["episodes"]:
+            scores = [score for _, score, _ in message["episodes"]]
+            coverage = message.get("coverage")
+            print(f"Episode {message['episodes'][-1][0]} | {message['episodes_per_sec']:.0f} episodes/s | "
+                  f"avg score {sum(scores) / len(scores):.2f}"
+                  + (f" | coverage {coverage[0]}/{coverage[1]}" if coverage else ""), flush=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Watch the telemetry of a running train.py --telemetry-port.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=TELEMETRY_PORT)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(watch(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.IncompleteReadError, ConnectionError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from batch_env import ACTIONS, BatchGameLogic
+from game_logic import GameLogic
+from q_learning.get_game_state import get_state_representation
+
+
+def start_game(batch, i):
+    # GameLogic draws food from its own generator, so each game is given the batch's food instead
+    game = GameLogic(batch.grid_size)
+    game.GameEnvironment.food_pos = divmod(int(batch.food[i]), batch.grid_size)
+    return game
+
+
+@pytest.mark.parametrize("grid_size", [2, 3, 4])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_steps_match_game_logic(grid_size, seed):
+    num_games = 8
+    batch = BatchGameLogic(num_games, grid_size, seed=seed)
+    games = [start_game(batch, i) for i in range(num_games)]
+    rng = np.random.default_rng(seed)
+    episodes = 0
+
+    for _ in range(300):
+        actions = rng.integers(0, len(ACTIONS), num_games)
+        rewards, dones, scores = batch.step(actions)
+
+        for i, game in enumerate(games):
+            status, reward, done = game.step(ACTIONS[actions[i]])
+            assert (reward, done, game.GameEnvironment.score) == (rewards[i], dones[i], scores[i])
+
+            if done:
+                episodes += 1
+                games[i] = start_game(batch, i)
+                continue
+            if status == GameLogic.STATUS_ATE:
+                food = divmod(int(batch.food[i]), grid_size)
+                assert food in game.GameEnvironment.free_index
+                game.GameEnvironment.food_pos = food
+            assert batch.snake_positions(i) == list(game.Snake.snake_positions)
+            assert batch.get_state_representation(i) == get_state_representation(game)
+
+    assert episodes > num_games
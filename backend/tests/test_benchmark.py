@@ -0,0 +1,15 @@
+import benchmark
+
+
+def test_move_benchmark_repeats_on_every_size():
+    # 1000 steps is not a whole number of cycles on any of the grids
+    for grid_size in benchmark.MOVE_GRID_SIZES:
+        for fraction in benchmark.SNAKE_FRACTIONS:
+            length = max(1, int(fraction * grid_size * grid_size))
+            assert benchmark.bench_move(grid_size, length, 1000, repeat=2) > 0
+
+
+def test_episode_benchmark_runs_train_loop(capsys):
+    episodes_per_sec, steps_per_sec = benchmark.bench_episodes(20, repeat=2)
+    assert 0 < episodes_per_sec <= steps_per_sec
+    assert capsys.readouterr() == ("", "")
@@ -0,0 +1,56 @@
+import os
+import pickle
+
+import pytest
+
+import checkpoint
+import train
+from checkpoint import Checkpointer, atomic_write, load_checkpoint
+
+EPISODES = 300
+
+
+def run(tmp_path, name, episodes, *extra):
+    output = tmp_path / f"{name}.pkl"
+    train.main(["--grid-size", "3", "--episodes", str(episodes), "--seed", "7", "--max-steps", "100",
+                "--output", str(output), "--checkpoint-every", str(EPISODES // 2), *extra])
+    return output
+
+
+@pytest.mark.parametrize("mode", [[], ["--eager"], ["--cached", "lazy"], ["--replay-capacity", "500"]])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, capsys, mode):
+    full = run(tmp_path, "full", EPISODES, *mode)
+    half = run(tmp_path, "half", EPISODES // 2, *mode)
+    assert run(tmp_path, "half", EPISODES, "--resume", *mode) == half
+
+    # The last checkpoint of each run holds the Q-table, the history and the random state at the end
+    expected, resumed = load_checkpoint(full.with_suffix(".ckpt")), load_checkpoint(half.with_suffix(".ckpt"))
+    assert resumed['episode'] == expected['episode'] == EPISODES
+    assert resumed['scores'] == expected['scores'] and len(expected['scores']) == EPISODES
+    assert resumed['steps_per_episode'] == expected['steps_per_episode']
+    assert resumed['random_state'] == expected['random_state']
+    with open(full, 'rb') as f, open(half, 'rb') as g:
+        assert pickle.load(f) == pickle.load(g)
+
+
+def test_atomic_write_leaves_old_contents_when_writing_fails(tmp_path, monkeypatch):
+    path = tmp_path / "file.bin"
+    atomic_write(str(path), b"old")
+
+    def crash(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr(checkpoint.os, "fsync", crash)
+    with pytest.raises(OSError, match="disk full"):
+        atomic_write(str(path), b"new contents")
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+def test_checkpointer_reports_failed_writes_on_close(tmp_path):
+    checkpointer = Checkpointer(str(tmp_path / "missing" / "run.ckpt"), every_episodes=1)
+    agent = train.QLearningAgent(actions=train.actions, learning_rate=0.2, epsilon=0.1, grid_size=3, num_episodes=1)
+    agent.set_q_table(lazy=True)
+    assert checkpointer.maybe_save(1, agent, [0], [1])
+    with pytest.raises(OSError):
+        checkpointer.close()
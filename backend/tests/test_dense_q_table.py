@@ -0,0 +1,56 @@
+import numpy as np
+
+import train
+from q_learning.compiled_policy import CompiledPolicy, compile_policy
+from q_learning.dense_q_table import DenseQLearningAgent, DenseQTable, StateIndex
+
+
+def make_agent():
+    return DenseQLearningAgent(actions=train.actions, learning_rate=0.2, epsilon=0.1, grid_size=3, num_episodes=1)
+
+
+def test_set_q_table_accepts_lazy():
+    agent = make_agent()
+    table = agent.set_q_table(lazy=True)
+    assert agent.q_table is table
+    assert (table.values == agent.default_q_value).all()
+
+
+def test_coverage_counts_updated_states():
+    agent = make_agent()
+    agent.set_q_table()
+    total = len(agent.q_table)
+    assert agent.coverage() == (0, total)
+
+    states = [agent.q_table.state_at(i) for i in (0, 5, 17)]
+    for state in states:
+        agent.update_q_value(state, "go_straight", -0.1, states[0])
+    agent.update_q_value(states[1], "turn_left", -0.1, states[0])
+    assert agent.coverage() == (3, total)
+
+
+def test_state_index_matches_dense_q_table():
+    table = DenseQTable(3, train.actions)
+    index = StateIndex(3)
+    assert len(index) == len(table)
+    assert list(index.states()) == list(table.states())
+    for i, state in enumerate(index.states()):
+        assert index.index(state) == table.index(state) == i
+        assert index.state_at(i) == state
+
+
+def test_compiled_policy_matches_q_values(tmp_path):
+    agent = make_agent()
+    agent.set_q_table()
+    rng = np.random.default_rng(0)
+    agent.q_table.values[:] = rng.integers(-3, 3, agent.q_table.values.shape)
+
+    compiled = compile_policy(agent)
+    assert len(compiled) == len(agent.q_table)
+    for state in agent.q_table.states():
+        q_values = [agent.get_q_value(state, action) for action in train.actions]
+        expected = None if q_values.count(max(q_values)) == len(q_values) else train.actions[q_values.index(max(q_values))]
+        assert compiled.act(state) == expected
+
+    compiled.save(tmp_path / "policy.bin")
+    assert (CompiledPolicy.load(tmp_path / "policy.bin").policy == compiled.policy).all()
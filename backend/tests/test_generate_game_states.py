@@ -0,0 +1,65 @@
+from functools import lru_cache
+
+import pytest
+
+from q_learning.generate_game_states import (count_states_by_length, count_states_per_length, count_valid_states,
+                                             generate_all_valid_states, generate_connected_placements,
+                                             generate_shapes, head_dir_pairs_for_placement, iter_valid_states)
+
+GRID_SIZES = [2, 3, 4]
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+
+@lru_cache(maxsize=None)
+def brute_force_shapes(grid_size):
+    # The original path-enumerating search, one length at a time
+    return {
+        tuple(placement): head_dir_pairs_for_placement(placement, grid_size)
+        for length in range(1, grid_size * grid_size + 1)
+        for placement in generate_connected_placements(length, grid_size)
+    }
+
+
+@lru_cache(maxsize=None)
+def brute_force_states(grid_size):
+    cells = [(r, c) for r in range(grid_size) for c in range(grid_size)]
+    return {
+        (head_pos, head_dir, placement, food_pos)
+        for placement, pairs in brute_force_shapes(grid_size).items()
+        for head_pos, head_dir in pairs
+        for food_pos in cells
+        if food_pos not in placement
+    }
+
+
+@pytest.mark.parametrize("grid_size", GRID_SIZES)
+@pytest.mark.parametrize("processes", [1, 2])
+def test_generate_shapes_matches_brute_force(grid_size, processes):
+    assert generate_shapes(grid_size, processes) == brute_force_shapes(grid_size)
+
+
+@pytest.mark.parametrize("grid_size", GRID_SIZES)
+def test_state_counts_match_brute_force(grid_size):
+    expected = brute_force_states(grid_size)
+    assert count_valid_states(grid_size) == len(expected)
+    assert count_valid_states(grid_size, processes=2) == len(expected)
+    assert set(generate_all_valid_states(grid_size, ACTIONS)) == expected
+
+
+@pytest.mark.parametrize("grid_size", GRID_SIZES)
+def test_iter_valid_states_matches_brute_force(grid_size):
+    states = list(iter_valid_states(grid_size))
+    assert len(states) == len(set(states))
+    assert set(states) == brute_force_states(grid_size)
+
+    # Ordered by snake length, then body, head and food
+    assert states == sorted(states, key=lambda state: (len(state[2]), state[2], state[0], state[1], state[3]))
+    length = 2
+    assert list(iter_valid_states(grid_size, length)) == [state for state in states if len(state[2]) == length]
+
+
+@pytest.mark.parametrize("grid_size", GRID_SIZES)
+def test_count_states_per_length_matches_brute_force(grid_size):
+    expected = count_states_by_length({state: 0 for state in brute_force_states(grid_size)})
+    assert count_states_per_length(grid_size) == expected
+    assert count_states_per_length(grid_size, max_length=3) == {length: expected[length] for length in (1, 2, 3)}
@@ -0,0 +1,20 @@
+import pytest
+
+import hogwild_train
+
+
+def test_worker_setup_failure_does_not_hang(monkeypatch):
+    # Workers are forked, so they see the patched class; the parent never builds an agent
+    def broken_agent(*args, **kwargs):
+        raise MemoryError("no room for the agent")
+
+    monkeypatch.setattr(hogwild_train, "DenseQLearningAgent", broken_agent)
+    monkeypatch.setattr(hogwild_train, "SETUP_TIMEOUT", 30.0)
+    with pytest.raises(RuntimeError, match="failed to start"):
+        hogwild_train.train_hogwild(2, num_episodes=10, grid_size=3)
+
+
+def test_single_worker_trains():
+    q_table, scores, steps, _ = hogwild_train.train_hogwild(1, num_episodes=50, grid_size=3)
+    assert len(scores) == 50 and (steps > 0).all()
+    assert q_table.values.any()
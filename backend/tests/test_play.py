@@ -0,0 +1,24 @@
+import pickle
+import random
+
+import pytest
+
+import train
+from play import q_table_policy
+from q_learning.q_learning_agent import QLearningAgent
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_lazily_trained_table_keeps_its_grid_size(tmp_path, seed):
+    # A lazy table's first key is an early state, which rarely touches the last row or column
+    random.seed(seed)
+    agent = QLearningAgent(actions=train.actions, learning_rate=0.2, epsilon=0.1, grid_size=4, num_episodes=200)
+    agent.set_q_table(lazy=True)
+    train.train(agent)
+
+    path = tmp_path / "q_table.pkl"
+    path.write_bytes(pickle.dumps(agent.q_table))
+    grid_size, select_action = q_table_policy(str(path))
+
+    assert grid_size == 4
+    assert select_action(next(iter(agent.q_table))) in train.actions
@@ -0,0 +1,19 @@
+import train
+from profiling import PhaseProfiler
+from q_learning.symmetry import SymmetricQLearningAgent, canonicalize, transform_state
+
+
+def test_symmetric_agent_hits_count_canonical_states():
+    agent = SymmetricQLearningAgent(actions=train.actions, learning_rate=0.2, epsilon=0.0, grid_size=3,
+                                    num_episodes=1)
+    agent.set_q_table(lazy=True)
+    state = ((0, 1), 'rightward', ((0, 0), (0, 1)), (2, 2))
+    agent.update_q_value(state, "go_straight", -0.1, state)
+    assert canonicalize(state, 3)[0] in agent.q_table
+
+    profiler = PhaseProfiler()
+    choose_action, _ = profiler.agent_hooks(agent)
+    for transform in range(8):
+        choose_action(transform_state(state, transform, 3), 0.0)
+    choose_action(((1, 1), 'upward', ((1, 1), (2, 1)), (0, 0)), 0.0)
+    assert (profiler.hits, profiler.misses) == (8, 1)
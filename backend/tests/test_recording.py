@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+import recording
+from recording import EpisodeReader, EpisodeRecorder
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+GRID_SIZE = 4
+MAX_STEPS = 60
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(recording, "CHUNK_EPISODES", 3)
+
+
+def play(recorder, episode, rng):
+    """Play and record an episode like train.train, returning its trajectory as EpisodeReader.trajectory would."""
+    game = recorder.new_game(episode)
+    game.place_food()
+    trajectory, moves = [], bytearray()
+    for _ in range(MAX_STEPS):
+        # Mostly go straight, so some episodes eat and some run into a wall
+        action = rng.choice(ACTIONS[:3] + ["go_straight"] * 3)
+        trajectory.append(dict(game.get_state(), action=action))
+        moves.append(recorder.action_codes[action])
+        if game.step(action)[2]:
+            break
+    trajectory.append(dict(game.get_state(), action=None))
+    recorder.record(episode, bytes(moves))
+    return trajectory
+
+
+def record(path, episodes, seed, **kwargs):
+    recorder = EpisodeRecorder(str(path), GRID_SIZE, ACTIONS, **kwargs)
+    rng = random.Random(seed)
+    trajectories = {episode: play(recorder, episode, rng) for episode in episodes}
+    recorder.close()
+    return recorder, trajectories
+
+
+def test_replay_matches_recorded_trajectories(tmp_path):
+    path = tmp_path / "episodes.rec"
+    recorder, trajectories = record(path, range(1, 11), seed=0, base_seed=1234)
+    assert any(t[-1]["score"] > 0 for t in trajectories.values())
+
+    reader = EpisodeReader(str(path))
+    assert (reader.grid_size, reader.base_seed, reader.actions) == (GRID_SIZE, 1234, ACTIONS)
+    assert len(reader) == recorder.recorded == 10
+    assert len(reader._entries) == 4
+    # Out of order, so chunks are decompressed again
+    for episode in [10, 1, 5, 4, 9, 2, 3, 8, 7, 6]:
+        assert reader.trajectory(episode) == trajectories[episode]
+
+
+@pytest.mark.parametrize("start_episode", [4, 5, 6, 9])
+def test_resume_keeps_episodes_up_to_start_episode(tmp_path, start_episode):
+    path = tmp_path / "episodes.rec"
+    _, first_run = record(path, range(1, 11), seed=0, base_seed=1234)
+
+    # The resumed run keeps the recording's base seed and replaces everything after start_episode
+    resumed = range(start_episode + 1, start_episode + 5)
+    recorder, second_run = record(path, resumed, seed=1, base_seed=99, start_episode=start_episode)
+    assert recorder.base_seed == 1234
+
+    reader = EpisodeReader(str(path))
+    assert reader.base_seed == 1234
+    assert len(reader) == start_episode + 4
+    assert [recorded.episode for recorded in reader] == list(range(1, start_episode + 5))
+    for episode in range(1, start_episode + 1):
+        assert reader.trajectory(episode) == first_run[episode]
+    for episode in resumed:
+        assert reader.trajectory(episode) == second_run[episode]
+    assert start_episode + 5 not in reader
+
+
+def test_resume_rejects_a_different_action_list(tmp_path):
+    path = tmp_path / "episodes.rec"
+    record(path, range(1, 4), seed=0)
+    with pytest.raises(ValueError, match="different grid size or action list"):
+        EpisodeRecorder(str(path), GRID_SIZE, ACTIONS[::-1], start_episode=2)
+
+
+def test_missing_episodes_leave_a_gap(tmp_path):
+    path = tmp_path / "episodes.rec"
+    _, trajectories = record(path, [1, 2, 6, 7, 8, 9], seed=0)
+
+    reader = EpisodeReader(str(path))
+    assert [recorded.episode for recorded in reader] == [1, 2, 6, 7, 8, 9]
+    assert 3 not in reader and 5 not in reader
+    with pytest.raises(KeyError):
+        reader.episode(4)
+    for episode, trajectory in trajectories.items():
+        assert reader.trajectory(episode) == trajectory
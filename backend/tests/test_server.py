@@ -0,0 +1,206 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+from contextlib import asynccontextmanager, suppress
+
+import numpy as np
+import pytest
+
+from server import HOST, WEBSOCKET_GUID, BatchPolicy, InferenceServer, RequestError, read_frame, serve
+from q_learning.q_table_file import state_key
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+START = ((1, 1), 'rightward', ((1, 1),))
+
+
+def wall_policy():
+    """A 2x2 policy that goes straight from the start cell, which runs into the wall."""
+    keys = np.array(sorted(state_key(START + (food,), 2) for food in [(0, 0), (0, 1), (1, 0)]), dtype=np.uint64)
+    values = np.tile(np.array([0.0, 1.0, 0.0, 0.0], dtype=np.float32), (len(keys), 1))
+    return BatchPolicy(2, ACTIONS, keys, values, seed=0)
+
+
+START_STATE = {"snake": [[1, 1]], "food": [0, 0]}
+
+
+@asynccontextmanager
+async def serving(server):
+    """Run serve() on a free port until the block ends, yielding the port."""
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        port = probe.getsockname()[1]
+    task = asyncio.create_task(serve(server, HOST, port))
+    for _ in range(200):
+        try:
+            _, writer = await asyncio.open_connection(HOST, port)
+            writer.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.01)
+    try:
+        yield port
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+async def http(port, method, path, body=None, headers=None):
+    """Send one request on a new connection and return (status, lower-case headers, JSON reply or None)."""
+    reader, writer = await asyncio.open_connection(HOST, port)
+    data = b"" if body is None else json.dumps(body).encode()
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {HOST}", f"Content-Length: {len(data)}", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + data)
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    reply_headers = dict((name.lower(), value.strip()) for name, _, value in
+                         (line.partition(":") for line in head[1:] if line))
+    reply = await reader.readexactly(int(reply_headers["content-length"]))
+    writer.close()
+    return int(head[0].split(" ")[1]), reply_headers, json.loads(reply) if reply else None
+
+
+async def open_websocket(port):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET /ws HTTP/1.1\r\nHost: {HOST}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest()).decode()
+    assert head.startswith("HTTP/1.1 101 ") and f"Sec-WebSocket-Accept: {accept}\r\n" in head
+    return reader, writer
+
+
+def client_frame(message):
+    """A masked text frame, as browsers send them."""
+    payload = json.dumps(message).encode()
+    mask = os.urandom(4)
+    header = struct.pack("!BB", 0x81, 0x80 | len(payload)) if len(payload) < 126 else \
+        struct.pack("!BBH", 0x81, 0x80 | 126, len(payload))
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def test_pipelined_steps_do_not_revive_a_finished_game():
+    async def run():
+        server = InferenceServer(wall_policy())
+        session = (await server.handle("new", {}))["session"]
+        return await asyncio.gather(server.handle("step", {"session": session}),
+                                    server.handle("step", {"session": session}), return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert first["action"] == "go_straight" and first["done"]
+    assert isinstance(second, RequestError) and second.status == 409
+
+
+def test_act_over_http():
+    async def run():
+        server = InferenceServer(wall_policy())
+        async with serving(server) as port:
+            return await http(port, "POST", "/act", {"state": START_STATE})
+
+    status, _, reply = asyncio.run(run())
+    assert (status, reply) == (200, {"action": "go_straight"})
+
+
+def test_sessions_over_http_end_with_409():
+    async def run():
+        server = InferenceServer(wall_policy())
+        async with serving(server) as port:
+            status, _, created = await http(port, "POST", "/sessions")
+            assert status == 201 and created["game"]["snake"] == [[1, 1]]
+            path = f"/sessions/{created['session']}"
+            status, _, stepped = await http(port, "POST", path + "/step", {"action": "go_straight"})
+            assert status == 200 and stepped["done"] and stepped["reward"] == -10
+            status, _, reply = await http(port, "POST", path + "/step", {"action": "turn_left"})
+            assert (status, reply) == (409, {"error": "game is over"})
+            status, _, reply = await http(port, "GET", path)
+            assert status == 200 and reply["done"] and reply["steps"] == 1
+            assert (await http(port, "DELETE", path))[0] == 200
+            assert (await http(port, "GET", path))[0] == 404
+            assert (await http(port, "GET", "/nowhere"))[0] == 404
+
+    asyncio.run(run())
+
+
+def test_act_over_websocket():
+    async def run():
+        server = InferenceServer(wall_policy())
+        async with serving(server) as port:
+            reader, writer = await open_websocket(port)
+            # Pipelined messages are answered concurrently; the replies carry their ids
+            writer.write(client_frame({"op": "act", "id": 1, "state": START_STATE}) +
+                         client_frame({"op": "act", "id": 2, "state": {"snake": [[5, 5]], "food": [0, 0]}}) +
+                         client_frame({"op": "new", "id": 3}))
+            replies = {}
+            for _ in range(3):
+                opcode, payload = await read_frame(reader)
+                assert opcode == 0x1
+                reply = json.loads(payload)
+                replies[reply.pop("id")] = reply
+            writer.write(struct.pack("!BB", 0x88, 0x80) + os.urandom(4))
+            assert (await read_frame(reader))[0] == 0x8
+            writer.close()
+            return replies
+
+    replies = asyncio.run(run())
+    assert replies[1] == {"action": "go_straight"}
+    assert replies[2] == {"error": "cells must lie on the 2x2 grid", "status": 400}
+    assert "session" in replies[3]
+
+
+def test_concurrent_acts_share_one_batch():
+    async def run():
+        server = InferenceServer(wall_policy())
+        replies = await asyncio.gather(*(server.handle("act", {"state": START_STATE}) for _ in range(5)))
+        return server, replies
+
+    server, replies = asyncio.run(run())
+    assert replies == [{"action": "go_straight"}] * 5
+    assert (server.batcher.batches, server.batcher.requests) == (1, 5)
+    assert server.stats()["mean_batch"] == 5
+
+
+def test_only_local_origins_are_allowed():
+    async def run():
+        server = InferenceServer(wall_policy())
+        async with serving(server) as port:
+            foreign = await http(port, "POST", "/act", {"state": START_STATE}, {"Origin": "http://example.com"})
+            local = await http(port, "POST", "/act", {"state": START_STATE}, {"Origin": "http://localhost:5173"})
+            return foreign, local
+
+    (status, _, reply), (local_status, headers, _) = asyncio.run(run())
+    assert status == 403 and reply == {"error": "only local origins are allowed"}
+    assert local_status == 200 and headers["access-control-allow-origin"] == "http://localhost:5173"
+    with pytest.raises(ValueError):
+        asyncio.run(serve(InferenceServer(wall_policy()), "0.0.0.0", 0))
+
+
+def test_idle_sessions_expire():
+    async def run():
+        server = InferenceServer(wall_policy(), session_ttl=0.2)
+        async with serving(server) as port:
+            path = f"/sessions/{(await http(port, 'POST', '/sessions'))[2]['session']}"
+            assert (await http(port, "GET", path))[0] == 200
+            # The expiry loop wakes up every session_ttl / 10 seconds
+            await asyncio.sleep(0.5)
+            return await http(port, "GET", path)
+
+    assert asyncio.run(run())[0] == 404
+
+
+def test_full_server_expires_idle_sessions_before_refusing():
+    async def run():
+        server = InferenceServer(wall_policy(), max_sessions=1)
+        first = (await server.handle("new", {}))["session"]
+        server.sessions[first].last_used -= server.session_ttl + 1
+        second = (await server.handle("new", {}))["session"]
+        assert list(server.sessions) == [second]
+        with pytest.raises(RequestError) as refused:
+            await server.handle("new", {})
+        return refused.value.status
+
+    assert asyncio.run(run()) == 503
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from game_logic import GameLogic
+from q_learning.get_game_state import DIRECTION_NAMES, get_current_direction, get_state_representation
+from q_learning.state_encoding import advance_key, decode_positions, decode_state, encode_game, encode_state
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+
+@pytest.mark.parametrize("grid_size", [3, 4, 5])
+def test_keys_round_trip_and_advance_during_play(grid_size):
+    rng = random.Random(grid_size)
+    game = GameLogic(grid_size, rng=rng)
+    game.place_food()
+    key = encode_game(game)
+    longest = 1
+
+    for _ in range(3000):
+        snake = list(game.Snake.snake_positions)
+        assert decode_positions(key, grid_size) == (snake, get_current_direction(snake), game.GameEnvironment.food_pos)
+        assert decode_state(key, grid_size) == get_state_representation(game)
+
+        # Avoid most deaths so the snake gets long enough to turn back on itself
+        head = snake[0]
+        facing = GameLogic.RIGHT if len(snake) < 2 else (head[0] - snake[1][0], head[1] - snake[1][1])
+        safe = [a for a in ACTIONS
+                if (head[0] + GameLogic.TURNS[facing][a][0], head[1] + GameLogic.TURNS[facing][a][1])
+                in game.GameEnvironment.free_index]
+        action = rng.choice(safe or ACTIONS)
+        move = GameLogic.TURNS[facing][action]
+
+        status, _, done = game.step(action)
+        if done:
+            game = GameLogic(grid_size, rng=rng)
+            game.place_food()
+            key = encode_game(game)
+            continue
+        key = advance_key(key, DIRECTION_NAMES[move], game.GameEnvironment.food_pos,
+                          status == GameLogic.STATUS_ATE, grid_size)
+        assert key == encode_game(game)
+        longest = max(longest, len(game.Snake.snake_positions))
+
+    assert longest >= grid_size + 2
+
+
+def test_full_snake_fits_uint64_on_4x4():
+    # Boustrophedon path over the whole grid, head first
+    snake = [(r, c if r % 2 == 0 else 3 - c) for r in range(4) for c in range(4)][::-1]
+    key = encode_state(snake, (0, 0), 4)
+    assert key.bit_length() <= 43
+    assert decode_positions(key, 4) == (snake, get_current_direction(snake), (0, 0))
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from game_logic import GameLogic
+from q_learning.generate_game_states import count_valid_states, generate_all_valid_states, iter_valid_states
+from q_learning.get_game_state import get_state_representation
+from q_learning.symmetry import TRANSFORMS, _tables, canonicalize, transform_action, transform_state
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+
+def game_at(snake, food, grid_size):
+    game = GameLogic(grid_size)
+    for cell in game.Snake.body:
+        game.GameEnvironment.release_cell(cell)
+    game.Snake.body.clear()
+    game.Snake.body.extend(snake)
+    game.Snake.occupied = set(snake)
+    for cell in snake:
+        game.GameEnvironment.take_cell(cell)
+    game.GameEnvironment.food_pos = food
+    return game
+
+
+@pytest.mark.parametrize("grid_size, sample", [(3, None), (4, 2000)])
+def test_all_images_share_one_canonical_state(grid_size, sample):
+    states = list(iter_valid_states(grid_size))
+    if sample is not None:
+        states = random.Random(0).sample(states, sample)
+    for state in states:
+        canonical, transform = canonicalize(state, grid_size)
+        assert transform_state(state, transform, grid_size) == canonical
+        for t in range(len(TRANSFORMS)):
+            assert canonicalize(transform_state(state, t, grid_size), grid_size)[0] == canonical
+
+
+@pytest.mark.parametrize("grid_size", [3, 4])
+def test_canonical_states_times_orbit_sizes_count_all_states(grid_size):
+    total = 0
+    for state in generate_all_valid_states(grid_size, ACTIONS, canonical_only=True):
+        assert canonicalize(state, grid_size)[0] == state
+        total += len({transform_state(state, t, grid_size) for t in range(len(TRANSFORMS))})
+    assert total == count_valid_states(grid_size)
+
+
+def test_transformed_actions_move_the_transformed_game():
+    grid_size = 4
+    cell_maps, direction_maps = _tables(grid_size)
+    rng = random.Random(0)
+    checked = 0
+
+    for _ in range(100):
+        game = GameLogic(grid_size, rng=rng)
+        game.place_food()
+        done = False
+        while not done:
+            snake, food = list(game.Snake.snake_positions), game.GameEnvironment.food_pos
+            state = get_state_representation(game)
+            action = rng.choice(ACTIONS[:3] if rng.random() < 0.9 else ACTIONS)
+
+            # GameLogic turns a single-cell snake as if it faced right, whatever the transform made of that
+            transforms = [t for t in range(len(TRANSFORMS))
+                          if len(snake) > 1 or direction_maps[t]['rightward'] == 'rightward']
+            images = {t: game_at([cell_maps[t][cell] for cell in snake], cell_maps[t][food], grid_size)
+                      for t in transforms}
+            for t, image in images.items():
+                assert get_state_representation(image) == transform_state(state, t, grid_size)
+
+            status, reward, done = game.step(action)
+            for t, image in images.items():
+                image_status, image_reward, image_done = image.step(transform_action(action, t))
+                assert (image_status, image_reward, image_done) == (status, reward, done)
+                # Food is placed at random; put it on the image of the original's new food
+                if not done:
+                    image.GameEnvironment.food_pos = cell_maps[t][game.GameEnvironment.food_pos]
+                    assert get_state_representation(image) == transform_state(
+                        get_state_representation(game), t, grid_size)
+                checked += 1
+
+    assert checked > 1000
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from game_logic import GameLogic
+from q_learning.get_game_state import get_state_representation
+from q_learning.transition_cache import BOARD_FULL, DEATH, TransitionCache
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+
+def flat_cells(game):
+    grid_size = game.GameEnvironment.grid_size
+    return tuple(r * grid_size + c for r, c in game.Snake.snake_positions)
+
+
+@pytest.mark.parametrize("grid_size, bulk", [(2, False), (3, False), (3, True), (4, False)])
+def test_cache_steps_match_game_logic(grid_size, bulk):
+    cache = TransitionCache(grid_size, ACTIONS)
+    if bulk:
+        cache.build()
+    rng = random.Random(grid_size)
+    outcomes = set()
+
+    for _ in range(300):
+        game = GameLogic(grid_size, rng=rng)
+        game.place_food()
+        snake, food = cache.start_snake, game.GameEnvironment.food_pos[0] * grid_size + game.GameEnvironment.food_pos[1]
+
+        while True:
+            assert cache.bodies[snake] == flat_cells(game)
+            assert cache.state(snake, food) == get_state_representation(game)
+
+            # Mostly avoid dying, so the snakes get long enough to fill small boards
+            next_snake = cache.expand(snake)
+            safe = [a for a in range(len(ACTIONS)) if next_snake[a] != DEATH]
+            a = rng.choice(safe if safe and rng.random() < 0.95 else range(len(ACTIONS)))
+            status, reward, done = game.step(ACTIONS[a])
+
+            # The same branches as train_cached
+            if next_snake[a] == DEATH:
+                outcomes.add("death")
+                assert (reward, done) == (GameLogic.REWARD_DEATH, True)
+                break
+            if cache.new_head[snake][a] == food:
+                assert (status, reward) == (GameLogic.STATUS_ATE, GameLogic.REWARD_FOOD)
+                snake = cache.grown_snake[snake][a]
+                if snake == BOARD_FULL:
+                    outcomes.add("board full")
+                    assert done and not game.GameEnvironment.free_cells
+                    break
+                outcomes.add("ate")
+                cache.expand(snake)
+                food = game.GameEnvironment.food_pos[0] * grid_size + game.GameEnvironment.food_pos[1]
+                assert food in cache.free_cells[snake]
+            else:
+                outcomes.add("moved")
+                assert (status, reward) == (GameLogic.STATUS_OK, GameLogic.REWARD_STEP)
+                snake = next_snake[a]
+            assert not done
+
+    assert outcomes >= {"death", "ate", "moved"}
+    if grid_size <= 3:
+        assert "board full" in outcomes
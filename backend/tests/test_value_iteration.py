@@ -0,0 +1,122 @@
+from collections import Counter
+
+import pytest
+
+from game_logic import GameLogic
+from q_learning.get_game_state import DIRECTIONS, get_state_representation
+from q_learning.value_iteration import solve
+
+ACTIONS = ["turn_left", "go_straight", "turn_right", "turn_around"]
+
+
+def game_at(snake, food, grid_size):
+    game = GameLogic(grid_size)
+    for cell in game.Snake.body:
+        game.GameEnvironment.release_cell(cell)
+    game.Snake.body.clear()
+    game.Snake.body.extend(snake)
+    game.Snake.occupied = set(snake)
+    for cell in snake:
+        game.GameEnvironment.take_cell(cell)
+    game.GameEnvironment.food_pos = food
+    return game
+
+
+def play(snake, food, action, grid_size):
+    """Move like GameLogic.step, but return every food placement instead of drawing one.
+
+    Returns:
+        Tuple[float, list]: the reward and the equally likely next games (none if the game ended)
+    """
+    game = game_at(snake, food, grid_size)
+    (head_r, head_c), neck = snake[0], snake[1] if len(snake) > 1 else None
+    facing = GameLogic.RIGHT if neck is None else (head_r - neck[0], head_c - neck[1])
+    status = game.advance(GameLogic.TURNS[facing][action])
+    if status == GameLogic.STATUS_OK:
+        return GameLogic.REWARD_STEP, [game]
+    if status == GameLogic.STATUS_ATE:
+        moved = tuple(game.Snake.body)
+        return GameLogic.REWARD_FOOD, [game_at(moved, cell, grid_size) for cell in game.GameEnvironment.free_cells]
+    return GameLogic.REWARD_DEATH, []
+
+
+def orderings(head, head_dir, body_tuple):
+    """Every head-to-tail order of a state's body."""
+    if len(body_tuple) == 1:
+        return [(head,)]
+    dr, dc = DIRECTIONS[head_dir]
+    paths, stack = [], [((head, (head[0] - dr, head[1] - dc)), set(body_tuple) - {head, (head[0] - dr, head[1] - dc)})]
+    while stack:
+        path, remaining = stack.pop()
+        if not remaining:
+            paths.append(path)
+            continue
+        r, c = path[-1]
+        for cell in [(r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)]:
+            if cell in remaining:
+                stack.append((path + (cell,), remaining - {cell}))
+    return paths
+
+
+def check_bellman(table, states):
+    """Check Q(s, a) against one backup through the game; a body with several orders stands for each equally often."""
+    values = table.values.max(axis=1)
+    for head, head_dir, body_tuple, food in states:
+        snakes = orderings(head, head_dir, body_tuple)
+        assert snakes
+        i = table.index((head, head_dir, body_tuple, food))
+        for a, action in enumerate(ACTIONS):
+            expected = 0.0
+            for snake in snakes:
+                reward, games = play(snake, food, action, table.grid_size)
+                future = sum(values[table.index(get_state_representation(game))] for game in games)
+                expected += reward + (future / len(games) if games else 0.0)
+            assert table.values[i, a] == pytest.approx(expected / len(snakes), abs=1e-3)
+
+
+@pytest.mark.parametrize("grid_size", [2, 3])
+def test_solution_satisfies_bellman_equation_of_the_game(grid_size):
+    table, _ = solve(grid_size, ACTIONS, tolerance=1e-9)
+    check_bellman(table, table.states())
+
+
+def test_uneven_tails_are_weighted_by_their_orderings():
+    # 3x3 has no body whose possible tails end unequally many orders; 4x4 does
+    table, _ = solve(4, ACTIONS, tolerance=1e-6)
+    uneven, checked = [], {}
+    for state in table.states():
+        if state[:3] not in checked:
+            tails = Counter(snake[-1] for snake in orderings(*state[:3]))
+            checked[state[:3]] = len(set(tails.values())) > 1
+        if checked[state[:3]]:
+            uneven.append(state)
+    assert uneven
+    check_bellman(table, uneven)
+
+
+def test_solution_is_optimal_on_2x2():
+    # On 2x2 every body has one order, so the sorted states are exact; compare with plain value iteration
+    # over the games themselves, starting from the snake and food of every state
+    table, _ = solve(2, ACTIONS, tolerance=1e-9)
+    games = {}
+    for head, head_dir, body_tuple, food in table.states():
+        (snake,) = orderings(head, head_dir, body_tuple)
+        games[(snake, food)] = [play(snake, food, action, 2) for action in ACTIONS]
+
+    def key(game):
+        return tuple(game.Snake.body), game.GameEnvironment.food_pos
+
+    values = dict.fromkeys(games, 0.0)
+    for _ in range(1000):
+        q_values = {state: [reward + sum(values[key(game)] for game in next_games) / max(len(next_games), 1)
+                            for reward, next_games in outcomes]
+                    for state, outcomes in games.items()}
+        new_values = {state: max(q) for state, q in q_values.items()}
+        converged = max(abs(new_values[state] - values[state]) for state in values) < 1e-9
+        values = new_values
+        if converged:
+            break
+
+    for (snake, food), q in q_values.items():
+        i = table.index(get_state_representation(game_at(snake, food, 2)))
+        assert table.values[i].tolist() == pytest.approx(q, abs=1e-4)
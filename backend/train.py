@@ -1,10 +1,22 @@
+import argparse
+import os
 import time
 import pickle
+import random
+import numpy as np
 from tqdm import tqdm
+from checkpoint import Checkpointer, atomic_write, load_checkpoint
+from evaluation import BackgroundEvaluator, format_result
+from profiling import PhaseProfiler, format_snapshot
+from recording import EpisodeRecorder
+from telemetry import TelemetryPublisher
 from q_learning.q_learning_agent import QLearningAgent
+from q_learning.symmetry import SymmetricQLearningAgent
+from q_learning.dense_q_table import DenseQLearningAgent, DenseQTable
+from q_learning.replay_buffer import ReplayQLearningAgent
+from q_learning.transition_cache import BOARD_FULL, DEATH, TransitionCache
 from game_logic import GameLogic
-from visualizer import GameVisualizer
-from q_learning.get_game_state import get_state_representation, get_current_direction, get_direction
+from q_learning.get_game_state import get_state_representation
 
 actions = ["turn_left", "go_straight", "turn_right", "turn_around"]
 
@@ -12,92 +24,433 @@ LEARNING_RATE = 0.2
 EPSILON = 0.1
 GRID_SIZE = 3
 NUM_EPISODES = 1000
+Q_TABLE_PATH = 'trained_q_table.pkl'
 
-agent = QLearningAgent(actions=actions,
-                       learning_rate=LEARNING_RATE, 
-                       epsilon=EPSILON,
-                       grid_size=GRID_SIZE, 
-                       num_episodes=NUM_EPISODES)
-
-# Load existing Q-table if available to continue training; otherwise initialize a new one
-try:
-    with open('trained_q_table.pkl', 'rb') as f:
-        agent.q_table = pickle.load(f)
-        print(f"Loaded existing Q-table with {len(agent.q_table)} states. Continuing training for {agent.num_episodes} episodes...")
-except FileNotFoundError:
-    agent.set_q_table()
-    print(f"Initialized new Q-table with {len(agent.q_table)} states. Training for {agent.num_episodes} episodes...")
-
-VISUALIZE = True
-FRAME_DELAY = 0.1  # Seconds between frames (lower = faster)
-visualizer = GameVisualizer(grid_size=agent.grid_size, cell_size=100)
-
-# Track training progress
-scores = []
-steps_per_episode = []
-
-for episode in tqdm(range(agent.num_episodes)):
-    game = GameLogic(grid_size=agent.grid_size)
-    game.place_food()
-    steps = 0
-    
-    while True:
-        steps += 1
-        
-        visualizer.draw(game, episode + 1, game.GameEnvironment.score, steps, agent.epsilon)
-        time.sleep(FRAME_DELAY)
-        current_state = get_state_representation(game)
-        action = agent.choose_action(current_state, agent.epsilon)
-        current_dir = get_current_direction(game.Snake.snake_positions)
-        direction = get_direction(action, current_dir)
-        
-        # Take action and get reward
-        try:
-            old_score = game.GameEnvironment.score
-            game.move(direction)
-            new_score = game.GameEnvironment.score
-            
-            # Determine reward
-            if new_score > old_score:
-                reward = 10  # The agent ate food
+RENDER_FPS = 10  # Frames drawn per second while rendering; training does not wait for them
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the Q-learning snake agent.")
+    parser.add_argument("--grid-size", type=int, default=GRID_SIZE, help="size of the game grid")
+    parser.add_argument("--episodes", type=int, default=NUM_EPISODES, help="number of training episodes")
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE, help="Q-learning step size")
+    parser.add_argument("--epsilon", type=float, default=EPSILON, help="exploration rate")
+    parser.add_argument("--output", default=Q_TABLE_PATH,
+                        help="Q-table pickle to continue from (if it exists) and to save to")
+    parser.add_argument("--render-every", type=int, default=0,
+                        help="draw every N-th episode with pygame (0 = headless, 1 = every episode)")
+    parser.add_argument("--render-fps", type=float, default=RENDER_FPS,
+                        help="frames drawn per second; frames arriving faster are dropped")
+    parser.add_argument("--max-steps", type=int, default=None,
+                        help="end an episode after this many steps (default: only on game over)")
+    parser.add_argument("--eager", action="store_true",
+                        help="create every valid state up front instead of on first visit")
+    parser.add_argument("--symmetric", action="store_true",
+                        help="share Q-values between rotated/mirrored states (Q-table keyed by canonical states); "
+                             "needs up to 8x fewer states, but each step is about 1.5-2x slower")
+    parser.add_argument("--replay-capacity", type=int, default=0,
+                        help="keep this many transitions for experience replay (0 = off; uses a dense Q-table)")
+    parser.add_argument("--replay-batch", type=int, default=8, help="transitions per replayed minibatch")
+    parser.add_argument("--replay-discount", type=float, default=0.9,
+                        help="discount of future values in replay mode (other agents are undiscounted)")
+    parser.add_argument("--cached", choices=["lazy", "bulk"], default=None,
+                        help="play episodes on a transition cache instead of GameLogic (dense Q-table), "
+                             "filled on first visit (lazy) or up front (bulk)")
+    parser.add_argument("--eval-every", type=int, default=0,
+                        help="every N episodes, evaluate a snapshot of the agent greedily in the background (0 = off)")
+    parser.add_argument("--eval-games", type=int, default=100, help="greedy games per evaluation")
+    parser.add_argument("--profile-every", type=int, default=0,
+                        help="time each training phase and report every N episodes (0 = off)")
+    parser.add_argument("--metrics-output", default=None,
+                        help="file the profile snapshots are written to (JSON lines or Prometheus text)")
+    parser.add_argument("--metrics-format", choices=["jsonl", "prometheus"], default="jsonl",
+                        help="format of --metrics-output")
+    parser.add_argument("--telemetry-port", type=int, default=0,
+                        help="stream sampled frames and episode stats to WebSocket viewers on this localhost port "
+                             "(0 = off; watch with python telemetry.py)")
+    parser.add_argument("--telemetry-fps", type=float, default=10.0, help="most telemetry frames per second")
+    parser.add_argument("--record", default=None,
+                        help="record every episode (game seed and actions) to this file; "
+                             "replay with python recording.py or play.py --replay")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random module (agent and game)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint file (default: the output path with a .ckpt suffix)")
+    parser.add_argument("--checkpoint-every", type=int, default=0,
+                        help="write a checkpoint every N episodes (0 = off)")
+    parser.add_argument("--checkpoint-seconds", type=float, default=0.0,
+                        help="write a checkpoint when this many seconds have passed since the last one (0 = off)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the checkpoint; --episodes is the total including the resumed ones")
+    return parser.parse_args(argv)
+
+
+def train(agent: QLearningAgent, render_every: int = 0, max_steps: int = None,
+          start_episode: int = 0, scores: list = None, steps_per_episode: list = None,
+          checkpointer: Checkpointer = None, evaluator: BackgroundEvaluator = None, eval_every: int = 0,
+          profiler: PhaseProfiler = None, profile_every: int = 100, telemetry: TelemetryPublisher = None,
+          render_fps: float = RENDER_FPS, recorder: EpisodeRecorder = None):
+    """Run training episodes until agent.num_episodes have been played.
+
+    Args:
+        agent (QLearningAgent): the agent to train (its Q-table is updated in place)
+        render_every (int): draw every N-th episode with pygame; 0 never draws
+        max_steps (int): optional cap on the number of steps per episode
+        start_episode (int): number of episodes already played (when resuming)
+        scores (list): per-episode scores of the episodes already played
+        steps_per_episode (list): per-episode step counts of the episodes already played
+        checkpointer (Checkpointer): offered a checkpoint after every episode
+        evaluator (BackgroundEvaluator): given a snapshot of the agent every eval_every episodes
+        eval_every (int): episodes between evaluations
+        profiler (PhaseProfiler): times every phase of the loop when given
+        profile_every (int): episodes between profile snapshots
+        telemetry (TelemetryPublisher): sent sampled frames and every episode's result
+        render_fps (float): frames drawn per second by the render process
+        recorder (EpisodeRecorder): when given, seeds every game and records its actions
+
+    Returns:
+        Tuple[List[int], List[int]]: per-episode scores and step counts
+    """
+    # Only import pygame when an episode is actually drawn; drawing happens in its own process
+    visualizer = None
+    if render_every > 0:
+        from visualizer import RenderProcess
+        visualizer = RenderProcess(grid_size=agent.grid_size, fps=render_fps)
+
+    # Track training progress
+    scores = [] if scores is None else scores
+    steps_per_episode = [] if steps_per_episode is None else steps_per_episode
+
+    # The loop calls these names; with a profiler they are timed wrappers, otherwise the plain functions
+    encode_state = get_state_representation
+    choose_action, update_q_value = agent.choose_action, agent.update_q_value
+    if profiler is not None:
+        encode_state = profiler.wrap(get_state_representation, "state_encoding")
+        choose_action, update_q_value = profiler.agent_hooks(agent)
+        if visualizer is not None:
+            profiler.instrument(visualizer, "draw", "render")
+
+    for episode in tqdm(range(start_episode, agent.num_episodes), initial=start_episode, total=agent.num_episodes):
+        game = GameLogic(grid_size=agent.grid_size) if recorder is None else recorder.new_game(episode + 1)
+        if recorder is not None:
+            moves = bytearray()
+        if profiler is not None:
+            profiler.instrument_game(game)
+        game.place_food()
+        steps = 0
+        render = visualizer is not None and (episode + 1) % render_every == 0
+
+        while True:
+            steps += 1
+
+            if render:
+                visualizer.draw(game, episode + 1, game.GameEnvironment.score, steps, agent.epsilon)
+            if telemetry is not None and telemetry.frame_wanted:
+                telemetry.publish_frame(episode + 1, steps, game.Snake.body, game.GameEnvironment.food_pos,
+                                        game.GameEnvironment.score)
+            current_state = encode_state(game)
+            action = choose_action(current_state, agent.epsilon)
+            if recorder is not None:
+                moves.append(recorder.action_codes[action])
+
+            # Take action and get reward
+            status, reward, done = game.step(action)
+            next_state = current_state if done else encode_state(game)  # Terminal state
+
+            # Update Q-value
+            update_q_value(current_state, action, reward, next_state)
+            if done or steps == max_steps:
+                break
+
+        # Record episode results
+        if recorder is not None:
+            recorder.record(episode + 1, moves)
+        scores.append(game.GameEnvironment.score)
+        steps_per_episode.append(steps)
+
+        print_progress(episode + 1, agent.num_episodes, scores, steps_per_episode)
+        if telemetry is not None:
+            telemetry.record_episode(episode + 1, scores[-1], steps, agent)
+
+        if profiler is not None and (episode + 1) % profile_every == 0:
+            print(format_snapshot(profiler.snapshot(episode + 1, len(agent.q_table))))
+
+        # A resumed run keeps the recorded episodes up to its checkpoint, so write them out with it
+        if checkpointer is not None:
+            if checkpointer.maybe_save(episode + 1, agent, scores, steps_per_episode) and recorder is not None:
+                recorder.flush()
+
+        # Evaluations run in another process; report the ones that have finished so far
+        if evaluator is not None:
+            if (episode + 1) % eval_every == 0:
+                evaluator.submit(episode + 1, agent)
+            for eval_episode, result in evaluator.completed():
+                print(f"Episode {eval_episode} | {format_result(result)}")
+
+    if visualizer is not None:
+        visualizer.close()
+    return scores, steps_per_episode
+
+
+def train_cached(agent: DenseQLearningAgent, cache: TransitionCache, max_steps: int = None,
+                 start_episode: int = 0, scores: list = None, steps_per_episode: list = None,
+                 checkpointer: Checkpointer = None, evaluator: BackgroundEvaluator = None, eval_every: int = 0,
+                 telemetry: TelemetryPublisher = None):
+    """Run training episodes on a TransitionCache until agent.num_episodes have been played.
+
+    Plays by the same rules and rewards as train() and makes the same
+    epsilon-greedy choices and Q-learning updates as the agent, but a game is a
+    (snake, food) pair of ints and every step is a few list lookups. The
+    Q-values are worked on as a list of lists and copied back into
+    agent.q_table.values (as float64) before every checkpoint, evaluation and
+    at the end.
+
+    Args:
+        agent (DenseQLearningAgent): the agent to train (its DenseQTable is updated in place)
+        cache (TransitionCache): transitions of agent.grid_size, filled in as snakes are reached
+        max_steps (int): optional cap on the number of steps per episode
+        start_episode (int): number of episodes already played (when resuming)
+        scores (list): per-episode scores of the episodes already played
+        steps_per_episode (list): per-episode step counts of the episodes already played
+        checkpointer (Checkpointer): offered a checkpoint after every episode
+        evaluator (BackgroundEvaluator): given a snapshot of the agent every eval_every episodes
+        eval_every (int): episodes between evaluations
+        telemetry (TelemetryPublisher): sent sampled frames and every episode's result
+
+    Returns:
+        Tuple[List[int], List[int]]: per-episode scores and step counts
+    """
+    scores = [] if scores is None else scores
+    steps_per_episode = [] if steps_per_episode is None else steps_per_episode
+
+    q_values = agent.q_table.values.tolist()
+    action_ids = list(range(len(agent.actions)))
+    learning_rate, epsilon = agent.learning_rate, agent.epsilon
+    next_snake, new_head, grown_snake = cache.next_snake, cache.new_head, cache.grown_snake
+    state_index, free_cells, expand = cache.state_index, cache.free_cells, cache.expand
+    grid_size = cache.grid_size
+
+    rand, choice = random.random, random.choice
+    food_reward, death_reward, step_reward = GameLogic.REWARD_FOOD, GameLogic.REWARD_DEATH, GameLogic.REWARD_STEP
+
+    def sync():
+        # Kept as float64, so a resumed run continues from exactly the values it stopped at
+        agent.q_table.values = np.array(q_values)
+
+    for episode in tqdm(range(start_episode, agent.num_episodes), initial=start_episode, total=agent.num_episodes):
+        snake, food = cache.reset()
+        i = state_index[snake][food]
+        score = steps = 0
+
+        while True:
+            steps += 1
+            row = q_values[i]
+            if telemetry is not None and telemetry.frame_wanted:
+                telemetry.publish_frame(episode + 1, steps, [divmod(cell, grid_size) for cell in cache.bodies[snake]],
+                                        divmod(food, grid_size), score)
+
+            # Epsilon-greedy action selection, ties broken at random (like choose_action)
+            if rand() < epsilon:
+                a = choice(action_ids)
+            else:
+                max_q = max(row)
+                a = row.index(max_q) if row.count(max_q) == 1 else choice([b for b in action_ids if row[b] == max_q])
+
+            # Take action and get reward; a terminal transition looks at the current state again, like train()
+            moved = next_snake[snake][a]
+            if moved == DEATH:
+                reward, done, j = death_reward, True, i
+            elif new_head[snake][a] == food:
+                reward, score = food_reward, score + 1
+                snake = grown_snake[snake][a]
+                if snake == BOARD_FULL:
+                    done, j = True, i
+                else:
+                    if next_snake[snake] is None:
+                        expand(snake)
+                    food = choice(free_cells[snake])
+                    done, j = False, state_index[snake][food]
             else:
-                reward = -0.1  # Normal step without collision
-            
-            next_state = get_state_representation(game)
-            
-        except Exception as e:
-            if "Wall" in str(e):
-                reward = -10
-            elif "Self" in str(e):
-                reward = -10
-            
-            next_state = current_state  # Terminal state
-            agent.update_q_value(current_state, action, reward, next_state)
-            break
-        
-        # Update Q-value
-        agent.update_q_value(current_state, action, reward, next_state)
-    
-    # Record episode results
-    scores.append(game.GameEnvironment.score)
-    steps_per_episode.append(steps)
-    
+                reward, done, snake = step_reward, False, moved
+                if next_snake[snake] is None:
+                    expand(snake)
+                j = state_index[snake][food]
+
+            # Update Q-value
+            row[a] += learning_rate * (reward + max(q_values[j]) - row[a])
+            if done or steps == max_steps:
+                break
+            i = j
+
+        # Record episode results
+        scores.append(score)
+        steps_per_episode.append(steps)
+        print_progress(episode + 1, agent.num_episodes, scores, steps_per_episode)
+        if telemetry is not None:
+            telemetry.record_episode(episode + 1, score, steps, agent)
+
+        if checkpointer is not None and checkpointer.due(episode + 1):
+            sync()
+            checkpointer.save(episode + 1, agent, scores, steps_per_episode)
+
+        if evaluator is not None:
+            if (episode + 1) % eval_every == 0:
+                sync()
+                evaluator.submit(episode + 1, agent)
+            for eval_episode, result in evaluator.completed():
+                print(f"Episode {eval_episode} | {format_result(result)}")
+
+    sync()
+    return scores, steps_per_episode
+
+
+def print_progress(episode: int, num_episodes: int, scores: list, steps_per_episode: list) -> None:
     # Print progress every 100 episodes
-    if (episode + 1) % 100 == 0:
+    if episode % 100 == 0:
         avg_score = sum(scores[-100:]) / min(100, len(scores))
         highest_score = max(scores[-100:])
         avg_steps = sum(steps_per_episode[-100:]) / min(100, len(steps_per_episode))
-        print(f"Episode {episode + 1}/{agent.num_episodes} | Avg Score: {avg_score:.2f} | Highest Score: {highest_score} | Avg Steps: {avg_steps:.1f}")
-
-print("\n=== Training Complete ===")
-print(f"Total Episodes: {agent.num_episodes}")
-print(f"Final Avg Score (last 100): {sum(scores[-100:]) / min(100, len(scores)):.2f}")
-print(f"Best Score: {max(scores)}")
-
-print("\nSaving Q-table...")
-with open('trained_q_table.pkl', 'wb') as f:
-    pickle.dump(agent.q_table, f)
-print(f"Q-table saved! ({len(agent.q_table)} states)")
-print("\nClose the pygame window to exit.")
-time.sleep(3)
-visualizer.close()
+        print(f"Episode {episode}/{num_episodes} | Avg Score: {avg_score:.2f} | Highest Score: {highest_score} | Avg Steps: {avg_steps:.1f}")
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    if args.replay_capacity > 0:
+        if args.symmetric:
+            raise SystemExit("--symmetric cannot be combined with --replay-capacity")
+        agent = ReplayQLearningAgent(actions=actions,
+                                     learning_rate=args.learning_rate,
+                                     epsilon=args.epsilon,
+                                     grid_size=args.grid_size,
+                                     num_episodes=args.episodes,
+                                     buffer_capacity=args.replay_capacity,
+                                     batch_size=args.replay_batch,
+                                     discount=args.replay_discount,
+                                     seed=args.seed)
+        print(f"Replay buffer: {args.replay_capacity} transitions, {agent.replay_buffer.nbytes / 2**20:.1f} MiB")
+    elif args.cached is not None:
+        if args.symmetric or args.render_every > 0 or args.profile_every > 0 or args.record is not None:
+            raise SystemExit("--cached cannot be combined with --symmetric, --render-every, --profile-every or --record")
+        agent = DenseQLearningAgent(actions=actions,
+                                    learning_rate=args.learning_rate,
+                                    epsilon=args.epsilon,
+                                    grid_size=args.grid_size,
+                                    num_episodes=args.episodes)
+    else:
+        agent_class = SymmetricQLearningAgent if args.symmetric else QLearningAgent
+        agent = agent_class(actions=actions,
+                            learning_rate=args.learning_rate,
+                            epsilon=args.epsilon,
+                            grid_size=args.grid_size,
+                            num_episodes=args.episodes)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    checkpoint_path = args.checkpoint or os.path.splitext(args.output)[0] + '.ckpt'
+
+    start_episode, scores, steps_per_episode = 0, [], []
+    if args.resume:
+        # Restore everything the run depends on, so it continues exactly as if never stopped
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint['grid_size'] != args.grid_size:
+            raise ValueError(f"Checkpoint is for a {checkpoint['grid_size']}x{checkpoint['grid_size']} grid, "
+                             f"not {args.grid_size}x{args.grid_size}")
+        agent.q_table = checkpoint['q_table']
+        if checkpoint.get('replay_buffer') is not None:
+            agent.replay_buffer = checkpoint['replay_buffer']
+        random.setstate(checkpoint['random_state'])
+        start_episode = checkpoint['episode']
+        scores, steps_per_episode = checkpoint['scores'], checkpoint['steps_per_episode']
+        print(f"Resumed from {checkpoint_path} after episode {start_episode} with {len(agent.q_table)} states. "
+              f"Training up to {agent.num_episodes} episodes...")
+    else:
+        # Load existing Q-table if available to continue training; otherwise initialize a new one
+        try:
+            with open(args.output, 'rb') as f:
+                q_table = pickle.load(f)
+                if isinstance(agent, DenseQLearningAgent):
+                    agent.set_q_table()
+                    agent.q_table.load_dict(q_table)
+                else:
+                    agent.q_table = q_table
+                print(f"Loaded existing Q-table with {len(agent.q_table)} states. Continuing training for {agent.num_episodes} episodes...")
+        except FileNotFoundError:
+            agent.set_q_table(lazy=not args.eager)
+            print(f"Initialized new Q-table with {len(agent.q_table)} states. Training for {agent.num_episodes} episodes...")
+
+    checkpointer = None
+    if args.checkpoint_every > 0 or args.checkpoint_seconds > 0:
+        checkpointer = Checkpointer(checkpoint_path, args.checkpoint_every, args.checkpoint_seconds)
+
+    evaluator = None
+    if args.eval_every > 0:
+        evaluator = BackgroundEvaluator(num_games=args.eval_games, seed=args.seed)
+
+    profiler = None
+    if args.profile_every > 0:
+        profiler = PhaseProfiler(args.metrics_output, args.metrics_format)
+
+    telemetry = None
+    if args.telemetry_port > 0:
+        telemetry = TelemetryPublisher(args.grid_size, args.telemetry_port, fps=args.telemetry_fps).start()
+        print(f"Telemetry on ws://127.0.0.1:{args.telemetry_port}")
+
+    recorder = None
+    if args.record is not None:
+        recorder = EpisodeRecorder(args.record, args.grid_size, actions, base_seed=args.seed, start_episode=start_episode)
+
+    cache = None
+    if args.cached is not None:
+        start = time.perf_counter()
+        cache = TransitionCache(args.grid_size, actions, table=agent.q_table)
+        if args.cached == "bulk":
+            cache.build()
+        print(f"Transition cache: {len(cache)} snakes ({time.perf_counter() - start:.2f}s)")
+
+    start = time.perf_counter()
+    try:
+        if cache is not None:
+            scores, steps_per_episode = train_cached(agent, cache, max_steps=args.max_steps,
+                                                     start_episode=start_episode, scores=scores,
+                                                     steps_per_episode=steps_per_episode, checkpointer=checkpointer,
+                                                     evaluator=evaluator, eval_every=args.eval_every,
+                                                     telemetry=telemetry)
+        else:
+            scores, steps_per_episode = train(agent, render_every=args.render_every, max_steps=args.max_steps,
+                                              start_episode=start_episode, scores=scores,
+                                              steps_per_episode=steps_per_episode, checkpointer=checkpointer,
+                                              evaluator=evaluator, eval_every=args.eval_every,
+                                              profiler=profiler, profile_every=args.profile_every,
+                                              telemetry=telemetry, render_fps=args.render_fps, recorder=recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+        if checkpointer is not None:
+            checkpointer.close()
+        if telemetry is not None:
+            telemetry.close()
+    elapsed = time.perf_counter() - start
+
+    if evaluator is not None:
+        for eval_episode, result in evaluator.close():
+            print(f"Episode {eval_episode} | {format_result(result)}")
+
+    print("\n=== Training Complete ===")
+    print(f"Total Episodes: {agent.num_episodes}")
+    print(f"Final Avg Score (last 100): {sum(scores[-100:]) / min(100, len(scores)):.2f}")
+    print(f"Best Score: {max(scores)}")
+    played = len(scores) - start_episode
+    print(f"Throughput: {played / elapsed:.1f} episodes/sec, {sum(steps_per_episode[start_episode:]) / elapsed:.0f} steps/sec")
+
+    print("\nSaving Q-table...")
+    # Always save the {state: {action: q}} dict, which play.py and earlier runs can read
+    q_table = agent.q_table.to_dict() if isinstance(agent.q_table, DenseQTable) else agent.q_table
+    atomic_write(args.output, pickle.dumps(q_table))
+    print(f"Q-table saved! ({len(agent.q_table)} states)")
+
+    visited, total = agent.coverage()
+    print(f"State coverage: {visited}/{total} valid states ({100 * visited / max(total, 1):.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,42 @@
-import pygame
+import multiprocessing
+import queue
 import sys
+from array import array
+
+import pygame
+
+# Frames per second of a RenderProcess (0.1 s per frame, the speed training used to be drawn at)
+RENDER_FPS = 10
+RENDER_QUEUE_SIZE = 32
+STATS_HEIGHT = 60  # Extra space for stats
+
+
+def default_cell_size(grid_size):
+    """Cell size that keeps the window within about 800 pixels (at most 100 per cell)."""
+    return max(8, min(100, 800 // grid_size))
+
 
 class GameVisualizer:
     def __init__(self, grid_size, cell_size=100):
         """Initialize pygame visualizer for snake game.
-        
+
+        The grid background, the cell sprites and the text glyphs are rendered
+        once; each frame only repaints the cells and stats that changed and
+        updates those rectangles of the window.
+
         Args:
             grid_size: Size of the game grid (n x n)
-            cell_size: Size of each cell in pixels
+            cell_size: Size of each cell in pixels (None picks one that fits the screen)
         """
         pygame.init()
         self.grid_size = grid_size
-        self.cell_size = cell_size
-        self.width = grid_size * cell_size
-        self.height = grid_size * cell_size + 60  # Extra space for stats
-        
+        self.cell_size = cell_size or default_cell_size(grid_size)
+        self.width = grid_size * self.cell_size
+        self.height = grid_size * self.cell_size + STATS_HEIGHT
+
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Snake Q-Learning Training")
-        
+
         # Colors
         self.BLACK = (0, 0, 0)
         self.WHITE = (255, 255, 255)
@@ -25,14 +44,53 @@ class GameVisualizer:
         self.RED = (255, 0, 0)
         self.BLUE = (0, 100, 255)
         self.GRAY = (50, 50, 50)
-        
+
         # Font
         self.font = pygame.font.Font(None, 28)
         self.small_font = pygame.font.Font(None, 22)
-        
+        self._glyphs = {}
+
+        # Static background: black with grid lines
+        self.background = pygame.Surface((self.width, self.height))
+        self.background.fill(self.BLACK)
+        for i in range(self.grid_size + 1):
+            pygame.draw.line(self.background, self.GRAY,
+                             (0, i * self.cell_size), (self.width, i * self.cell_size), 1)
+            pygame.draw.line(self.background, self.GRAY,
+                             (i * self.cell_size, 0), (i * self.cell_size, self.width), 1)
+
+        # One sprite per kind of cell, drawn over the background
+        size = self.cell_size
+        inset = max(1, size // 20)
+        self.head_sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        self.body_sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        self.food_sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.rect(self.head_sprite, self.GREEN, (inset, inset, size - 2 * inset, size - 2 * inset),
+                         border_radius=max(1, size // 12))
+        pygame.draw.rect(self.body_sprite, self.BLUE, (inset, inset, size - 2 * inset, size - 2 * inset),
+                         border_radius=max(1, size // 12))
+        pygame.draw.circle(self.food_sprite, self.RED, (size // 2, size // 2), max(1, size // 3))
+
+        # What is on screen now, so the next frame only repaints the difference
+        self._cells = {}
+        self._stats = None
+        self._steps = None
+        self.stats_rect = pygame.Rect(0, self.width, self.width, STATS_HEIGHT)
+        # The step counter changes every frame, so it gets its own small area
+        self.steps_rect = pygame.Rect(self.width - 100, self.width + 10, 100, 24)
+        self.screen.blit(self.background, (0, 0))
+        pygame.display.flip()
+
+    def handle_events(self):
+        """Process pending window events; return False once the window was closed."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        return True
+
     def draw(self, game, episode, score, steps, epsilon):
         """Draw the current game state.
-        
+
         Args:
             game: GameLogic instance
             episode: Current episode number
@@ -41,54 +99,149 @@ class GameVisualizer:
             epsilon: Current exploration rate
         """
         # Handle pygame events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-        
-        # Clear screen
-        self.screen.fill(self.BLACK)
-        
-        # Draw grid lines
-        for i in range(self.grid_size + 1):
-            pygame.draw.line(self.screen, self.GRAY, 
-                           (0, i * self.cell_size), 
-                           (self.width, i * self.cell_size), 1)
-            pygame.draw.line(self.screen, self.GRAY, 
-                           (i * self.cell_size, 0), 
-                           (i * self.cell_size, self.width), 1)
-        
-        # Draw food
-        food_r, food_c = game.GameEnvironment.food_pos
-        pygame.draw.circle(self.screen, self.RED,
-                          (food_c * self.cell_size + self.cell_size // 2,
-                           food_r * self.cell_size + self.cell_size // 2),
-                          self.cell_size // 3)
-        
-        # Draw snake
-        for idx, (snake_r, snake_c) in enumerate(game.Snake.snake_positions):
-            color = self.GREEN if idx == 0 else self.BLUE  # Head is green
-            rect = pygame.Rect(snake_c * self.cell_size + 5,
-                              snake_r * self.cell_size + 5,
-                              self.cell_size - 10,
-                              self.cell_size - 10)
-            pygame.draw.rect(self.screen, color, rect, border_radius=8)
-        
-        # Draw stats at the bottom
-        stats_y = self.width + 10
-        episode_text = self.font.render(f"Episode: {episode}", True, self.WHITE)
-        score_text = self.font.render(f"Score: {score}", True, self.WHITE)
-        steps_text = self.small_font.render(f"Steps: {steps}", True, self.WHITE)
-        epsilon_text = self.small_font.render(f"ε: {epsilon:.3f}", True, self.WHITE)
-        
-        self.screen.blit(episode_text, (10, stats_y))
-        self.screen.blit(score_text, (10, stats_y + 28))
-        self.screen.blit(steps_text, (self.width - 100, stats_y))
-        self.screen.blit(epsilon_text, (self.width - 100, stats_y + 28))
-        
-        pygame.display.flip()
-    
+        if not self.handle_events():
+            pygame.quit()
+            sys.exit()
+
+        self.draw_frame(game.Snake.snake_positions, game.GameEnvironment.food_pos, episode, score, steps, epsilon)
+
+    def draw_frame(self, snake, food, episode, score, steps, epsilon):
+        """Draw a frame given as plain values, repainting only what changed since the last one.
+
+        Args:
+            snake: the snake's (row, col) cells, head first
+            food: the food's (row, col) cell
+            episode, score, steps, epsilon: the stats shown below the grid
+        """
+        # Every cell that should show something, and with which sprite
+        cells = {cell: self.body_sprite for cell in snake}
+        if len(snake):
+            cells[snake[0]] = self.head_sprite
+        cells.setdefault(tuple(food), self.food_sprite)
+
+        dirty = []
+        for cell in self._cells.keys() - cells.keys():
+            dirty.append(self._paint(cell, None))
+        for cell, sprite in cells.items():
+            if self._cells.get(cell) is not sprite:
+                dirty.append(self._paint(cell, sprite))
+        self._cells = cells
+
+        # Episode, score and epsilon change a few times per episode at most
+        stats = (episode, score, round(epsilon, 3))
+        if stats != self._stats:
+            self._stats = stats
+            self._steps = None
+            self.screen.blit(self.background, self.stats_rect, self.stats_rect)
+            stats_y = self.width + 10
+            self._blit_text(self.font, f"Episode: {episode}", (10, stats_y))
+            self._blit_text(self.font, f"Score: {score}", (10, stats_y + 28))
+            self._blit_text(self.small_font, f"ε: {epsilon:.3f}", (self.width - 100, stats_y + 28))
+            dirty.append(self.stats_rect)
+
+        # Steps change every frame; only their own area is repainted
+        if steps != self._steps:
+            self._steps = steps
+            self.screen.blit(self.background, self.steps_rect, self.steps_rect)
+            self._blit_text(self.small_font, f"Steps: {steps}", self.steps_rect.topleft)
+            dirty.append(self.steps_rect)
+
+        pygame.display.update(dirty)
+
+    def _paint(self, cell, sprite):
+        r, c = cell
+        rect = pygame.Rect(c * self.cell_size, r * self.cell_size, self.cell_size, self.cell_size)
+        self.screen.blit(self.background, rect, rect)
+        if sprite is not None:
+            self.screen.blit(sprite, rect)
+        return rect
+
+    def _blit_text(self, font, text, pos):
+        # Glyphs are rendered once per (font, character) and reused
+        x, y = pos
+        for char in text:
+            glyph = self._glyphs.get((font, char))
+            if glyph is None:
+                glyph = self._glyphs[(font, char)] = font.render(char, True, self.WHITE)
+            self.screen.blit(glyph, (x, y))
+            x += glyph.get_width()
+
     def close(self):
         """Close the pygame window."""
         pygame.quit()
 
+
+def _render_loop(grid_size, cell_size, fps, frames, closed):
+    """Body of a RenderProcess: show queued frames at most `fps` per second until told to stop."""
+    visualizer = GameVisualizer(grid_size, cell_size)
+    clock = pygame.time.Clock()
+    try:
+        while visualizer.handle_events():
+            try:
+                frame = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+            episode, score, steps, epsilon, snake, food = frame
+            visualizer.draw_frame([divmod(cell, grid_size) for cell in array('H', snake)],
+                                  divmod(food, grid_size), episode, score, steps, epsilon)
+            clock.tick(fps)
+    finally:
+        closed.set()
+        visualizer.close()
+
+
+class RenderProcess:
+    """Draws training frames in a separate process, so rendering never holds up training.
+
+    draw() takes the same arguments as GameVisualizer.draw, packs the game into
+    a compact snapshot (the snake as an array of flat cell indices) and puts it
+    on a bounded queue without waiting. The render process shows the queued
+    frames in order at `fps` frames per second; when the queue is full, new
+    frames are dropped. Closing the window stops the renderer, not training.
+    """
+
+    def __init__(self, grid_size, cell_size=None, fps=RENDER_FPS, queue_size=RENDER_QUEUE_SIZE):
+        """Start the render process.
+
+        Args:
+            grid_size: Size of the game grid (n x n)
+            cell_size: Size of each cell in pixels (None picks one that fits the screen)
+            fps: frames shown per second
+            queue_size: frames that can wait to be shown before new ones are dropped
+        """
+        self.grid_size = grid_size
+        self.dropped = 0
+        self._frames = multiprocessing.Queue(maxsize=queue_size)
+        self._closed = multiprocessing.Event()
+        self._process = multiprocessing.Process(target=_render_loop, name="renderer", daemon=True,
+                                                args=(grid_size, cell_size, fps, self._frames, self._closed))
+        self._process.start()
+
+    def draw(self, game, episode, score, steps, epsilon):
+        """Queue a snapshot of the game for drawing (dropped if the renderer is behind or closed)."""
+        grid_size = self.grid_size
+        snake = array('H', [r * grid_size + c for r, c in game.Snake.snake_positions]).tobytes()
+        food_r, food_c = game.GameEnvironment.food_pos
+        try:
+            self._frames.put_nowait((episode, score, steps, epsilon, snake, food_r * grid_size + food_c))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Stop the renderer, discarding the frames it has not shown yet."""
+        if not self._closed.is_set():
+            try:
+                while True:
+                    self._frames.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._frames.put(None, timeout=5)
+            except queue.Full:
+                pass
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._frames.cancel_join_thread()